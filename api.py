@@ -0,0 +1,171 @@
+import json
+from datetime import date, datetime
+
+from flask import Blueprint, Response, abort, current_app, jsonify, request, stream_with_context, url_for
+from sqlalchemy import tuple_
+
+from cache import page_cache
+from conditional import conditional
+from models import db, Artist, Venue, Show
+from pages import venue_page_data, artist_page_data
+from pagination import decode_cursor, encode_cursor
+from validators import shows_validator, table_validator, venue_validator, artist_validator
+
+# Versioned JSON API.
+# Listings are NDJSON, one object per line. Without ?limit= the whole table is
+# streamed off a server-side cursor (yield_per), so an export runs in constant
+# memory; with ?limit= a page is returned and the next one is linked from the
+# Link header. ?fields=a,b selects both the output keys and the columns read.
+
+api = Blueprint('api_v1', __name__, url_prefix='/api/v1')
+
+STREAM_BATCH_SIZE = 1000
+
+SHOW_FIELDS = {
+  'id': Show.id,
+  'start_time': Show.start_time,
+  'venue_id': Show.venue_id,
+  'venue_name': Venue.name,
+  'artist_id': Show.artist_id,
+  'artist_name': Artist.name,
+  'artist_image_link': Artist.image_link,
+}
+
+VENUE_FIELDS = {
+  'id': Venue.id,
+  'name': Venue.name,
+  'genres': Venue.genres,
+  'address': Venue.address,
+  'city': Venue.city,
+  'state': Venue.state,
+  'phone': Venue.phone,
+  'website_link': Venue.website_link,
+  'facebook_link': Venue.facebook_link,
+  'seeking_talent': Venue.seeking_talent,
+  'seeking_description': Venue.seeking_description,
+  'image_link': Venue.image_link,
+}
+
+ARTIST_FIELDS = {
+  'id': Artist.id,
+  'name': Artist.name,
+  'genres': Artist.genres,
+  'city': Artist.city,
+  'state': Artist.state,
+  'phone': Artist.phone,
+  'website_link': Artist.website_link,
+  'facebook_link': Artist.facebook_link,
+  'seeking_venue': Artist.seeking_venue,
+  'seeking_description': Artist.seeking_description,
+  'image_link': Artist.image_link,
+}
+
+
+def _default(value):
+  if isinstance(value, (datetime, date)):
+    return value.isoformat()
+  raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def fields_arg(available):
+  fields = request.args.get('fields')
+  if not fields:
+    return list(available)
+  selected = [field for field in fields.split(',') if field]
+  unknown = [field for field in selected if field not in available]
+  if unknown:
+    abort(400, f'unknown fields: {", ".join(unknown)}')
+  return selected
+
+
+def limit_arg():
+  limit = request.args.get('limit', type=int)
+  if limit is None:
+    return None
+  return max(1, min(limit, current_app.config['MAX_PAGE_SIZE']))
+
+
+def _record(row, fields):
+  record = {field: row[index] for index, field in enumerate(fields)}
+  if 'genres' in record:
+    record['genres'] = record['genres'].split(',') if record['genres'] else []
+  return record
+
+
+def ndjson(query, fields, next_cursor):
+  # query selects the requested fields followed by the keyset columns
+  limit = limit_arg()
+  headers = {}
+  if limit is None:
+    rows = query.yield_per(STREAM_BATCH_SIZE)
+  else:
+    rows = query.limit(limit + 1).all()
+    if len(rows) > limit:
+      rows = rows[:limit]
+      args = dict(request.args, cursor=next_cursor(rows[-1][len(fields):]))
+      headers['Link'] = f'<{url_for(request.endpoint, _external=True, **args)}>; rel="next"'
+
+  def generate():
+    for row in rows:
+      yield json.dumps(_record(row, fields), default=_default) + '\n'
+
+  return Response(stream_with_context(generate()), mimetype='application/x-ndjson', headers=headers)
+
+
+@api.route('/shows')
+@conditional(shows_validator)
+def shows():
+  fields = fields_arg(SHOW_FIELDS)
+  query = db.session.query(*(SHOW_FIELDS[field] for field in fields), Show.start_time, Show.id)\
+    .join(Venue, Show.venue_id == Venue.id)\
+    .join(Artist, Show.artist_id == Artist.id)\
+    .order_by(Show.start_time.desc(), Show.id.desc())
+  cursor = request.args.get('cursor')
+  if cursor:
+    query = query.filter(tuple_(Show.start_time, Show.id) < tuple_(*decode_cursor(cursor)))
+  return ndjson(query, fields, lambda key: encode_cursor(*key))
+
+
+def _entities(model, available):
+  fields = fields_arg(available)
+  query = db.session.query(*(available[field] for field in fields), model.id).order_by(model.id)
+  cursor = request.args.get('cursor')
+  if cursor:
+    if not cursor.isdigit():
+      abort(400)
+    query = query.filter(model.id > int(cursor))
+  return ndjson(query, fields, lambda key: str(key[0]))
+
+
+@api.route('/venues')
+@conditional(lambda: table_validator(Venue))
+def venues():
+  return _entities(Venue, VENUE_FIELDS)
+
+
+@api.route('/artists')
+@conditional(lambda: table_validator(Artist))
+def artists():
+  return _entities(Artist, ARTIST_FIELDS)
+
+
+def _page(data):
+  # the page data carries datetimes for the templates; the detail endpoints
+  # keep returning the "%m/%d/%Y, %H:%M" strings they always have
+  data = data._asdict()
+  for key in ('past_shows', 'upcoming_shows'):
+    data[key] = [dict(show._asdict(), start_time=show.start_time.strftime('%m/%d/%Y, %H:%M'))
+                 for show in data[key]]
+  return jsonify(data)
+
+
+@api.route('/venues/<int:venue_id>')
+@conditional(venue_validator)
+def venue(venue_id):
+  return _page(page_cache().fetch('venue', venue_id, venue_page_data))
+
+
+@api.route('/artists/<int:artist_id>')
+@conditional(artist_validator)
+def artist(artist_id):
+  return _page(page_cache().fetch('artist', artist_id, artist_page_data))
@@ -0,0 +1,202 @@
+from flask import Blueprint, render_template, request, flash, redirect, url_for, abort
+
+import autocomplete
+import search
+from calendars import render_calendar, calendar_feed
+from cache import page_cache, invalidate_artist
+from conditional import conditional
+from directory import filter_args, apply_filters
+from genres import genre_choices, genres_for
+from models import db, Artist
+from pages import artist_page_data, artist_past_shows_page, more_past_cursor
+from pagination import page_size_arg, cursor_arg
+from streaming import Page, render_listing
+from validators import artist_validator, artist_calendar_validator, artist_feed_validator
+from viewmodels import ArtistItem, ARTIST_ITEM_COLUMNS
+
+# Artist controllers. Forms are imported inside the views that use them so the
+# WTForms stack is only loaded once a form is first requested.
+
+blueprint = Blueprint('artists', __name__)
+
+#  Artists
+#  ----------------------------------------------------------------
+@blueprint.route('/artists')
+def artists():
+  # keyset paginated on the primary key (the cursor is the last id shown) and
+  # streamed as it renders (see streaming.py)
+  filters = filter_args()
+  page_size = page_size_arg()
+  artist_query = apply_filters(
+    db.session.query(*ARTIST_ITEM_COLUMNS), Artist, Artist.seeking_venue, filters,
+  ).order_by(Artist.id)
+  cursor = request.args.get('cursor')
+  if cursor:
+    if not cursor.isdigit():
+      abort(400)
+    artist_query = artist_query.filter(Artist.id > int(cursor))
+  page = Page(artist_query, page_size, key=lambda artist: artist.id, item=ArtistItem._make)
+  return render_listing('pages/artists.html', artists=page, page=page, genres=genre_choices(), genre=filters.get('genre'),
+                        filters=filters, per_page=page_size)
+
+
+@blueprint.route('/artists/search', methods=['GET', 'POST'])
+def search_artists():
+  search_term = request.values.get('search_term', '')
+  page = request.values.get('page', 1, type=int)
+  # cached per term and page until the next write (search.cached)
+  response = search.cached('artist', search_term, page, lambda: _search_results(search_term, page))
+  return render_template('pages/search_artists.html', results=response, search_term=search_term, page=page)
+
+
+def _search_results(search_term, page):
+  result = search.search('artist', search_term, page)
+
+  counts = db.session.query(
+    Artist.id,
+    Artist.name,
+    Artist.upcoming_shows_count.label('num_upcoming_shows')
+  ).filter(Artist.id.in_(result.ids)).all()
+  by_id = {artist.id: artist for artist in counts}
+
+  artists = []
+  for artist_id in result.ids:
+    if artist_id in by_id:
+      artists.append({
+        'id': artist_id,
+        'name': by_id[artist_id].name,
+        'num_upcoming_shows': by_id[artist_id].num_upcoming_shows
+      })
+
+  return {
+    'count': result.total,
+    'data': artists
+  }
+
+@blueprint.route('/artists/<int:artist_id>')
+@conditional(artist_validator)
+def show_artist(artist_id):
+  data = page_cache().fetch('artist', artist_id, artist_page_data)
+  return render_template('pages/show_artist.html', artist=data, more_past_cursor=more_past_cursor(data))
+
+@blueprint.route('/artists/<int:artist_id>/past-shows')
+@conditional(artist_validator)
+def artist_past_shows(artist_id):
+  # the artist page's "more past shows", as a fragment of tiles
+  page = artist_past_shows_page(artist_id, cursor_arg())
+  return render_template('pages/artist_past_shows.html', shows=page, page=page, artist_id=artist_id)
+
+@blueprint.route('/artists/<int:artist_id>/calendar')
+@conditional(artist_calendar_validator)
+def artist_calendar(artist_id):
+  # the artist's shows in a window of dates (see calendars.py)
+  return render_calendar('artist', artist_id)
+
+@blueprint.route('/artists/<int:artist_id>/calendar.ics')
+@conditional(artist_feed_validator)
+def artist_calendar_feed(artist_id):
+  return calendar_feed('artist', artist_id)
+
+#  Update
+#  ----------------------------------------------------------------
+@blueprint.route('/artists/<int:artist_id>/edit', methods=['GET'])
+def edit_artist(artist_id):
+  from forms import ArtistForm
+  artist = Artist.query.filter(Artist.id==artist_id).first()
+  form = ArtistForm(obj=artist)
+  form.genres.data = [genre.name for genre in artist.genre_list]
+  return render_template('forms/edit_artist.html', form=form, artist=artist)
+
+
+@blueprint.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+  from forms import ArtistForm
+  form = ArtistForm(request.form, meta={'csrf':False})
+
+  if form.validate():
+    try:
+      artist = {
+        "name": form.name.data,
+        "city": form.city.data,
+        "state": form.state.data,
+        "phone": form.phone.data,
+        "genres": ','.join(form.genres.data),
+        "image_link": form.image_link.data,
+        "facebook_link": form.facebook_link.data,
+        "seeking_venue": form.seeking_venue.data,
+        "website_link": form.website_link.data,
+        "seeking_description": form.seeking_description.data,
+      }
+      Artist.query.filter_by(id=artist_id).update(artist)
+      Artist.query.get(artist_id).genre_list = genres_for(form.genres.data)
+      db.session.commit()
+      invalidate_artist(artist_id)
+      autocomplete.update('artist', artist_id, form)
+      search.data_changed()
+      flash('Artist: ' + request.form['name'] + ' was successfully updated!')
+    except ValueError as e:
+      db.session.rollback()
+      flash('Artist: ' + request.form['name'] + ' was not successfully updated!')
+      print(e)
+    finally:
+        db.session.close()
+  else:
+        for error in form.errors:
+            flash(form.errors[error][0])
+        return redirect(url_for('.edit_artist', artist_id=artist_id))
+        
+  return redirect(url_for('.show_artist', artist_id=artist_id))
+
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+@blueprint.route('/artists/create', methods=['GET'])
+def create_artist_form():
+  from forms import ArtistForm
+  form = ArtistForm()
+  return render_template('forms/new_artist.html', form=form)
+
+@blueprint.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+  from forms import ArtistForm
+  form = ArtistForm(request.form, meta={'csrf':False})
+   # on successful db insert, flashes success
+  if form.validate():
+    try:
+            artist = Artist(
+                name  = form.name.data,
+                city  = form.city.data,
+                state = form.state.data,
+                phone = form.phone.data,
+                genres = ','.join(form.genres.data),
+                genre_list = genres_for(form.genres.data),
+                image_link = form.image_link.data,
+                facebook_link = form.facebook_link.data,
+                seeking_venue = form.seeking_venue.data,
+                website_link = form.website_link.data,
+                seeking_description = form.seeking_description.data)
+            db.session.add(artist)
+            db.session.flush()
+            artist_id = artist.id
+            db.session.commit()
+            autocomplete.update('artist', artist_id, form)
+            search.data_changed()
+            flash('Artist ' + request.form['name'] + ' was successfully listed!')
+            return render_template('pages/artists.html')
+
+  # on unsuccessful db insert, flashes an error 
+    except ValueError as e:
+            db.session.rollback()
+            flash('An error occurred. Artist ' + request.form['name'] + ' could not be listed.')
+            print(e)
+    finally:
+            db.session.close()
+  else:
+      message = []
+      for field, err in form.errors.items():
+          message.append(field + ' ' + '|'.join(err))
+      flash('Errors ' + str(message))
+
+      return render_template('forms/new_artist.html', form=form)
+  return render_template('pages/artists.html')
@@ -0,0 +1,239 @@
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import namedtuple
+
+from flask import Blueprint, current_app, jsonify, request, url_for
+
+from genres import parse_genres
+from models import db, Artist, Venue
+from search import tokenize
+
+# Name suggestions for the search boxes, served from memory.
+# Every venue and artist is indexed under each word-start suffix of its name
+# ("the blue note" -> "the blue note", "blue note", "note") and of its city,
+# state and genres, in sorted arrays per kind: a prefix lookup is a bisect
+# followed by a walk that stops after AUTOCOMPLETE_LIMIT suggestions, so its
+# cost doesn't grow with the number of matches. Name matches come before
+# city, state and genre matches.
+# gunicorn workers build the index once they start (see gunicorn.conf.py);
+# elsewhere the first lookup builds it while any others wait. The create, edit
+# and delete controllers update it in place. Writes made in other processes
+# (other workers, `flask import`) show up when the index is rebuilt: the first
+# lookup AUTOCOMPLETE_MAX_AGE seconds after the last build starts one rebuild
+# in a background thread, and lookups keep using the current index meanwhile.
+
+Suggestion = namedtuple('Suggestion', 'kind id name city state')
+
+MODELS = {
+  'venue': Venue,
+  'artist': Artist,
+}
+# the arrays of each kind, in the order their matches are suggested
+TIERS = ('name', 'other')
+
+
+def normalize(value):
+  return ' '.join(tokenize(value))
+
+
+def _suffixes(value):
+  tokens = tokenize(value)
+  return [' '.join(tokens[start:]) for start in range(len(tokens))]
+
+
+class PrefixIndex:
+
+  def __init__(self):
+    # (kind, tier) -> sorted [(key, lowercased name, id)]
+    self._arrays = {(kind, tier): [] for kind in MODELS for tier in TIERS}
+    # (kind, id) -> (Suggestion, {tier: keys})
+    self._entries = {}
+    # guards the arrays and entries; held for lookups and updates only
+    self._lock = threading.Lock()
+    # one build at a time
+    self._build_lock = threading.Lock()
+    # updates made while a build reads the tables, replayed onto its result
+    self._pending = None
+    self._refreshing = False
+    self.built_at = None
+
+  def _keys(self, entity_id, name, city, state, genres):
+    sort_name = (name or '').lower()
+    keys = {
+      'name': {(key, sort_name, entity_id) for key in _suffixes(name)},
+      'other': {(key, sort_name, entity_id) for value in (city, state, *genres) for key in _suffixes(value)},
+    }
+    return {tier: sorted(tier_keys) for tier, tier_keys in keys.items()}
+
+  def _read(self):
+    arrays = {key: [] for key in self._arrays}
+    entries = {}
+    for kind, model in MODELS.items():
+      for entity_id, name, city, state, genres in db.session.query(
+          model.id, model.name, model.city, model.state, model.genres):
+        keys = self._keys(entity_id, name, city, state, parse_genres(genres))
+        entries[(kind, entity_id)] = (Suggestion(kind, entity_id, name, city, state), keys)
+        for tier in TIERS:
+          arrays[(kind, tier)].extend(keys[tier])
+    for array in arrays.values():
+      array.sort()
+    return arrays, entries
+
+  def _build(self):
+    with self._lock:
+      self._pending = []
+    try:
+      arrays, entries = self._read()
+    except BaseException:
+      with self._lock:
+        self._pending = None
+      raise
+    with self._lock:
+      self._arrays, self._entries = arrays, entries
+      # a write committed after the read started may be missing from it
+      for update in self._pending:
+        update()
+      self._pending = None
+      self.built_at = time.monotonic()
+
+  def build(self):
+    with self._build_lock:
+      self._build()
+
+  def ensure_built(self):
+    # the first build; concurrent callers wait for it instead of repeating it
+    with self._build_lock:
+      if self.built_at is None:
+        self._build()
+
+  def refresh(self, app):
+    # rebuilds in a background thread, unless one is already at it
+    with self._lock:
+      if self._refreshing:
+        return
+      self._refreshing = True
+    threading.Thread(target=self._refresh, args=(app,), name='autocomplete-refresh', daemon=True).start()
+
+  def _refresh(self, app):
+    try:
+      with app.app_context():
+        try:
+          self.build()
+        finally:
+          db.session.remove()
+    except Exception:
+      app.logger.exception('Autocomplete index refresh failed')
+    finally:
+      with self._lock:
+        self._refreshing = False
+
+  def _remove(self, kind, entity_id):
+    entry = self._entries.pop((kind, entity_id), None)
+    if entry is not None:
+      for tier, keys in entry[1].items():
+        array = self._arrays[(kind, tier)]
+        for key in keys:
+          del array[bisect_left(array, key)]
+
+  def _add(self, kind, entity_id, suggestion, keys):
+    self._remove(kind, entity_id)
+    self._entries[(kind, entity_id)] = (suggestion, keys)
+    for tier, tier_keys in keys.items():
+      array = self._arrays[(kind, tier)]
+      for key in tier_keys:
+        insort(array, key)
+
+  def _update(self, update):
+    with self._lock:
+      update()
+      if self._pending is not None:
+        self._pending.append(update)
+
+  def add(self, kind, entity_id, name, city, state, genres):
+    # adds or replaces one venue or artist
+    suggestion = Suggestion(kind, entity_id, name, city, state)
+    keys = self._keys(entity_id, name, city, state, genres)
+    self._update(lambda: self._add(kind, entity_id, suggestion, keys))
+
+  def remove(self, kind, entity_id):
+    self._update(lambda: self._remove(kind, entity_id))
+
+  def lookup(self, term, kinds, limit):
+    prefix = normalize(term)
+    if not prefix:
+      return []
+    # (tier, key, suggestion) for up to limit entities of each kind
+    found = []
+    with self._lock:
+      for kind in kinds:
+        seen = set()
+        for tier_rank, tier in enumerate(TIERS):
+          array = self._arrays[(kind, tier)]
+          position = bisect_left(array, (prefix,))
+          while position < len(array) and len(seen) < limit:
+            key, _, entity_id = array[position]
+            if not key.startswith(prefix):
+              break
+            if entity_id not in seen:
+              seen.add(entity_id)
+              found.append((tier_rank, key, self._entries[(kind, entity_id)][0]))
+            position += 1
+    found.sort(key=lambda match: (match[0], match[1], (match[2].name or '').lower()))
+    return [suggestion for _, _, suggestion in found[:limit]]
+
+
+def init_app(app):
+  app.config.setdefault('AUTOCOMPLETE_LIMIT', 8)
+  app.config.setdefault('AUTOCOMPLETE_MAX_AGE', 300)
+  app.extensions['autocomplete'] = PrefixIndex()
+
+
+def warm(app):
+  # builds the index ahead of the first request
+  with app.app_context():
+    app.extensions['autocomplete'].build()
+    db.session.remove()
+
+
+def index():
+  prefix_index = current_app.extensions['autocomplete']
+  if prefix_index.built_at is None:
+    prefix_index.ensure_built()
+  elif time.monotonic() - prefix_index.built_at > current_app.config['AUTOCOMPLETE_MAX_AGE']:
+    prefix_index.refresh(current_app._get_current_object())
+  return prefix_index
+
+
+def update(kind, entity_id, form):
+  # after a venue or artist is committed, from the form it was saved from; a
+  # build in progress replays it, one that hasn't started will read it
+  current_app.extensions['autocomplete'].add(
+    kind, entity_id, form.name.data, form.city.data, form.state.data, form.genres.data)
+
+
+def remove(kind, entity_id):
+  current_app.extensions['autocomplete'].remove(kind, entity_id)
+
+
+blueprint = Blueprint('autocomplete', __name__)
+
+
+@blueprint.route('/autocomplete')
+def suggestions():
+  # ?q= and optionally ?type=venue or artist
+  kind = request.args.get('type')
+  kinds = (kind,) if kind in MODELS else tuple(MODELS)
+  suggestions = index().lookup(request.args.get('q', ''), kinds, current_app.config['AUTOCOMPLETE_LIMIT'])
+  response = jsonify([{
+    'type': suggestion.kind,
+    'id': suggestion.id,
+    'name': suggestion.name,
+    'city': suggestion.city,
+    'state': suggestion.state,
+    'url': url_for(f'{suggestion.kind}s.show_{suggestion.kind}', **{f'{suggestion.kind}_id': suggestion.id}),
+  } for suggestion in suggestions])
+  # typing back over a prefix asks for it again
+  response.cache_control.max_age = 30
+  response.cache_control.private = True
+  return response
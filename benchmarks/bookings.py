@@ -0,0 +1,90 @@
+"""Time the double-booking check on a large calendar.
+
+    python -m benchmarks.bookings --shows 300000 --checks 500
+
+The target database is wiped and seeded. Each check asks whether a show at a
+random venue, by a random artist, at a random time would overlap anything,
+once through bookings.conflicts() and once through the same query without the
+MAX_SHOW_MINUTES lower bound, which has to read every earlier show of the
+venue and the artist. Both must find the same shows. The residency case
+checks 52 weekly shows with bookings.find_conflicts() in one query, against
+one conflicts() call per week.
+"""
+import argparse
+import random
+import time
+import warnings
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, select
+
+import bookings
+from benchmarks.suite import build_app, prepare
+from models import db, Show
+
+
+def unbounded(venue_id, artist_id, start_time, duration_minutes):
+    end = start_time + timedelta(minutes=duration_minutes)
+    rows = db.session.execute(select(Show.id, Show.start_time, Show.duration_minutes).where(
+        or_(Show.venue_id == venue_id, Show.artist_id == artist_id), Show.start_time < end))
+    return {show_id for show_id, other_start, other_minutes in rows
+            if other_start + timedelta(minutes=other_minutes) > start_time}
+
+
+def timed(check, probes):
+    timings = []
+    found = []
+    for probe in probes:
+        started = time.perf_counter()
+        found.append(check(*probe))
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2], timings[int(len(timings) * 0.99)], found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', default='sqlite:///bench.db')
+    parser.add_argument('--venues', type=int, default=1000)
+    parser.add_argument('--artists', type=int, default=2000)
+    parser.add_argument('--shows', type=int, default=300000)
+    parser.add_argument('--checks', type=int, default=500)
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore', message='"flask_wtf.Form" has been renamed')
+
+    now = datetime.now()
+    app = build_app(args.database_url, False)
+    prepare(app, args.database_url, (args.venues, args.artists, args.shows), now)
+    rng = random.Random(57)
+    probes = [(rng.randint(1, args.venues), rng.randint(1, args.artists),
+               now + timedelta(hours=rng.randint(-2 * 365 * 24, 365 * 24)), rng.choice((60, 120, 180)))
+              for _ in range(args.checks)]
+    with app.app_context():
+        bounded_median, bounded_p99, bounded_found = timed(
+            lambda *probe: {conflict.show_id for conflict in bookings.conflicts(*probe)}, probes)
+        unbounded_median, unbounded_p99, unbounded_found = timed(unbounded, probes)
+        residencies = [[{'venue_id': venue_id, 'artist_id': artist_id, 'duration_minutes': duration,
+                         'start_time': start_time + timedelta(weeks=week)} for week in range(52)]
+                       for venue_id, artist_id, start_time, duration in probes[:50]]
+        batch_median, batch_p99, batch_found = timed(
+            lambda shows: {(index, conflict.show_id) for index, conflict in bookings.find_conflicts(shows)},
+            [(shows,) for shows in residencies])
+        weekly_median, weekly_p99, weekly_found = timed(
+            lambda shows: {(index, conflict.show_id) for index, show in enumerate(shows)
+                           for conflict in bookings.conflicts(**show)},
+            [(shows,) for shows in residencies])
+    if bounded_found != unbounded_found:
+        raise SystemExit('the bounded check found different shows')
+    if batch_found != weekly_found:
+        raise SystemExit('the batch check found different shows')
+    clashes = sum(bool(found) for found in bounded_found)
+    print(f'{args.shows} shows, {args.checks} checks, {clashes} with conflicts')
+    print(f'{"check":28} {"median ms":>10} {"p99 ms":>8}')
+    print(f'{"range scan, bounded":28} {bounded_median:10.3f} {bounded_p99:8.3f}')
+    print(f'{"range scan, unbounded":28} {unbounded_median:10.3f} {unbounded_p99:8.3f}')
+    print(f'{"52-week residency, batch":28} {batch_median:10.3f} {batch_p99:8.3f}')
+    print(f'{"52-week residency, weekly":28} {weekly_median:10.3f} {weekly_p99:8.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Time the `datetime` template filter against the one it replaced.
+
+    python -m benchmarks.datetime_format --shows 1000 --rounds 20
+
+The old pipeline formatted start_time with strftime in the view and the
+filter parsed it back with dateutil before formatting it with babel; the new
+one formats the datetime with a compiled pattern, optionally memoized. Each
+round formats one page of --shows start times, so memoized runs after the
+first round show what a re-rendered page costs.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from dates import DatetimeFormatter
+
+
+def legacy_format_datetime(value, format='medium'):
+    from babel.dates import format_datetime as babel_format_datetime
+    from dateutil.parser import parse
+    date = parse(value)
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel_format_datetime(date, format, locale='en')
+
+
+def start_times(count, random_seed=57):
+    rng = random.Random(random_seed)
+    base = datetime(2026, 1, 1)
+    return [base + timedelta(minutes=rng.randrange(60 * 24 * 730)) for _ in range(count)]
+
+
+def run(label, format_page, rounds):
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        format_page()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return label, timings[len(timings) // 2] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--shows', type=int, default=1000, help='start times per page')
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--format', default='full')
+    parser.add_argument('--memo-size', type=int, default=4096)
+    args = parser.parse_args()
+
+    values = start_times(args.shows)
+    strings = [value.strftime('%m/%d/%Y, %H:%M') for value in values]
+    plain = DatetimeFormatter()
+    memoized = DatetimeFormatter(memo_size=args.memo_size)
+
+    mismatches = sum(legacy_format_datetime(string, args.format) != plain(value, args.format)
+                     for string, value in zip(strings, values))
+    if mismatches:
+        raise SystemExit(f'{mismatches} values format differently from the old filter')
+
+    results = [
+        run('strftime + dateutil + babel (old)',
+            lambda: [legacy_format_datetime(value.strftime('%m/%d/%Y, %H:%M'), args.format) for value in values],
+            args.rounds),
+        run('compiled pattern',
+            lambda: [plain(value, args.format) for value in values], args.rounds),
+        run(f'compiled pattern, memo {args.memo_size}',
+            lambda: [memoized(value, args.format) for value in values], args.rounds),
+    ]
+    baseline = results[0][1]
+    print(f'{args.shows} start times, format {args.format!r}, median of {args.rounds} rounds')
+    print(f'{"pipeline":40} {"ms/page":>9} {"us/value":>9} {"speedup":>8}')
+    for label, page_ms in results:
+        print(f'{label:40} {page_ms:9.2f} {page_ms * 1000 / args.shows:9.2f} {baseline / page_ms:7.1f}x')
+    print(f'memo: {memoized.memo_info()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Compare query plans and timings with and without the lookup indexes.
+
+    python -m benchmarks.explain_indexes --shows 200000
+    python -m benchmarks.explain_indexes --database-url postgresql://localhost/fyyur_bench
+
+The target database is wiped and seeded. Every query is explained and timed
+once with the indexes from models.py dropped and once with them created, so
+the plans should change from full scans to index searches.
+"""
+import argparse
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, func, select, tuple_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from benchmarks.seed import seed
+from models import db, Artist, Show, Venue
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain)
+def _compile_explain(element, compiler, **kw):
+    if compiler.dialect.name == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    else:
+        prefix = 'EXPLAIN (ANALYZE, BUFFERS) '
+    return prefix + compiler.process(element.statement, **kw)
+
+
+def queries(now):
+    show = Show.__table__
+    venue = Venue.__table__
+    artist = Artist.__table__
+    return [
+        ('show_venue upcoming',
+         select(show.c.id, show.c.start_time).where(show.c.venue_id == 7).where(show.c.start_time > now)),
+        ('show_artist past',
+         select(show.c.id, show.c.start_time).where(show.c.artist_id == 7).where(show.c.start_time < now)),
+        ('search_venues upcoming count',
+         select(func.count()).select_from(show).where(show.c.venue_id == 7).where(show.c.start_time > now)),
+        ('venues city/state grouping',
+         select(venue.c.city, venue.c.state).group_by(venue.c.city, venue.c.state)),
+        ('venue name search',
+         select(venue.c.id, venue.c.name).where(venue.c.name.ilike('%marfin%'))),
+        ('artist name search',
+         select(artist.c.id, artist.c.name).where(artist.c.name.ilike('%marfin%'))),
+        ('/shows keyset page',
+         select(show.c.id, show.c.start_time)
+         .where(tuple_(show.c.start_time, show.c.id) < tuple_(now, 10 ** 9))
+         .order_by(show.c.start_time.desc(), show.c.id.desc()).limit(30)),
+    ]
+
+
+def indexes():
+    return [index for table in (Venue.__table__, Artist.__table__, Show.__table__)
+            for index in table.indexes]
+
+
+def run(engine, now, repeat):
+    results = {}
+    with engine.connect() as conn:
+        if engine.dialect.name == 'postgresql':
+            conn.exec_driver_sql('ANALYZE')
+        for label, stmt in queries(now):
+            plan = '\n'.join(' '.join(str(col) for col in row) for row in conn.execute(Explain(stmt)))
+            started = time.perf_counter()
+            for _ in range(repeat):
+                conn.execute(stmt).fetchall()
+            results[label] = ((time.perf_counter() - started) / repeat * 1000, plan)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', default='sqlite:///bench.db')
+    parser.add_argument('--venues', type=int, default=2000)
+    parser.add_argument('--artists', type=int, default=5000)
+    parser.add_argument('--shows', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    if engine.dialect.name == 'postgresql':
+        with engine.begin() as conn:
+            conn.exec_driver_sql('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    db.metadata.drop_all(engine)
+    db.metadata.create_all(engine)
+    now = datetime.now()
+    seed(engine, args.venues, args.artists, args.shows, now=now)
+
+    for index in indexes():
+        index.drop(engine)
+    before = run(engine, now, args.repeat)
+    for index in indexes():
+        index.create(engine)
+    after = run(engine, now, args.repeat)
+
+    for label in before:
+        before_ms, before_plan = before[label]
+        after_ms, after_plan = after[label]
+        print(f'== {label}: {before_ms:.3f} ms -> {after_ms:.3f} ms')
+        print('-- before')
+        print(before_plan)
+        print('-- after')
+        print(after_plan)
+        print()
+
+
+if __name__ == '__main__':
+    main()
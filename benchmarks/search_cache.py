@@ -0,0 +1,93 @@
+"""Replay skewed search traffic against the search result cache.
+
+    python -m benchmarks.search_cache --searches 3000 --sizes 0 64 256
+
+The target database is wiped and seeded. The replay draws venue and artist
+searches from --terms popular terms with Zipf-like weights plus a long tail
+of one-off terms (--tail of the searches), some of them for page 2, and edits
+a venue every --write-every searches, which makes every cached result stale.
+The same replay runs once per cache size (0 is no cache) and reports the
+median search time and the cache's hit rate.
+"""
+import argparse
+import random
+import statistics
+import time
+import warnings
+from datetime import datetime
+
+from benchmarks.suite import _venue_form, build_app, prepare
+from search import ResultCache
+
+SYLLABLES = ('mar', 'jaz', 'blu', 'ro', 'san', 'new', 'the', 'club', 'hall', 'bar', 'trio', 'band',
+             'fol', 'soul', 'fun', 'pop', 'hip', 'cla', 'cou', 'el', 'ha', 'lo', 'ca', 'de')
+
+
+def replay(args, rng):
+    popular = [rng.choice(SYLLABLES) + rng.choice(('', 'a', 'e', 'o', ' ' + rng.choice(SYLLABLES)))
+               for _ in range(args.terms)]
+    weights = [1 / rank for rank in range(1, len(popular) + 1)]
+    requests = []
+    for number in range(args.searches):
+        if args.write_every and number and number % args.write_every == 0:
+            requests.append(('write', rng.randint(1, args.venues)))
+        if rng.random() < args.tail:
+            term = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(3, 6)))
+        else:
+            term = rng.choices(popular, weights)[0]
+        # the occasional shouting or stray space, which the cache key folds
+        if rng.random() < 0.1:
+            term = term.upper() + ' '
+        requests.append((rng.choice(('venues', 'artists')), term, 2 if rng.random() < 0.1 else 1))
+    return requests
+
+
+def run(app, requests):
+    client = app.test_client()
+    timings = []
+    for request in requests:
+        if request[0] == 'write':
+            response = client.post(f'/venues/{request[1]}/edit', data=_venue_form(request[1]))
+        else:
+            kind, term, page = request
+            started = time.perf_counter()
+            response = client.post(f'/{kind}/search?page={page}', data={'search_term': term})
+            response.get_data()
+            timings.append((time.perf_counter() - started) * 1000)
+        response.close()
+        if response.status_code >= 400:
+            raise SystemExit(f'{request} returned {response.status_code}')
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', default='sqlite:///bench.db')
+    parser.add_argument('--venues', type=int, default=200)
+    parser.add_argument('--artists', type=int, default=400)
+    parser.add_argument('--shows', type=int, default=5000)
+    parser.add_argument('--searches', type=int, default=3000)
+    parser.add_argument('--terms', type=int, default=40)
+    parser.add_argument('--tail', type=float, default=0.2)
+    parser.add_argument('--write-every', type=int, default=200)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[0, 64, 256])
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore', message='"flask_wtf.Form" has been renamed')
+
+    app = build_app(args.database_url, False)
+    app.logger.disabled = True
+    prepare(app, args.database_url, (args.venues, args.artists, args.shows), datetime.now())
+    requests = replay(args, random.Random(57))
+    searches = sum(request[0] != 'write' for request in requests)
+    print(f'{searches} searches, {len(requests) - searches} writes, {args.terms} popular terms, '
+          f'{args.tail:.0%} long tail')
+    print(f'{"cache size":>10} {"median ms":>10} {"mean ms":>8} {"hit rate":>9}')
+    for size in args.sizes:
+        cache = app.extensions['search_cache'] = ResultCache(size, app.config['SEARCH_CACHE_TTL'])
+        timings = run(app, requests)
+        print(f'{size:10} {statistics.median(timings):10.3f} {statistics.mean(timings):8.3f} '
+              f'{cache.hit_rate():9.1%}')
+
+
+if __name__ == '__main__':
+    main()
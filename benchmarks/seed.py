@@ -0,0 +1,106 @@
+"""Seed a database with synthetic venues, artists and shows.
+
+Rows are generated from a fixed random seed so two runs against the same
+sizes produce the same data, and inserted with executemany in batches.
+"""
+import random
+from datetime import datetime, timedelta
+
+import counters
+from models import Artist, Genre, Show, Venue, artist_genres, venue_genres
+
+GENRES = ['Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk',
+          'Funk', 'Hip-Hop', 'Heavy Metal', 'Instrumental', 'Jazz',
+          'Musical Theatre', 'Pop', 'Punk', 'R&B', 'Reggae', 'Rock n Roll',
+          'Soul', 'Other']
+CITIES = [('New York', 'NY'), ('San Francisco', 'CA'), ('Los Angeles', 'CA'),
+          ('Chicago', 'IL'), ('Austin', 'TX'), ('Seattle', 'WA'),
+          ('Nashville', 'TN'), ('New Orleans', 'LA'), ('Boston', 'MA'),
+          ('Denver', 'CO')]
+SYLLABLES = ['ka', 'lo', 'mi', 'ne', 'ro', 'sa', 'tu', 'vi', 'za', 'bel',
+             'dor', 'fin', 'gar', 'hol', 'jun', 'mar', 'pen', 'quin', 'ster']
+BATCH_SIZE = 5000
+
+
+def _name(rng, suffix):
+    words = [''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).title()
+             for _ in range(rng.randint(1, 2))]
+    return ' '.join(words + [suffix])
+
+
+def _insert(conn, table, rows):
+    for i in range(0, len(rows), BATCH_SIZE):
+        conn.execute(table.insert(), rows[i:i + BATCH_SIZE])
+
+
+def seed(engine, venues=1000, artists=2000, shows=50000, random_seed=57, now=None):
+    rng = random.Random(random_seed)
+    now = now or datetime.now()
+    genre_ids = {name: i for i, name in enumerate(GENRES, 1)}
+    genre_rows = [{'id': i, 'name': name} for name, i in genre_ids.items()]
+    venue_rows = []
+    venue_genre_rows = []
+    for i in range(1, venues + 1):
+        city, state = rng.choice(CITIES)
+        names = rng.sample(GENRES, rng.randint(1, 3))
+        venue_genre_rows.extend({'venue_id': i, 'genre_id': genre_ids[name]} for name in names)
+        venue_rows.append({
+            'id': i,
+            'name': _name(rng, rng.choice(['Hall', 'Club', 'Lounge', 'Theatre', 'Bar'])),
+            'genres': ','.join(names),
+            'city': city,
+            'state': state,
+            'address': f'{rng.randint(1, 9999)} {_name(rng, "St")}',
+            'phone': f'{rng.randint(200, 999)}-{rng.randint(200, 999)}-{rng.randint(1000, 9999)}',
+            'seeking_talent': rng.random() < 0.3,
+        })
+    artist_rows = []
+    artist_genre_rows = []
+    for i in range(1, artists + 1):
+        city, state = rng.choice(CITIES)
+        names = rng.sample(GENRES, rng.randint(1, 3))
+        artist_genre_rows.extend({'artist_id': i, 'genre_id': genre_ids[name]} for name in names)
+        artist_rows.append({
+            'id': i,
+            'name': _name(rng, rng.choice(['Band', 'Trio', 'Quartet', 'Collective', 'Project'])),
+            'genres': ','.join(names),
+            'city': city,
+            'state': state,
+            'phone': f'{rng.randint(200, 999)}-{rng.randint(200, 999)}-{rng.randint(1000, 9999)}',
+            'seeking_venue': rng.random() < 0.3,
+        })
+    show_rows = []
+    # shows start on the hour and last one to three hours; a draw that would
+    # double-book its venue or artist is redrawn
+    busy = set()
+    while len(show_rows) < shows:
+        venue_id = rng.randint(1, venues)
+        artist_id = rng.randint(1, artists)
+        # two years of history, one year of bookings ahead
+        hour = rng.randint(-2 * 365 * 24, 365 * 24)
+        hours = range(hour, hour + rng.randint(1, 3))
+        slots = [('venue', venue_id, h) for h in hours] + [('artist', artist_id, h) for h in hours]
+        if busy.intersection(slots):
+            continue
+        busy.update(slots)
+        show_rows.append({
+            'id': len(show_rows) + 1,
+            'venue_id': venue_id,
+            'artist_id': artist_id,
+            'start_time': (now + timedelta(hours=hour)).replace(minute=0, second=0, microsecond=0),
+            'duration_minutes': len(hours) * 60,
+        })
+    with engine.begin() as conn:
+        _insert(conn, Genre.__table__, genre_rows)
+        _insert(conn, Venue.__table__, venue_rows)
+        _insert(conn, venue_genres, venue_genre_rows)
+        _insert(conn, Artist.__table__, artist_rows)
+        _insert(conn, artist_genres, artist_genre_rows)
+        _insert(conn, Show.__table__, show_rows)
+        counters.reset(conn, now)
+        if engine.dialect.name == 'postgresql':
+            # explicit ids leave the serial sequences behind
+            for table in (Genre.__table__, Venue.__table__, Artist.__table__, Show.__table__):
+                conn.exec_driver_sql(
+                    f"SELECT setval(pg_get_serial_sequence('\"{table.name}\"', 'id'), "
+                    f'(SELECT max(id) FROM "{table.name}"))')
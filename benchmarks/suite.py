@@ -0,0 +1,419 @@
+"""Benchmark every route through the Flask test client.
+
+    python -m benchmarks.suite
+    python -m benchmarks.suite --scale medium --requests 100
+    python -m benchmarks.suite --database-url postgresql://localhost/fyyur_bench
+    python -m benchmarks.suite --update-baseline
+
+Each target database is wiped and seeded from a fixed random seed
+(benchmarks/seed.py), then every route is requested --warmup times and timed
+--requests times. For each route the run records p50/p95/p99 latency, the
+number of SQL statements one request executes and the peak Python memory
+allocated while serving it (tracemalloc).
+
+Results are compared against benchmarks/baseline.json, keyed by dialect and
+data volumes. More statements than the baseline, a median above
+baseline * --tolerance (plus --slack-ms) or a memory peak above
+baseline * --tolerance is a regression and the run exits with status 1.
+The tail percentiles are reported but not gated on; with a few dozen samples
+they move with whatever else the machine is doing.
+
+SQLite schemas come from models.py, so search uses the in-process index;
+PostgreSQL is migrated with `flask db upgrade` so the full-text and trigram
+indexes exist. --with-postgres adds BENCH_POSTGRES_URL (or
+postgresql://localhost/fyyur_bench) to the run when it accepts connections.
+The page cache and the search result cache are off unless --page-cache is
+given, so detail pages and searches measure the queries rather than a
+dictionary lookup.
+
+Cold start is measured in fresh interpreters: importing app, create_app() and
+the first /venues request. Its times are reported next to the baseline but
+not gated on, as they depend on the machine far more than the routes' do;
+loading any of LAZY_MODULES before the first form or date is rendered counts
+as a regression, and so does a total over --startup-budget-ms when given.
+"""
+import argparse
+import itertools
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import warnings
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
+
+from benchmarks.seed import seed
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+POSTGRES_URL = os.environ.get('BENCH_POSTGRES_URL', 'postgresql://localhost/fyyur_bench')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAZY_MODULES = ('wtforms', 'flask_wtf', 'babel.dates', 'dateutil.parser')
+STARTUP_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app({'SQLALCHEMY_DATABASE_URI': sys.argv[1], 'SECRET_KEY': 'benchmark'})
+created = time.perf_counter()
+loaded = [name for name in sys.argv[2:] if name in sys.modules]
+application.test_client().get('/venues').get_data()
+served = time.perf_counter()
+print(json.dumps({'import_ms': (imported - started) * 1000, 'create_ms': (created - imported) * 1000,
+                  'first_request_ms': (served - created) * 1000, 'total_ms': (served - started) * 1000,
+                  'loaded': loaded}))
+"""
+SCALES = {
+    'small': (200, 400, 5000),
+    'medium': (1000, 2000, 50000),
+    'large': (5000, 10000, 500000),
+}
+
+
+def _venue_form(venue_id):
+    return {
+        'name': f'Benchmark Hall {venue_id}', 'city': 'Austin', 'state': 'TX',
+        'address': '1 Main St', 'phone': '512-555-0100', 'genres': ['Jazz', 'Blues'],
+        'image_link': 'https://example.com/venue.png', 'facebook_link': 'https://facebook.com/bench',
+        'website_link': 'https://example.com', 'seeking_description': '',
+    }
+
+
+def _artist_form(artist_id):
+    return {
+        'name': f'Benchmark Trio {artist_id}', 'city': 'Austin', 'state': 'TX',
+        'phone': '512-555-0101', 'genres': ['Jazz'],
+        'image_link': 'https://example.com/artist.png', 'facebook_link': 'https://facebook.com/bench',
+        'website_link': 'https://example.com', 'seeking_description': '',
+    }
+
+
+def _show_form(now):
+    # a new slot per request, past the seeded calendar, so every run books a show
+    slots = itertools.count()
+
+    def data():
+        start_time = now + timedelta(days=400, hours=3 * next(slots))
+        return {'venue_id': '1', 'artist_id': '1', 'duration_minutes': '120',
+                'start_time': start_time.strftime('%Y-%m-%d %H:%M:%S')}
+    return data
+
+
+def _residency_form(now):
+    # a 52-week residency per request, each in a year of its own
+    years = itertools.count()
+
+    def data():
+        start_time = now + timedelta(days=400 + 371 * next(years))
+        return {'venue_id': '2', 'artist_id': '2', 'duration_minutes': '120', 'repeat': 'weekly',
+                'start_time': start_time.strftime('%Y-%m-%d %H:%M:%S'),
+                'repeat_until': (start_time + timedelta(weeks=51)).strftime('%Y-%m-%d')}
+    return data
+
+
+def _batch_form(now):
+    # five shows a request at venue 3 by artist 3, a day per request
+    days = itertools.count()
+
+    def data():
+        start_time = now + timedelta(days=400 + next(days))
+        rows = {}
+        for row in range(5):
+            rows.update({
+                f'shows-{row}-venue_id': '3', f'shows-{row}-artist_id': '3', f'shows-{row}-duration_minutes': '120',
+                f'shows-{row}-start_time': (start_time + timedelta(hours=3 * row)).strftime('%Y-%m-%d %H:%M:%S'),
+            })
+        return rows
+    return data
+
+
+def _venue_to_delete(venues):
+    # one of the venues 'create venue' added per request; seeded ones have shows, which a venue can't be deleted with
+    venue_ids = itertools.count(venues + 1)
+    return lambda: f'/venues/{next(venue_ids)}'
+
+
+def routes(now, venues):
+    # (label, method, path or a function returning it, form data or a function returning it); writes come last so
+    # the reads see the seeded data
+    return [
+        ('home', 'GET', '/', None),
+        ('venues', 'GET', '/venues', None),
+        ('venues by genre', 'GET', '/venues?genre=Jazz', None),
+        ('artists', 'GET', '/artists', None),
+        ('shows', 'GET', '/shows', None),
+        ('shows 100', 'GET', '/shows?per_page=100', None),
+        ('show venue', 'GET', '/venues/1', None),
+        ('show artist', 'GET', '/artists/1', None),
+        ('venue past shows', 'GET', '/venues/1/past-shows', None),
+        ('venue calendar', 'GET', '/venues/1/calendar', None),
+        ('artist calendar', 'GET', '/artists/1/calendar', None),
+        ('venue feed', 'GET', '/venues/1/calendar.ics', None),
+        ('artist feed', 'GET', '/artists/1/calendar.ics', None),
+        ('search venues', 'POST', '/venues/search', {'search_term': 'mar'}),
+        ('search artists', 'POST', '/artists/search', {'search_term': 'mar'}),
+        ('search venues page 2', 'GET', '/venues/search?search_term=a&page=2', None),
+        ('autocomplete', 'GET', '/autocomplete?q=mar', None),
+        ('create venue form', 'GET', '/venues/create', None),
+        ('create artist form', 'GET', '/artists/create', None),
+        ('create show form', 'GET', '/shows/create', None),
+        ('create batch form', 'GET', '/shows/create-batch', None),
+        ('edit venue form', 'GET', '/venues/1/edit', None),
+        ('edit artist form', 'GET', '/artists/1/edit', None),
+        ('api shows page', 'GET', '/api/v1/shows?limit=100', None),
+        ('api venues page', 'GET', '/api/v1/venues?limit=100', None),
+        ('api artists page', 'GET', '/api/v1/artists?limit=100', None),
+        ('api venue', 'GET', '/api/v1/venues/1', None),
+        ('api artist', 'GET', '/api/v1/artists/1', None),
+        ('metrics', 'GET', '/metrics', None),
+        ('create venue', 'POST', '/venues/create', _venue_form('new')),
+        ('create artist', 'POST', '/artists/create', _artist_form('new')),
+        ('edit venue', 'POST', '/venues/1/edit', _venue_form(1)),
+        ('edit artist', 'POST', '/artists/1/edit', _artist_form(1)),
+        ('create show', 'POST', '/shows/create', _show_form(now)),
+        ('create residency', 'POST', '/shows/create', _residency_form(now)),
+        ('create show batch', 'POST', '/shows/create-batch', _batch_form(now)),
+        ('delete venue', 'DELETE', _venue_to_delete(venues), None),
+    ]
+
+
+def percentile(sorted_values, pct):
+    # nearest rank
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def prepare(app, url, volumes, now):
+    from flask_migrate import upgrade
+    from models import db
+
+    engine = create_engine(url)
+    if engine.dialect.name == 'postgresql':
+        with engine.begin() as conn:
+            conn.exec_driver_sql('DROP TABLE IF EXISTS alembic_version')
+        db.metadata.drop_all(engine)
+        with app.app_context():
+            upgrade()
+    else:
+        db.metadata.drop_all(engine)
+        db.metadata.create_all(engine)
+    seed(engine, *volumes, now=now)
+    engine.dispose()
+
+
+def build_app(url, page_cache):
+    import genres
+    from app import create_app
+
+    genres.invalidate_choices()
+    return create_app({
+        'SQLALCHEMY_DATABASE_URI': url,
+        'SECRET_KEY': 'benchmark',
+        'WTF_CSRF_ENABLED': False,
+        'PAGE_CACHE': 'memory' if page_cache else 'null',
+        'SEARCH_CACHE_SIZE': 256 if page_cache else 0,
+        'TESTING': True,
+    })
+
+
+def measure_startup(url, runs):
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT, url, *LAZY_MODULES],
+                                cwd=ROOT, check=True, capture_output=True, text=True).stdout
+        samples.append(json.loads(output.splitlines()[-1]))
+    result = {key: round(statistics.median(sample[key] for sample in samples), 1)
+              for key in ('import_ms', 'create_ms', 'first_request_ms', 'total_ms')}
+    result['loaded'] = sorted({name for sample in samples for name in sample['loaded']})
+    return result
+
+
+def compare_startup(result, budget_ms):
+    regressions = []
+    if result['loaded']:
+        regressions.append(f'startup imports {", ".join(result["loaded"])}')
+    if budget_ms is not None and result['total_ms'] > budget_ms:
+        regressions.append(f'startup {result["total_ms"]:.0f} ms, budget {budget_ms:.0f} ms')
+    return regressions
+
+
+def measure(app, label, method, path, data, warmup, requests):
+    from models import db
+
+    client = app.test_client()
+    statements = []
+
+    def call():
+        url = path() if callable(path) else path
+        response = client.open(url, method=method, data=data() if callable(data) else data)
+        response.get_data()
+        response.close()
+        if response.status_code >= 400:
+            raise SystemExit(f'{label}: {method} {url} returned {response.status_code}')
+
+    with app.app_context():
+        engine = db.engine
+    listener = lambda *args: statements.append(1)  # noqa: E731
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        for _ in range(warmup):
+            call()
+        timings = []
+        for _ in range(requests):
+            statements.clear()
+            started = time.perf_counter()
+            call()
+            timings.append((time.perf_counter() - started) * 1000)
+        count = len(statements)
+        tracemalloc.start()
+        try:
+            call()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+
+    timings.sort()
+    return {
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'statements': count,
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def compare(results, baseline, tolerance, slack_ms):
+    regressions = []
+    for label, result in results.items():
+        base = baseline.get(label)
+        if base is None:
+            continue
+        if result['statements'] > base['statements']:
+            regressions.append(f'{label}: {result["statements"]} statements, baseline {base["statements"]}')
+        if result['p50_ms'] > base['p50_ms'] * tolerance + slack_ms:
+            regressions.append(f'{label}: p50 {result["p50_ms"]:.2f} ms, baseline {base["p50_ms"]:.2f} ms')
+        if result['peak_kib'] > base['peak_kib'] * tolerance:
+            regressions.append(f'{label}: peak {result["peak_kib"]:.0f} KiB, baseline {base["peak_kib"]:.0f} KiB')
+    return regressions
+
+
+def report(profile, results, baseline):
+    print(f'== {profile}')
+    print(f'{"route":<24} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"stmts":>6} {"peak KiB":>9}  baseline p50/stmts')
+    for label, result in results.items():
+        base = baseline.get(label)
+        against = f'{base["p50_ms"]:.2f}/{base["statements"]}' if base else '-'
+        print(f'{label:<24} {result["p50_ms"]:>9.2f} {result["p95_ms"]:>9.2f} {result["p99_ms"]:>9.2f}'
+              f' {result["statements"]:>6} {result["peak_kib"]:>9.0f}  {against}')
+    print()
+
+
+def report_startup(result, baseline):
+    against = f'  baseline {baseline["total_ms"]:.0f} ms' if baseline else ''
+    print(f'== cold start: import {result["import_ms"]:.0f} ms, create_app {result["create_ms"]:.0f} ms, '
+          f'first request {result["first_request_ms"]:.0f} ms, total {result["total_ms"]:.0f} ms{against}')
+    if result['loaded']:
+        print(f'   loaded at startup: {", ".join(result["loaded"])}')
+    print()
+
+
+def reachable(url):
+    engine = create_engine(url)
+    try:
+        with engine.connect():
+            return True
+    except (OperationalError, ImportError):
+        return False
+    finally:
+        engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', action='append',
+                        help='Database to benchmark, repeatable [default: sqlite:///bench.db].')
+    parser.add_argument('--with-postgres', action='store_true',
+                        help='Also benchmark BENCH_POSTGRES_URL when it accepts connections.')
+    parser.add_argument('--scale', choices=list(SCALES), default='small')
+    parser.add_argument('--venues', type=int)
+    parser.add_argument('--artists', type=int)
+    parser.add_argument('--shows', type=int)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--page-cache', action='store_true', help='Keep the venue/artist page cache and the search result cache on.')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='Store this run as the baseline instead of comparing against it.')
+    parser.add_argument('--tolerance', type=float, default=1.5,
+                        help='Allowed median latency and peak memory ratio over the baseline.')
+    parser.add_argument('--slack-ms', type=float, default=2.0,
+                        help='Absolute median allowance on top of --tolerance, for sub-millisecond routes.')
+    parser.add_argument('--startup-runs', type=int, default=5, help='Fresh interpreters to time the cold start in.')
+    parser.add_argument('--startup-budget-ms', type=float,
+                        help='Cold start (import, create_app, first request) must finish within this on this machine.')
+    parser.add_argument('--output', help='Also write the results to this JSON file.')
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore', message='"flask_wtf.Form" has been renamed')
+
+    urls = args.database_url or ['sqlite:///bench.db']
+    if args.with_postgres:
+        if reachable(POSTGRES_URL):
+            urls.append(POSTGRES_URL)
+        else:
+            print(f'skipping PostgreSQL: {POSTGRES_URL} is not reachable\n')
+    scale = SCALES[args.scale]
+    volumes = (args.venues or scale[0], args.artists or scale[1], args.shows or scale[2])
+
+    stored = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            stored = json.load(f)
+
+    now = datetime.now().replace(minute=0, second=0, microsecond=0)
+    runs = {}
+    regressions = []
+    for url in urls:
+        app = build_app(url, args.page_cache)
+        prepare(app, url, volumes, now)
+        if 'startup' not in runs:
+            runs['startup'] = measure_startup(url, args.startup_runs)
+            report_startup(runs['startup'], stored.get('startup'))
+            if not args.update_baseline:
+                regressions.extend(compare_startup(runs['startup'], args.startup_budget_ms))
+        profile = f'{create_engine(url).dialect.name}:{"/".join(map(str, volumes))}'
+        results = {label: measure(app, label, method, path, data, args.warmup, args.requests)
+                   for label, method, path, data in routes(now, volumes[0])}
+        runs[profile] = results
+        baseline = stored.get(profile, {})
+        report(profile, results, baseline)
+        if not args.update_baseline:
+            regressions.extend(f'{profile} {line}' for line in
+                               compare(results, baseline, args.tolerance, args.slack_ms))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(runs, f, indent=2, sort_keys=True)
+    if args.update_baseline:
+        stored.update(runs)
+        with open(args.baseline, 'w') as f:
+            json.dump(stored, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'baseline written to {args.baseline}')
+        return
+    if regressions:
+        print('regressions:')
+        for line in regressions:
+            print(f'  {line}')
+        raise SystemExit(1)
+    print('no regressions against the baseline')
+
+
+if __name__ == '__main__':
+    main()
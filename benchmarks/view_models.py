@@ -0,0 +1,162 @@
+"""Compare the read models with the ORM hydration and dict copies they replaced.
+
+    python -m benchmarks.view_models --shows 20000 --rows 1000
+
+The target database is wiped and seeded. Each case builds the same data for
+a template twice: the old way (ORM objects, lazy-loaded relationships, a
+dict per row) and through the column selects and named tuples in
+viewmodels.py. The detail pages use the venue and the artist with the most
+shows. Times are medians over --rounds; peak memory is measured with
+tracemalloc on one extra build.
+"""
+import argparse
+import statistics
+import time
+import tracemalloc
+import warnings
+from datetime import datetime
+
+from sqlalchemy import event, func
+
+from benchmarks.suite import build_app, prepare
+from models import db, Artist, Show, Venue
+from pages import artist_page_data, venue_page_data
+from viewmodels import ShowTile, SHOW_TILE_COLUMNS
+
+
+def legacy_shows(limit):
+    rows = db.session.query(
+        Show.id,
+        Show.start_time,
+        Venue.id.label('venue_id'),
+        Venue.name.label('venue_name'),
+        Artist.id.label('artist_id'),
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link')
+    ).join(Venue, Show.venue_id == Venue.id).join(Artist, Show.artist_id == Artist.id)\
+        .order_by(Show.start_time.desc(), Show.id.desc()).limit(limit).all()
+    return [{
+        'venue_id': row.venue_id,
+        'venue_name': row.venue_name,
+        'artist_id': row.artist_id,
+        'artist_name': row.artist_name,
+        'artist_image_link': row.artist_image_link,
+        'start_time': row.start_time,
+    } for row in rows]
+
+
+def read_model_shows(limit):
+    query = db.session.query(*SHOW_TILE_COLUMNS).join(Venue, Show.venue_id == Venue.id)\
+        .join(Artist, Show.artist_id == Artist.id).order_by(Show.start_time.desc(), Show.id.desc()).limit(limit)
+    return list(map(ShowTile._make, query))
+
+
+def legacy_venue_page(venue_id):
+    venue = Venue.query.get_or_404(venue_id)
+    now = datetime.now()
+    past_shows, upcoming_shows = [], []
+    for show in db.session.query(Show).join(Artist).filter(Show.venue_id == venue_id):
+        data = {
+            'artist_id': show.artist_id,
+            'artist_name': show.listArtists.name,
+            'artist_image_link': show.listArtists.image_link,
+            'start_time': show.start_time,
+        }
+        (past_shows if show.start_time <= now else upcoming_shows).append(data)
+    return {
+        'id': venue.id, 'name': venue.name, 'genres': [genre.name for genre in venue.genre_list],
+        'address': venue.address, 'city': venue.city, 'state': venue.state, 'phone': venue.phone,
+        'website_link': venue.website_link, 'facebook_link': venue.facebook_link,
+        'seeking_talent': venue.seeking_talent, 'seeking_description': venue.seeking_description,
+        'image_link': venue.image_link, 'past_shows': past_shows, 'upcoming_shows': upcoming_shows,
+        'past_shows_count': len(past_shows), 'upcoming_shows_count': len(upcoming_shows),
+    }
+
+
+def legacy_artist_page(artist_id):
+    artist = Artist.query.get_or_404(artist_id)
+    now = datetime.now()
+    past_shows, upcoming_shows = [], []
+    for show in artist.shows:
+        data = {
+            'venue_id': show.venue_id,
+            'venue_name': show.listVenues.name,
+            'venue_image_link': show.listVenues.image_link,
+            'start_time': show.start_time,
+        }
+        (past_shows if show.start_time <= now else upcoming_shows).append(data)
+    return {
+        'id': artist.id, 'name': artist.name, 'genres': [genre.name for genre in artist.genre_list],
+        'city': artist.city, 'phone': artist.phone, 'website_link': artist.website_link,
+        'facebook_link': artist.facebook_link, 'seeking_venue': artist.seeking_venue,
+        'seeking_description': artist.seeking_description, 'image_link': artist.image_link,
+        'upcoming_shows': upcoming_shows, 'past_shows': past_shows,
+        'upcoming_shows_count': len(upcoming_shows), 'past_shows_count': len(past_shows),
+    }
+
+
+def busiest(column):
+    return db.session.query(column).group_by(column).order_by(func.count().desc()).limit(1).scalar()
+
+
+def measure(build, rounds):
+    statements = []
+    listener = lambda *args: statements.append(1)  # noqa: E731
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        timings = []
+        for _ in range(rounds):
+            db.session.remove()
+            statements.clear()
+            started = time.perf_counter()
+            build()
+            timings.append((time.perf_counter() - started) * 1000)
+        count = len(statements)
+        db.session.remove()
+        tracemalloc.start()
+        try:
+            build()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    return statistics.median(timings), peak / 1024, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', default='sqlite:///bench.db')
+    parser.add_argument('--venues', type=int, default=200)
+    parser.add_argument('--artists', type=int, default=400)
+    parser.add_argument('--shows', type=int, default=20000)
+    parser.add_argument('--rows', type=int, default=1000, help='shows listed in the listing case')
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore', message='"flask_wtf.Form" has been renamed')
+
+    app = build_app(args.database_url, False)
+    prepare(app, args.database_url, (args.venues, args.artists, args.shows), datetime.now())
+    with app.test_request_context():
+        venue_id = busiest(Show.venue_id)
+        artist_id = busiest(Show.artist_id)
+        cases = [
+            (f'shows listing ({args.rows} rows)',
+             lambda: legacy_shows(args.rows), lambda: read_model_shows(args.rows)),
+            (f'venue page ({venue_id})',
+             lambda: legacy_venue_page(venue_id), lambda: venue_page_data(venue_id)),
+            (f'artist page ({artist_id})',
+             lambda: legacy_artist_page(artist_id), lambda: artist_page_data(artist_id)),
+        ]
+        print(f'{"case":28} {"":12} {"ms":>8} {"peak KiB":>9} {"stmts":>6}')
+        for label, legacy, read_model in cases:
+            old = measure(legacy, args.rounds)
+            new = measure(read_model, args.rounds)
+            for name, (ms, kib, count) in (('ORM + dicts', old), ('read models', new)):
+                print(f'{label:28} {name:12} {ms:8.2f} {kib:9.1f} {count:6}')
+                label = ''
+            print(f'{"":28} {"ratio":12} {old[0] / new[0]:7.1f}x {old[1] / new[1]:8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+from bisect import bisect_left
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import bindparam, literal, select, union_all
+from sqlalchemy.exc import IntegrityError
+
+import counters
+import importer
+from models import db, Artist, Show, Venue, MAX_SHOW_MINUTES
+
+# Double-booking checks for new shows.
+# A show occupies [start_time, start_time + duration_minutes). Two shows at the
+# same venue, or by the same artist, may not overlap. Shows last at most
+# MAX_SHOW_MINUTES, so any show overlapping [start, end) starts after
+# start - MAX_SHOW_MINUTES and before end: for each side the check is one range
+# scan of ix_Show_venue_id_start_time / ix_Show_artist_id_start_time covering
+# at most a day and a bit of that venue's or artist's calendar, however many
+# shows it has in total. A batch of shows is checked with the same query, over
+# the batch's venues and artists and the span from its first to its last show;
+# the candidates are matched to the new shows in Python.
+# On PostgreSQL the same rule is also enforced by exclusion constraints over
+# tsrange(start_time, end) (see the migration), which closes the race between
+# two concurrent bookings; elsewhere the check runs after the insert, so the
+# write lock SQLite takes for the insert is held until the commit.
+
+EXCLUSION_VIOLATION = '23P01'
+
+# recurrence rule -> dateutil relativedelta arguments for one step
+RECURRENCES = {
+  'weekly': {'weeks': 1},
+  'monthly': {'months': 1},
+}
+
+Conflict = namedtuple('Conflict', 'kind show_id start_time end_time venue_name artist_name')
+
+
+def _side_statement(kind, owner_column):
+  return select(
+    literal(kind).label('kind'), owner_column, Show.id, Show.start_time, Show.duration_minutes, Venue.name,
+    Artist.name,
+  ).join_from(Show, Venue, Show.venue_id == Venue.id).join(Artist, Show.artist_id == Artist.id).where(
+    owner_column.in_(bindparam(f'{kind}_ids', expanding=True)),
+    Show.start_time > bindparam('earliest'),
+    Show.start_time < bindparam('latest'),
+    Show.id.not_in(bindparam('exclude_ids', expanding=True)),
+  )
+
+
+# built once; bound per check
+CONFLICTS = union_all(_side_statement('venue', Show.venue_id), _side_statement('artist', Show.artist_id))
+
+
+def _end(show):
+  return show['start_time'] + timedelta(minutes=show['duration_minutes'])
+
+
+def find_conflicts(shows, exclude_ids=(), conn=None):
+  # (index, Conflict) for every stored show that one of shows, mappings with
+  # venue_id, artist_id, start_time and duration_minutes, would overlap; read
+  # through conn when given, otherwise the session
+  if not shows:
+    return []
+  rows = (conn or db.session).execute(CONFLICTS, {
+    'venue_ids': sorted({show['venue_id'] for show in shows}),
+    'artist_ids': sorted({show['artist_id'] for show in shows}),
+    'earliest': min(show['start_time'] for show in shows) - timedelta(minutes=MAX_SHOW_MINUTES),
+    'latest': max(_end(show) for show in shows),
+    'exclude_ids': list(exclude_ids),
+  })
+  # (kind, owner id) -> stored shows in start order
+  stored = {}
+  for kind, owner_id, show_id, start_time, minutes, venue_name, artist_name in rows:
+    stored.setdefault((kind, owner_id), []).append(
+      Conflict(kind, show_id, start_time, start_time + timedelta(minutes=minutes), venue_name, artist_name))
+  starts = {}
+  for key, others in stored.items():
+    others.sort(key=lambda other: other.start_time)
+    starts[key] = [other.start_time for other in others]
+
+  found = []
+  for index, show in enumerate(shows):
+    end = _end(show)
+    for kind in ('venue', 'artist'):
+      key = (kind, show[f'{kind}_id'])
+      others = stored.get(key, ())
+      # the stored shows starting before this one ends, latest first, back to
+      # the longest a show can last
+      for position in range(bisect_left(starts.get(key, ()), end) - 1, -1, -1):
+        other = others[position]
+        if other.start_time <= show['start_time'] - timedelta(minutes=MAX_SHOW_MINUTES):
+          break
+        if other.end_time > show['start_time']:
+          found.append((index, other))
+  found.sort(key=lambda item: (item[0], item[1].kind != 'venue', item[1].start_time))
+  return found
+
+
+def conflicts(venue_id, artist_id, start_time, duration_minutes, exclude_id=None):
+  # the shows that a show with these values would overlap, venue clashes first
+  show = {'venue_id': venue_id, 'artist_id': artist_id, 'start_time': start_time,
+          'duration_minutes': duration_minutes}
+  return [conflict for _, conflict in find_conflicts([show], [exclude_id] if exclude_id else [])]
+
+
+def overlaps_within(shows):
+  # (index, index) pairs, lower index first, of shows in a batch that overlap
+  # each other: per venue and per artist, each show in start order against
+  # the earlier ones still running when it starts (not just the one before,
+  # which a long show can outlast)
+  pairs = set()
+  for key in ('venue_id', 'artist_id'):
+    order = sorted(range(len(shows)), key=lambda index: (shows[index][key], shows[index]['start_time']))
+    owner, running = None, []
+    for index in order:
+      show = shows[index]
+      if show[key] != owner:
+        owner, running = show[key], []
+      running = [other for other in running if _end(shows[other]) > show['start_time']]
+      pairs.update((min(other, index), max(other, index)) for other in running)
+      running.append(index)
+  return sorted(pairs)
+
+
+def occurrences(start_time, rule, until, limit):
+  # start_time and each step of rule after it up to the end of the until date;
+  # monthly steps are counted from the first show, so the 31st falls back to
+  # the last day of shorter months. None past limit shows.
+  from dateutil.relativedelta import relativedelta
+  step = relativedelta(**RECURRENCES[rule])
+  last = datetime.combine(until, time.max)
+  times = []
+  while len(times) <= limit:
+    occurrence = start_time + step * len(times)
+    if occurrence > last:
+      return times
+    times.append(occurrence)
+  return None
+
+
+def _when(conflict):
+  end_format = '%H:%M' if conflict.end_time.date() == conflict.start_time.date() else '%Y-%m-%d %H:%M'
+  return f'from {conflict.start_time:%Y-%m-%d %H:%M} to {conflict.end_time.strftime(end_format)}'
+
+
+def message(conflict):
+  if conflict.kind == 'venue':
+    return f'{conflict.venue_name} already has a show by {conflict.artist_name} {_when(conflict)}.'
+  return f'{conflict.artist_name} is already playing {conflict.venue_name} {_when(conflict)}.'
+
+
+def is_overlap_violation(error):
+  return getattr(error.orig, 'pgcode', None) == EXCLUSION_VIOLATION
+
+
+def book(show):
+  # Adds show to the session and flushes it. Returns the conflicts that kept
+  # it out, after rolling back, or an empty list; the caller commits.
+  values = (show.venue_id, show.artist_id, show.start_time, show.duration_minutes)
+  db.session.add(show)
+  try:
+    db.session.flush()
+  except IntegrityError as e:
+    if not is_overlap_violation(e):
+      raise
+    db.session.rollback()
+    return conflicts(*values)
+  if db.session.connection().dialect.name == 'postgresql':
+    return []
+  found = conflicts(*values, exclude_id=show.id)
+  if found:
+    db.session.rollback()
+  return found
+
+
+def book_all(shows):
+  # Inserts shows, mappings as for find_conflicts(), with one executemany and
+  # one conflict check, and adjusts the show counters. Returns (index,
+  # Conflict) for the stored shows that kept the batch out, after rolling
+  # back, or an empty list; the caller checks overlaps_within() first and
+  # commits.
+  table = Show.__table__
+  conn = db.session.connection()
+  postgresql = conn.dialect.name == 'postgresql'
+  if not postgresql:
+    # ids up front, so the check can leave the batch itself out
+    for show, show_id in zip(shows, importer.allocate_ids(conn, table, len(shows))):
+      show['id'] = show_id
+  try:
+    conn.execute(table.insert(), shows)
+  except IntegrityError as e:
+    if not is_overlap_violation(e):
+      raise
+    db.session.rollback()
+    return find_conflicts(shows)
+  if not postgresql:
+    found = find_conflicts(shows, [show['id'] for show in shows])
+    if found:
+      db.session.rollback()
+      return found
+  # Core inserts skip the Show mapper events that keep the counters
+  counters.adjust(conn, shows)
+  return []
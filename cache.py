@@ -0,0 +1,178 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from flask import current_app
+
+from database import use_replica
+from models import db, Show
+
+# Read-through cache for the venue/artist detail page data.
+# Entries are keyed by (kind, id) and dropped explicitly by the controllers
+# that change them. They also expire at the next upcoming show start they
+# contain, because that is when the past/upcoming split changes, and never
+# outlive PAGE_CACHE_TTL so per-process stores converge across workers.
+# Pages built from a read replica are served but not stored: the replica may
+# lag behind a write that has just dropped the entry, and every client,
+# including the writer pinned to the primary, would get the old page back.
+
+
+class MemoryStore:
+  # in-process LRU bounded to max_entries
+
+  def __init__(self, max_entries=1024):
+    self.max_entries = max_entries
+    self._entries = OrderedDict()
+    self._lock = threading.Lock()
+
+  def get(self, key):
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None:
+        return None
+      expires_at, value = entry
+      if expires_at <= time.time():
+        del self._entries[key]
+        return None
+      self._entries.move_to_end(key)
+      return value
+
+  def set(self, key, value, ttl):
+    with self._lock:
+      self._entries[key] = (time.time() + ttl, value)
+      self._entries.move_to_end(key)
+      while len(self._entries) > self.max_entries:
+        self._entries.popitem(last=False)
+
+  def delete(self, *keys):
+    with self._lock:
+      for key in keys:
+        self._entries.pop(key, None)
+
+
+class RedisStore:
+  # any client with redis-py's get/set/delete; eviction and the size bound are
+  # left to the server (maxmemory + maxmemory-policy allkeys-lru)
+
+  def __init__(self, client, prefix='fyyur:page:'):
+    self.client = client
+    self.prefix = prefix
+
+  def get(self, key):
+    value = self.client.get(self.prefix + key)
+    return None if value is None else pickle.loads(value)
+
+  def set(self, key, value, ttl):
+    self.client.set(self.prefix + key, pickle.dumps(value), px=max(int(ttl * 1000), 1))
+
+  def delete(self, *keys):
+    if keys:
+      self.client.delete(*(self.prefix + key for key in keys))
+
+
+class NullStore:
+
+  def get(self, key):
+    return None
+
+  def set(self, key, value, ttl):
+    pass
+
+  def delete(self, *keys):
+    pass
+
+
+class PageCache:
+
+  def __init__(self, store, max_ttl=3600):
+    self.store = store
+    self.max_ttl = max_ttl
+    self.hits = 0
+    self.misses = 0
+
+  # bumped when the shape of the cached page data changes, so entries written
+  # by an older release are never read back
+  VERSION = 3
+
+  @classmethod
+  def key(cls, kind, entity_id):
+    return f'v{cls.VERSION}:{kind}:{entity_id}'
+
+  def fetch(self, kind, entity_id, build):
+    # build(entity_id) returns (data, expires_at); expires_at is the next
+    # upcoming show start or None
+    key = self.key(kind, entity_id)
+    data = self.store.get(key)
+    if data is not None:
+      self.hits += 1
+      return data
+    self.misses += 1
+    data, expires_at = build(entity_id)
+    if use_replica():
+      return data
+    ttl = self.max_ttl
+    if expires_at is not None:
+      ttl = min(ttl, (expires_at - datetime.now()).total_seconds())
+    if ttl > 0:
+      self.store.set(key, data, ttl)
+    return data
+
+  def invalidate(self, kind, *entity_ids):
+    self.store.delete(*(self.key(kind, entity_id) for entity_id in entity_ids))
+
+
+def _create_store(app):
+  backend = app.config['PAGE_CACHE']
+  if backend == 'memory':
+    return MemoryStore(app.config['PAGE_CACHE_SIZE'])
+  if backend == 'redis':
+    client = app.config['PAGE_CACHE_REDIS_CLIENT']
+    if client is None:
+      import redis
+      client = redis.Redis.from_url(app.config['PAGE_CACHE_REDIS_URL'])
+    return RedisStore(client)
+  return NullStore()
+
+
+def init_app(app):
+  app.config.setdefault('PAGE_CACHE', 'memory')
+  app.config.setdefault('PAGE_CACHE_SIZE', 1024)
+  app.config.setdefault('PAGE_CACHE_TTL', 3600)
+  app.config.setdefault('PAGE_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+  # a redis-compatible client to use instead of connecting to
+  # PAGE_CACHE_REDIS_URL, e.g. a stand-in in tests
+  app.config.setdefault('PAGE_CACHE_REDIS_CLIENT', None)
+  app.extensions['page_cache'] = PageCache(_create_store(app), app.config['PAGE_CACHE_TTL'])
+
+
+def page_cache():
+  return current_app.extensions['page_cache']
+
+
+# Invalidation helpers for the write controllers. A venue page lists artist
+# names and images and an artist page lists venue ones, so an edit also drops
+# the pages on the other side of its shows.
+
+def related_ids(column, owner_column, owner_id):
+  return [row_id for (row_id,) in db.session.query(column).filter(owner_column == owner_id).distinct()]
+
+
+def invalidate_venue(venue_id, artist_ids=None):
+  if artist_ids is None:
+    artist_ids = related_ids(Show.artist_id, Show.venue_id, venue_id)
+  page_cache().invalidate('venue', venue_id)
+  page_cache().invalidate('artist', *artist_ids)
+
+
+def invalidate_artist(artist_id, venue_ids=None):
+  if venue_ids is None:
+    venue_ids = related_ids(Show.venue_id, Show.artist_id, artist_id)
+  page_cache().invalidate('artist', artist_id)
+  page_cache().invalidate('venue', *venue_ids)
+
+
+def invalidate_show(venue_id, artist_id):
+  page_cache().invalidate('venue', venue_id)
+  page_cache().invalidate('artist', artist_id)
@@ -0,0 +1,186 @@
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta
+from itertools import groupby
+
+from flask import Response, abort, current_app, request, stream_with_context, url_for
+from sqlalchemy import bindparam, select
+
+from models import db, Artist, Show, Venue
+from streaming import chunked, render_listing
+from viewmodels import CalendarShow, CALENDAR_COLUMNS
+
+# Venue and artist calendars: the shows starting in a window of dates,
+# ?start=YYYY-MM-DD up to ?end= (exclusive). Each is one range scan of
+# ix_Show_venue_id_start_time / ix_Show_artist_id_start_time, read from a
+# server-side cursor STREAM_BATCH_SIZE rows at a time. The HTML page streams
+# like the listings; the .ics feed (RFC 5545) is written event by event as the
+# rows arrive and sent in STREAM_CHUNK_SIZE chunks. Start times are local, so
+# the feed's times are floating. Both are behind @conditional with the
+# window's validators (see validators.py), so polling calendar clients mostly
+# get a 304.
+
+Window = namedtuple('Window', 'start end')
+
+DATE_FORMAT = '%Y-%m-%d'
+ICS_TIME_FORMAT = '%Y%m%dT%H%M%S'
+ICS_LINE_OCTETS = 75
+
+
+def _today():
+  return datetime.combine(date.today(), time())
+
+
+def _date_arg(name):
+  value = request.args.get(name)
+  if not value:
+    return None
+  try:
+    return datetime.strptime(value, DATE_FORMAT)
+  except ValueError:
+    abort(400)
+
+
+def _window(default_start, default_end, max_days=None):
+  start = _date_arg('start') or default_start
+  end = _date_arg('end') or default_end(start)
+  if end <= start or (max_days and end - start > timedelta(days=max_days)):
+    abort(400)
+  return Window(start, end)
+
+
+def page_window():
+  days = current_app.config['CALENDAR_DAYS']
+  return _window(_today(), lambda start: start + timedelta(days=days), current_app.config['CALENDAR_MAX_DAYS'])
+
+
+def feed_window():
+  today = _today()
+  ahead = today + timedelta(days=current_app.config['CALENDAR_FEED_DAYS'])
+  return _window(today - timedelta(days=current_app.config['CALENDAR_FEED_PAST_DAYS']),
+                 lambda start: max(ahead, start + timedelta(days=1)))
+
+
+def window_args(window, shift=0):
+  # url_for arguments for the window moved by shift of its own lengths
+  offset = (window.end - window.start) * shift
+  return {'start': (window.start + offset).strftime(DATE_FORMAT), 'end': (window.end + offset).strftime(DATE_FORMAT)}
+
+
+def _calendar_statement(owner_column):
+  # built once per calendar kind; :owner_id, :start and :end are bound per request
+  return select(*CALENDAR_COLUMNS).join_from(Show, Venue, Show.venue_id == Venue.id)\
+    .join(Artist, Show.artist_id == Artist.id).where(
+      owner_column == bindparam('owner_id'),
+      Show.start_time >= bindparam('start'),
+      Show.start_time < bindparam('end'),
+    ).order_by(Show.start_time, Show.id)
+
+
+CALENDARS = {
+  'venue': (Venue, _calendar_statement(Show.venue_id)),
+  'artist': (Artist, _calendar_statement(Show.artist_id)),
+}
+
+
+def _owner_name(kind, owner_id):
+  model = CALENDARS[kind][0]
+  name = db.session.query(model.name).filter(model.id == owner_id).scalar()
+  if name is None:
+    abort(404)
+  return name
+
+
+def _shows(kind, owner_id, window):
+  result = db.session.execute(
+    CALENDARS[kind][1], {'owner_id': owner_id, 'start': window.start, 'end': window.end},
+    execution_options={'stream_results': True, 'max_row_buffer': current_app.config['STREAM_BATCH_SIZE']})
+  try:
+    for row in result:
+      yield CalendarShow._make(row)
+  finally:
+    result.close()
+
+
+def _day(show):
+  return show.start_time.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _days(shows):
+  # consecutive shows grouped by day in one pass, as the rows stream in
+  return ({
+    'day': day,
+    'shows': list(day_shows)
+  } for day, day_shows in groupby(shows, key=_day))
+
+
+def render_calendar(kind, owner_id):
+  window = page_window()
+  name = _owner_name(kind, owner_id)
+  endpoint = f'{kind}s.{kind}_calendar'
+  ids = {f'{kind}_id': owner_id}
+  return render_listing(
+    'pages/calendar.html', kind=kind, name=name, owner_url=url_for(f'{kind}s.show_{kind}', **ids), window=window,
+    last_day=window.end - timedelta(days=1), days=_days(_shows(kind, owner_id, window)),
+    earlier_url=url_for(endpoint, **ids, **window_args(window, -1)),
+    later_url=url_for(endpoint, **ids, **window_args(window, 1)),
+    feed_url=url_for(f'{kind}s.{kind}_calendar_feed', **ids),
+  )
+
+
+def _escape(text):
+  return text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def _fold(line):
+  # content lines are at most 75 octets; longer ones continue on lines starting
+  # with a space, cut between UTF-8 characters
+  data = line.encode()
+  parts = []
+  limit = ICS_LINE_OCTETS
+  while len(data) > limit:
+    cut = limit
+    while data[cut] & 0xC0 == 0x80:
+      cut -= 1
+    parts.append(data[:cut])
+    data = data[cut:]
+    limit = ICS_LINE_OCTETS - 1
+  parts.append(data)
+  return b'\r\n '.join(parts).decode() + '\r\n'
+
+
+def _event(show, host):
+  location = ', '.join(part for part in (show.venue_name, show.venue_address, show.venue_city, show.venue_state)
+                       if part)
+  lines = (
+    'BEGIN:VEVENT',
+    f'UID:show-{show.show_id}@{host}',
+    # updated_at is UTC
+    f'DTSTAMP:{show.updated_at.strftime(ICS_TIME_FORMAT)}Z',
+    f'DTSTART:{show.start_time.strftime(ICS_TIME_FORMAT)}',
+    f'DTEND:{show.end_time.strftime(ICS_TIME_FORMAT)}',
+    f'SUMMARY:{_escape(f"{show.artist_name} at {show.venue_name}")}',
+    f'LOCATION:{_escape(location)}',
+    'END:VEVENT',
+  )
+  return ''.join(_fold(line) for line in lines)
+
+
+def _feed_lines(name, shows, host):
+  yield ''.join(_fold(line) for line in (
+    'BEGIN:VCALENDAR',
+    'VERSION:2.0',
+    'PRODID:-//Fyyur//Show calendar//EN',
+    'CALSCALE:GREGORIAN',
+    f'X-WR-CALNAME:{_escape(name)}',
+  ))
+  for show in shows:
+    yield _event(show, host)
+  yield _fold('END:VCALENDAR')
+
+
+def calendar_feed(kind, owner_id):
+  window = feed_window()
+  name = _owner_name(kind, owner_id)
+  lines = _feed_lines(name, _shows(kind, owner_id, window), request.host.split(':')[0])
+  return Response(stream_with_context(chunked(lines, current_app.config['STREAM_CHUNK_SIZE'])),
+                  mimetype='text/calendar')
@@ -0,0 +1,55 @@
+import hashlib
+from datetime import timezone
+from functools import wraps
+
+from flask import make_response, request, session
+
+# Conditional GET for rendered pages.
+# A validator function takes the view's arguments and returns
+# (parts, last_modified) from a few cheap aggregate queries, or None when it
+# can't tell (e.g. the entity doesn't exist). parts is hashed into the ETag;
+# when the request's If-None-Match / If-Modified-Since match, the view is
+# never called and a bodyless 304 goes back instead.
+
+
+def _http_date(value):
+  if value is None:
+    return None
+  if value.tzinfo is None:
+    value = value.replace(tzinfo=timezone.utc)
+  return value.replace(microsecond=0)
+
+
+def is_fresh(etag, last_modified):
+  if request.if_none_match:
+    return request.if_none_match.contains(etag)
+  if request.if_modified_since and last_modified is not None:
+    return last_modified <= _http_date(request.if_modified_since)
+  return False
+
+
+def conditional(validator):
+  def decorator(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+      # pending flash messages are rendered into the page, so it can't be reused
+      validated = None if '_flashes' in session else validator(*args, **kwargs)
+      if validated is None:
+        return view(*args, **kwargs)
+
+      parts, last_modified = validated
+      etag = hashlib.sha1(repr(parts).encode()).hexdigest()
+      last_modified = _http_date(last_modified)
+      if is_fresh(etag, last_modified):
+        response = make_response('', 304)
+      else:
+        response = make_response(view(*args, **kwargs))
+        if response.status_code != 200:
+          return response
+      response.set_etag(etag)
+      if last_modified is not None:
+        response.last_modified = last_modified
+      response.cache_control.no_cache = True
+      return response
+    return wrapper
+  return decorator
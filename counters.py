@@ -0,0 +1,200 @@
+from collections import Counter
+from datetime import datetime
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, case, event, func, inspect, or_, select
+
+from models import db, Artist, CounterState, Show, Venue
+
+# Denormalized upcoming/past show counts on Venue and Artist.
+# A show counts as upcoming while its start_time is after the rollover
+# watermark (CounterState.rolled_at), not the clock. The mapper events below
+# adjust the counters in the same flush that inserts, moves or deletes a show;
+# `flask counters rollover`, run from cron, moves the shows that started since
+# the previous run from upcoming to past with a range scan on start_time and
+# advances the watermark, so between runs the counts lag the clock by at most
+# the schedule interval. `flask counters check` recomputes every counter in
+# one grouped query per table and, with --repair, rewrites the drifted rows.
+# Core inserts (the importer, batch show creation) call adjust() themselves.
+
+OWNERS = (
+  (Venue, 'venue_id'),
+  (Artist, 'artist_id'),
+)
+
+
+def watermark(conn, lock=None):
+  # lock: 'share' for show writers, 'update' for the rollover and repairs, so
+  # the two can't interleave (PostgreSQL; SQLite serializes writers anyway)
+  state = CounterState.__table__
+  query = select(state.c.rolled_at).where(state.c.id == 1)
+  if lock:
+    query = query.with_for_update(read=lock == 'share')
+  rolled_at = conn.execute(query).scalar()
+  if rolled_at is None:
+    # a schema from create_all() has no row yet; `check --repair` fills the counts
+    rolled_at = datetime.now()
+    conn.execute(state.insert().values(id=1, rolled_at=rolled_at))
+  return rolled_at
+
+
+def _add(conn, model, deltas):
+  # deltas: owner id -> (upcoming delta, past delta)
+  table = model.__table__
+  rows = [{'owner_id': owner_id, 'upcoming': upcoming, 'past': past}
+          for owner_id, (upcoming, past) in deltas.items() if upcoming or past]
+  if not rows:
+    return
+  # updated_at is set to itself so the counters don't count as an edit
+  conn.execute(table.update().where(table.c.id == bindparam('owner_id')).values(
+    upcoming_shows_count=table.c.upcoming_shows_count + bindparam('upcoming'),
+    past_shows_count=table.c.past_shows_count + bindparam('past'),
+    updated_at=table.c.updated_at,
+  ), rows)
+
+
+def adjust(conn, shows, sign=1):
+  # shows: mappings with venue_id, artist_id and start_time, inserted (sign=1)
+  # or deleted (sign=-1) in the transaction conn belongs to
+  if not shows:
+    return
+  rolled_at = watermark(conn, 'share')
+  for model, key in OWNERS:
+    upcoming, past = Counter(), Counter()
+    for show in shows:
+      if show['start_time'] > rolled_at:
+        upcoming[show[key]] += sign
+      else:
+        past[show[key]] += sign
+    _add(conn, model, {owner_id: (upcoming[owner_id], past[owner_id]) for owner_id in upcoming.keys() | past.keys()})
+
+
+def _values(show, previous=False):
+  state = inspect(show)
+  values = {}
+  for key in ('venue_id', 'artist_id', 'start_time'):
+    history = state.attrs[key].history
+    values[key] = history.deleted[0] if previous and history.deleted else getattr(show, key)
+  return values
+
+
+def _keep_previous(target, value, oldvalue, initiator):
+  pass
+
+
+# The update listener needs the values a show moves from. An expired show
+# (any instance after a commit) doesn't have them unless the attributes keep
+# active history, which loads the previous value before a set.
+for key in ('venue_id', 'artist_id', 'start_time'):
+  event.listen(getattr(Show, key), 'set', _keep_previous, active_history=True)
+
+
+@event.listens_for(Show, 'after_insert')
+def _show_inserted(mapper, connection, show):
+  adjust(connection, [_values(show)])
+
+
+@event.listens_for(Show, 'after_delete')
+def _show_deleted(mapper, connection, show):
+  adjust(connection, [_values(show, previous=True)], -1)
+
+
+@event.listens_for(Show, 'after_update')
+def _show_updated(mapper, connection, show):
+  before, after = _values(show, previous=True), _values(show)
+  if before != after:
+    adjust(connection, [before], -1)
+    adjust(connection, [after])
+
+
+def rollover(conn, now=None):
+  # moves shows with rolled_at < start_time <= now from upcoming to past
+  now = now or datetime.now()
+  rolled_at = watermark(conn, 'update')
+  if now <= rolled_at:
+    return 0
+  started = (Show.start_time > rolled_at, Show.start_time <= now)
+  moved = 0
+  for model, key in OWNERS:
+    column = getattr(Show, key)
+    counts = conn.execute(select(column, func.count()).where(*started).group_by(column)).fetchall()
+    _add(conn, model, {owner_id: (-count, count) for owner_id, count in counts})
+    # every show has one venue and one artist, so either table gives the total
+    moved = sum(count for _, count in counts)
+  conn.execute(CounterState.__table__.update().values(rolled_at=now))
+  return moved
+
+
+def drift(conn, rolled_at):
+  # model -> [(id, stored upcoming, stored past, actual upcoming, actual past)]
+  drifted = {}
+  for model, key in OWNERS:
+    table = model.__table__
+    column = getattr(Show, key)
+    counts = select(
+      column.label('owner_id'),
+      func.count(case((Show.start_time > rolled_at, 1))).label('upcoming'),
+      func.count().label('total'),
+    ).group_by(column).subquery()
+    actual_upcoming = func.coalesce(counts.c.upcoming, 0)
+    actual_past = func.coalesce(counts.c.total - counts.c.upcoming, 0)
+    drifted[model] = conn.execute(
+      select(table.c.id, table.c.upcoming_shows_count, table.c.past_shows_count, actual_upcoming, actual_past)
+      .select_from(table.outerjoin(counts, counts.c.owner_id == table.c.id))
+      .where(or_(table.c.upcoming_shows_count != actual_upcoming, table.c.past_shows_count != actual_past))
+      .order_by(table.c.id)).fetchall()
+  return drifted
+
+
+def repair(conn, drifted):
+  for model, rows in drifted.items():
+    table = model.__table__
+    if rows:
+      conn.execute(table.update().where(table.c.id == bindparam('owner_id')).values(
+        upcoming_shows_count=bindparam('upcoming'),
+        past_shows_count=bindparam('past'),
+        updated_at=table.c.updated_at,
+      ), [{'owner_id': row[0], 'upcoming': row[3], 'past': row[4]} for row in rows])
+
+
+def reset(conn, now=None):
+  # recount everything against a new watermark, e.g. after a bulk load
+  rolled_at = watermark(conn, 'update')
+  now = now or datetime.now()
+  if now != rolled_at:
+    conn.execute(CounterState.__table__.update().values(rolled_at=now))
+  repair(conn, drift(conn, now))
+
+
+counters_command = AppGroup('counters', help='Maintain the upcoming/past show counts on venues and artists.')
+
+
+@counters_command.command('rollover')
+def rollover_command():
+  """Move shows that started since the last run from upcoming to past."""
+  with db.engine.begin() as conn:
+    moved = rollover(conn)
+  click.echo(f'{moved} shows moved from upcoming to past')
+
+
+@counters_command.command('check')
+@click.option('--repair', 'fix', is_flag=True, help='Rewrite the counters that drifted.')
+def check_command(fix):
+  """Recompute the counters and report (or repair) any drift."""
+  with db.engine.begin() as conn:
+    drifted = drift(conn, watermark(conn, 'update' if fix else None))
+    if fix:
+      repair(conn, drifted)
+  total = 0
+  for model, rows in drifted.items():
+    total += len(rows)
+    for owner_id, upcoming, past, actual_upcoming, actual_past in rows:
+      click.echo(f'{model.__tablename__} {owner_id}: upcoming {upcoming} -> {actual_upcoming}, '
+                 f'past {past} -> {actual_past}')
+  if not total:
+    click.echo('counters are consistent')
+  elif fix:
+    click.echo(f'{total} rows repaired')
+  else:
+    raise click.ClickException(f'{total} rows drifted, run with --repair to fix them')
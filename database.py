@@ -0,0 +1,87 @@
+import time
+
+from flask import g, has_request_context, request, session
+from flask_sqlalchemy import SQLAlchemy, SignallingSession, get_state
+from sqlalchemy import event, orm
+
+# Engine options and primary/replica routing.
+# Pool settings come from the DB_* config values (set from the environment in
+# config.py) and apply to every engine. When SQLALCHEMY_BINDS has a 'replica'
+# entry, GET and HEAD requests read from it and everything else uses the
+# primary. A request that commits pins its client to the primary for
+# DB_REPLICA_STICKY_SECONDS, through a timestamp in the Flask session, so a
+# redirect after a form post shows the change even if the replica lags. The
+# page and search caches don't store what a replica read built (cache.py,
+# search.py), or a pinned client would be served it from the cache.
+
+REPLICA = 'replica'
+STICKY_KEY = '_db_primary_until'
+READ_METHODS = ('GET', 'HEAD')
+
+# config key -> (create_engine option, conversion, applies to SQLite)
+POOL_OPTIONS = {
+  'DB_POOL_SIZE': ('pool_size', int, False),
+  'DB_MAX_OVERFLOW': ('max_overflow', int, False),
+  'DB_POOL_TIMEOUT': ('pool_timeout', float, False),
+  'DB_POOL_RECYCLE': ('pool_recycle', int, True),
+  'DB_POOL_PRE_PING': ('pool_pre_ping', lambda value: str(value).lower() in ('1', 'true', 'yes', 'on'), True),
+}
+
+
+def use_replica():
+  return has_request_context() and g.get('db_replica', False)
+
+
+class RoutingSession(SignallingSession):
+
+  def get_bind(self, mapper=None, clause=None):
+    if use_replica():
+      return get_state(self.app).db.get_engine(self.app, bind=REPLICA)
+    return super().get_bind(mapper, clause)
+
+
+def _after_commit(session):
+  if has_request_context():
+    g.db_wrote = True
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+
+  def create_session(self, options):
+    factory = orm.sessionmaker(class_=RoutingSession, db=self, **options)
+    event.listen(factory, 'after_commit', _after_commit)
+    return factory
+
+  def apply_driver_hacks(self, app, sa_url, options):
+    # NullPool (SQLite files) takes no size, overflow or timeout
+    sqlite = sa_url.drivername.startswith('sqlite')
+    for key, (option, convert, on_sqlite) in POOL_OPTIONS.items():
+      value = app.config.get(key)
+      if value not in (None, '') and (on_sqlite or not sqlite):
+        options[option] = convert(value)
+    timeout = app.config.get('DB_STATEMENT_TIMEOUT_MS')
+    if timeout and sa_url.drivername.startswith('postgresql'):
+      connect_args = dict(options.get('connect_args', {}))
+      connect_args['options'] = f"{connect_args.get('options', '')} -c statement_timeout={int(timeout)}".strip()
+      options['connect_args'] = connect_args
+    return super().apply_driver_hacks(app, sa_url, options)
+
+  def init_app(self, app):
+    app.config.setdefault('DB_REPLICA_STICKY_SECONDS', 5)
+    super().init_app(app)
+
+    @app.before_request
+    def route_reads():
+      if REPLICA not in (app.config.get('SQLALCHEMY_BINDS') or {}):
+        return
+      pinned_until = session.get(STICKY_KEY)
+      if pinned_until is not None and pinned_until <= time.time():
+        session.pop(STICKY_KEY)
+        pinned_until = None
+      g.db_replica = request.method in READ_METHODS and pinned_until is None
+
+    @app.after_request
+    def pin_after_write(response):
+      if g.get('db_wrote') and REPLICA in (app.config.get('SQLALCHEMY_BINDS') or {}):
+        session[STICKY_KEY] = time.time() + app.config['DB_REPLICA_STICKY_SECONDS']
+      return response
@@ -0,0 +1,61 @@
+from functools import lru_cache
+
+# The `datetime` template filter.
+# Views pass datetime objects through to the templates; the filter compiles
+# each babel pattern once per (format, locale) and applies it directly,
+# skipping babel.dates.format_datetime's per-call locale and timezone
+# handling. Strings (page data cached before the views passed datetimes) are
+# still parsed with dateutil. With DATETIME_MEMO_SIZE set, the strings for
+# the most recently formatted (value, format, locale) are kept in an LRU.
+# babel and dateutil are imported on first use, not at startup.
+
+FORMATS = {
+  'full': "EEEE MMMM, d, y 'at' h:mma",
+  'medium': "EE MM, dd, y h:mma",
+}
+# babel names for the locale's own formats, which aren't patterns
+LOCALE_FORMATS = ('short', 'long')
+
+
+class DatetimeFormatter:
+
+  def __init__(self, locale='en', memo_size=0):
+    self.locale = locale
+    # (format, locale) -> (compiled pattern, babel Locale)
+    self._compiled = {}
+    self._format = lru_cache(maxsize=memo_size)(self._format_value) if memo_size else self._format_value
+
+  def compiled(self, format, locale):
+    key = (format, locale)
+    compiled = self._compiled.get(key)
+    if compiled is None:
+      from babel.core import Locale
+      from babel.dates import parse_pattern
+      compiled = self._compiled[key] = (parse_pattern(FORMATS.get(format, format)), Locale.parse(locale))
+    return compiled
+
+  def _format_value(self, value, format, locale):
+    if isinstance(value, str):
+      from dateutil.parser import parse
+      value = parse(value)
+    if format in LOCALE_FORMATS:
+      from babel.dates import format_datetime
+      return format_datetime(value, format, locale=locale)
+    pattern, babel_locale = self.compiled(format, locale)
+    # naive values are taken as UTC, as babel.dates.format_datetime does
+    return pattern.apply(value, babel_locale)
+
+  def __call__(self, value, format='medium', locale=None):
+    return self._format(value, format, locale or self.locale)
+
+  def memo_info(self):
+    info = getattr(self._format, 'cache_info', None)
+    return info() if info else None
+
+
+def init_app(app):
+  app.config.setdefault('DATETIME_LOCALE', 'en')
+  app.config.setdefault('DATETIME_MEMO_SIZE', 0)
+  formatter = DatetimeFormatter(app.config['DATETIME_LOCALE'], app.config['DATETIME_MEMO_SIZE'])
+  app.extensions['datetime_formatter'] = formatter
+  app.jinja_env.filters['datetime'] = formatter
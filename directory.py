@@ -0,0 +1,34 @@
+from flask import request
+
+from models import Genre
+
+# Filters shared by the /venues and /artists directories: ?state=, ?city=,
+# ?seeking=1 (seeking talent / seeking a venue) and ?genre=. Blank values are
+# dropped, so the filter form can submit every field.
+
+FILTERS = ('state', 'city', 'seeking', 'genre')
+TRUE_VALUES = ('1', 'y', 'yes', 'true', 'on')
+
+
+def filter_args():
+  filters = {}
+  for name in FILTERS:
+    value = request.args.get(name, '').strip()
+    if name == 'seeking' and value.lower() not in TRUE_VALUES:
+      continue
+    if value:
+      filters[name] = value
+  return filters
+
+
+def apply_filters(query, model, seeking_column, filters):
+  if 'state' in filters:
+    query = query.filter(model.state == filters['state'].upper())
+  if 'city' in filters:
+    query = query.filter(model.city == filters['city'])
+  if 'seeking' in filters:
+    query = query.filter(seeking_column.is_(True))
+  if 'genre' in filters:
+    # venue_genres / artist_genres are indexed on (genre_id, owner id)
+    query = query.join(model.genre_list).filter(Genre.name == filters['genre'])
+  return query
@@ -6,13 +6,18 @@ from fabric.contrib.console import confirm
 
 def test():
     with settings(warn_only=True):
-        result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
-        )
+        result = local("python -m pytest -q", capture=True)
     if result.failed and not confirm("Tests failed. Continue?"):
         abort("Aborted at user request.")
 
 
+def benchmark():
+    with settings(warn_only=True):
+        result = local("python -m benchmarks.suite", capture=True)
+    if result.failed and not confirm("Benchmarks regressed. Continue?"):
+        abort("Aborted at user request.")
+
+
 def commit():
     message = raw_input("Enter a git commit message: ")
     local("git add . && git commit -am '{}'".format(message))
@@ -24,6 +29,7 @@ def push():
 
 def prepare():
     test()
+    benchmark()
     commit()
     push()
 
@@ -47,6 +53,7 @@ def heroku_test():
 def deploy():
     pull()
     test()
+    benchmark()
     commit()
     heroku()
     heroku_test()
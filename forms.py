@@ -1,22 +1,70 @@
 from datetime import datetime
 from flask_wtf import Form
-from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField
-from wtforms.validators import DataRequired, AnyOf, URL
+from wtforms import Form as BaseForm
+from wtforms import (StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField, IntegerField,
+                     DateField, FieldList, FormField)
+from wtforms.validators import DataRequired, InputRequired, AnyOf, URL, NumberRange, Optional
+from genres import genre_choices
+from models import DEFAULT_SHOW_MINUTES, MAX_SHOW_MINUTES
 
-class ShowForm(Form):
-    artist_id = StringField(
-        'artist_id'
+
+class GenreChoicesMixin:
+    # genre choices come from the Genre table; the static lists below are only
+    # used until it has been populated
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        choices = genre_choices()
+        if choices:
+            self.genres.choices = choices
+
+class ShowFields:
+    # one show; the show form and each row of the batch form
+    artist_id = IntegerField(
+        'artist_id', validators=[DataRequired()]
     )
-    venue_id = StringField(
-        'venue_id'
+    venue_id = IntegerField(
+        'venue_id', validators=[DataRequired()]
     )
     start_time = DateTimeField(
         'start_time',
         validators=[DataRequired()],
         default= datetime.today()
     )
+    duration_minutes = IntegerField(
+        'duration_minutes',
+        validators=[InputRequired(), NumberRange(min=1, max=MAX_SHOW_MINUTES)],
+        default=DEFAULT_SHOW_MINUTES
+    )
+
+class ShowForm(ShowFields, Form):
+    repeat = SelectField(
+        'repeat',
+        choices=[('', 'Does not repeat'), ('weekly', 'Every week'), ('monthly', 'Every month')],
+        default=''
+    )
+    repeat_until = DateField(
+        'repeat_until', validators=[Optional()]
+    )
+
+    def validate(self, *args, **kwargs):
+        valid = super().validate(*args, **kwargs)
+        if self.repeat.data:
+            until = self.repeat_until.data
+            if until is None:
+                self.repeat_until.errors.append('Choose the date the show repeats until.')
+                return False
+            if self.start_time.data and until < self.start_time.data.date():
+                self.repeat_until.errors.append('The show has to repeat until a date after its first show.')
+                return False
+        return valid
+
+class ShowRowForm(ShowFields, BaseForm):
+    pass
+
+class ShowBatchForm(Form):
+    shows = FieldList(FormField(ShowRowForm), min_entries=1)
 
-class VenueForm(Form):
+class VenueForm(GenreChoicesMixin, Form):
     name = StringField(
         'name', validators=[DataRequired()]
     )
@@ -128,7 +176,7 @@ class VenueForm(Form):
 
 
 
-class ArtistForm(Form):
+class ArtistForm(GenreChoicesMixin, Form):
     name = StringField(
         'name', validators=[DataRequired()]
     )
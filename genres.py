@@ -0,0 +1,55 @@
+import time
+
+from flask import current_app
+
+from models import db, Genre
+
+# Genre names live in the Genre table; the form choice list is read from it
+# once and kept for GENRE_CHOICES_TTL seconds, or until a new genre is added.
+
+_choices = None
+_loaded_at = 0.0
+
+
+def genre_choices():
+  global _choices, _loaded_at
+  ttl = current_app.config.get('GENRE_CHOICES_TTL', 300)
+  if _choices is None or time.monotonic() - _loaded_at > ttl:
+    names = [name for (name,) in db.session.query(Genre.name).order_by(Genre.name)]
+    _choices = [(name, name) for name in names]
+    _loaded_at = time.monotonic()
+  return _choices
+
+
+def invalidate_choices():
+  global _choices
+  _choices = None
+
+
+def parse_genres(value):
+  # accepts the comma separated column value as well as the '{Jazz,"Rock n Roll"}'
+  # array literal that list values used to be stored as
+  if not value:
+    return []
+  if not isinstance(value, str):
+    return [name.strip() for name in value if name and name.strip()]
+  names = []
+  for name in value.strip('{}').split(','):
+    name = name.strip().strip('"').strip()
+    if name and name not in names:
+      names.append(name)
+  return names
+
+
+def genres_for(names):
+  # Genre rows for the given names, creating the ones that don't exist yet
+  names = parse_genres(names)
+  if not names:
+    return []
+  genres = Genre.query.filter(Genre.name.in_(names)).all()
+  known = {genre.name for genre in genres}
+  missing = [Genre(name=name) for name in names if name not in known]
+  if missing:
+    db.session.add_all(missing)
+    invalidate_choices()
+  return genres + missing
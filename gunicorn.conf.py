@@ -0,0 +1,32 @@
+import os
+import shutil
+
+# gunicorn settings, picked up by `gunicorn` from the working directory.
+# The app is built once in the master and forked into the workers; create_app()
+# opens no database connections, so nothing is shared across the fork.
+# With PROMETHEUS_MULTIPROC_DIR set, the workers share metric files there:
+# stale files from an earlier run are cleared before any worker starts, and a
+# worker's live gauges are dropped when it exits.
+# Each worker builds its search box suggestion index (autocomplete.py) before
+# it takes requests, on its own connection.
+
+wsgi_app = 'app:create_app()'
+preload_app = True
+
+
+def on_starting(server):
+  directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+  if directory:
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+
+
+def post_worker_init(worker):
+  import autocomplete
+  autocomplete.warm(worker.wsgi)
+
+
+def child_exit(server, worker):
+  if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,331 @@
+import csv
+import io
+import json
+import os
+import time
+from datetime import datetime
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import IntegrityError
+from werkzeug.datastructures import MultiDict
+
+import bookings
+import counters
+from genres import parse_genres
+from models import db, Artist, Genre, ImportCheckpoint, Show, Venue, artist_genres, venue_genres
+
+# `flask import KIND PATH` bulk loads venues, artists or shows from CSV or
+# NDJSON. Rows are validated with the same forms the create pages use, written
+# in batches (COPY on PostgreSQL, executemany elsewhere), and each batch
+# commits together with a checkpoint row, so a rerun after a failure carries
+# on from the first row that wasn't committed. Shows that would double-book a
+# venue or an artist, against the stored calendar or an earlier row of the
+# file, are rejected like any other invalid row.
+
+# tries at writing a batch that a concurrent booking keeps clashing with
+WRITE_ATTEMPTS = 3
+
+
+def venue_values(form):
+  return {
+    'name': form.name.data,
+    'city': form.city.data,
+    'state': form.state.data,
+    'address': form.address.data,
+    'phone': form.phone.data,
+    'genres': ','.join(form.genres.data),
+    'image_link': form.image_link.data,
+    'facebook_link': form.facebook_link.data,
+    'website_link': form.website_link.data,
+    'seeking_talent': form.seeking_talent.data,
+    'seeking_description': form.seeking_description.data,
+  }
+
+
+def artist_values(form):
+  return {
+    'name': form.name.data,
+    'city': form.city.data,
+    'state': form.state.data,
+    'phone': form.phone.data,
+    'genres': ','.join(form.genres.data),
+    'image_link': form.image_link.data,
+    'facebook_link': form.facebook_link.data,
+    'website_link': form.website_link.data,
+    'seeking_venue': form.seeking_venue.data,
+    'seeking_description': form.seeking_description.data,
+  }
+
+
+def show_values(form):
+  return {
+    'venue_id': form.venue_id.data,
+    'artist_id': form.artist_id.data,
+    'start_time': form.start_time.data,
+    'duration_minutes': form.duration_minutes.data,
+  }
+
+
+# kind -> (model, form class name, column values, genre association table and its owner column)
+KINDS = {
+  'venues': (Venue, 'VenueForm', venue_values, venue_genres, 'venue_id'),
+  'artists': (Artist, 'ArtistForm', artist_values, artist_genres, 'artist_id'),
+  'shows': (Show, 'ShowForm', show_values, None, None),
+}
+
+
+def read_rows(path, fmt):
+  # yields (line number, row dict or None, error)
+  with open(path, newline='', encoding='utf-8') as source:
+    if fmt == 'csv':
+      reader = csv.DictReader(source)
+      for row in reader:
+        yield reader.line_num, row, None
+      return
+    for line_no, line in enumerate(source, 1):
+      if not line.strip():
+        continue
+      try:
+        row = json.loads(line)
+      except ValueError as e:
+        yield line_no, None, f'invalid JSON: {e}'
+        continue
+      if not isinstance(row, dict):
+        yield line_no, None, 'expected a JSON object'
+        continue
+      yield line_no, row, None
+
+
+def formdata(row):
+  data = MultiDict()
+  for key, value in row.items():
+    if value is None or value is False:
+      continue
+    if key == 'genres':
+      for name in parse_genres(value):
+        data.add(key, name)
+    elif value is True:
+      data.add(key, 'y')
+    else:
+      data.add(key, str(value))
+  return data
+
+
+class Importer:
+
+  def __init__(self, kind):
+    self.kind = kind
+    # forms pulls in WTForms, which only the import command needs
+    import forms
+    self.model, form_name, self.values, self.genre_table, self.owner_column = KINDS[kind]
+    self.form_class = getattr(forms, form_name)
+    self.table = self.model.__table__
+    self.genre_ids = {name: genre_id for genre_id, name in db.session.query(Genre.id, Genre.name)}
+    if kind == 'shows':
+      self.venue_ids = {venue_id for (venue_id,) in db.session.query(Venue.id)}
+      self.artist_ids = {artist_id for (artist_id,) in db.session.query(Artist.id)}
+
+  def validate(self, row):
+    # (values, genre names) for a valid row, otherwise a list of errors
+    form = self.form_class(formdata=formdata(row), meta={'csrf': False})
+    if not form.validate():
+      return [f'{field}: {"; ".join(errors)}' for field, errors in form.errors.items()]
+    if self.kind == 'shows':
+      errors = []
+      for field, known in (('venue_id', self.venue_ids), ('artist_id', self.artist_ids)):
+        value = getattr(form, field).data
+        if value not in known:
+          errors.append(f'{field}: no such id {value!r}')
+      if errors:
+        return errors
+      return self.values(form), []
+    return self.values(form), form.genres.data
+
+  def write(self, conn, table, rows):
+    if not rows:
+      return
+    if conn.dialect.name == 'postgresql':
+      copy_rows(conn, table, rows)
+    else:
+      conn.execute(table.insert(), rows)
+
+  def write_batch(self, conn, accepted):
+    # accepted: (values, genre names, origin) per row; returns row index ->
+    # errors for the rows left out
+    rows = [values for values, _, _ in accepted]
+    if self.kind == 'shows':
+      return self.write_shows(conn, rows, [origin['row'] for _, _, origin in accepted])
+    self.add_genres(conn, {name for _, names, _ in accepted for name in names})
+    links = []
+    for row_id, (values, names, _) in zip(allocate_ids(conn, self.table, len(rows)), accepted):
+      values['id'] = row_id
+      links.extend({self.owner_column: row_id, 'genre_id': self.genre_ids[name]} for name in names)
+    self.write(conn, self.table, rows)
+    self.write(conn, self.genre_table, links)
+    return {}
+
+  def add_genres(self, conn, names):
+    # Genre rows for the names that have none, like genres.genres_for() on the
+    # create pages: the forms accept their static genre list while the Genre
+    # table is empty. A batch that fails ends the import, so the ids kept here
+    # never outlive a rolled back transaction.
+    missing = sorted(set(names) - self.genre_ids.keys())
+    if missing:
+      genre = Genre.__table__
+      conn.execute(genre.insert(), [{'name': name} for name in missing])
+      self.genre_ids.update((name, genre_id) for name, genre_id in conn.execute(
+        select(genre.c.name, genre.c.id).where(genre.c.name.in_(missing))))
+
+  def write_shows(self, conn, rows, row_numbers):
+    # Checked like bookings.book_all(): before the insert on PostgreSQL, whose
+    # exclusion constraints catch a show booked meanwhile, and after it
+    # elsewhere, so the write lock is held across the check.
+    if conn.dialect.name == 'postgresql':
+      clashes = self.clashes(conn, rows, row_numbers)
+      kept = [row for index, row in enumerate(rows) if index not in clashes]
+      self.write(conn, self.table, kept)
+    else:
+      for row, row_id in zip(rows, allocate_ids(conn, self.table, len(rows))):
+        row['id'] = row_id
+      self.write(conn, self.table, rows)
+      clashes = self.clashes(conn, rows, row_numbers, [row['id'] for row in rows])
+      if clashes:
+        conn.execute(self.table.delete().where(self.table.c.id.in_([rows[index]['id'] for index in clashes])))
+      kept = [row for index, row in enumerate(rows) if index not in clashes]
+    # Core inserts skip the Show mapper events that keep the counters
+    counters.adjust(conn, kept)
+    return clashes
+
+  def clashes(self, conn, rows, row_numbers, exclude_ids=()):
+    # row index -> errors for the shows overlapping a stored show, or an
+    # earlier row that is imported, at the same venue or by the same artist
+    errors = {}
+    for index, conflict in bookings.find_conflicts(rows, exclude_ids, conn):
+      errors.setdefault(index, []).append(f'{conflict.kind}_id: {bookings.message(conflict)}')
+    earlier = {}
+    for first, second in bookings.overlaps_within(rows):
+      earlier.setdefault(second, []).append(first)
+    for index in range(len(rows)):
+      kept = [first for first in earlier.get(index, ()) if first not in errors]
+      if kept and index not in errors:
+        errors[index] = [f'start_time: overlaps row {row_numbers[kept[0]]} at the same venue or by the same artist']
+    return errors
+
+
+def allocate_ids(conn, table, count):
+  # ids for rows inserted in bulk, assigned up front so the rest of the batch
+  # (genre rows, the booking conflict check) can refer to them
+  if conn.dialect.name == 'postgresql':
+    return [row_id for (row_id,) in conn.execute(
+      text('SELECT nextval(pg_get_serial_sequence(:table, \'id\')) FROM generate_series(1, :count)'),
+      {'table': f'"{table.name}"', 'count': count})]
+  start = conn.execute(select(func.coalesce(func.max(table.c.id), 0))).scalar() + 1
+  return list(range(start, start + count))
+
+
+def copy_rows(conn, table, rows):
+  columns = list(rows[0])
+  buffer = io.StringIO()
+  writer = csv.writer(buffer)
+  for row in rows:
+    # unquoted empty fields are NULL in COPY's csv format
+    writer.writerow([row[column] for column in columns])
+  buffer.seek(0)
+  column_list = ', '.join(f'"{column}"' for column in columns)
+  cursor = conn.connection.cursor()
+  try:
+    cursor.copy_expert(f'COPY "{table.name}" ({column_list}) FROM STDIN WITH (FORMAT csv)', buffer)
+  finally:
+    cursor.close()
+
+
+def save_checkpoint(conn, source, fingerprint, rows_done):
+  checkpoint = ImportCheckpoint.__table__
+  values = {'fingerprint': fingerprint, 'rows_done': rows_done, 'updated_at': datetime.utcnow()}
+  updated = conn.execute(checkpoint.update().where(checkpoint.c.source == source).values(**values))
+  if updated.rowcount == 0:
+    conn.execute(checkpoint.insert().values(source=source, **values))
+
+
+@click.command('import')
+@click.argument('kind', type=click.Choice(list(KINDS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']),
+              help='Input format, guessed from the file extension by default.')
+@click.option('--batch-size', default=1000, show_default=True, help='Rows per transaction.')
+@click.option('--rejects', type=click.Path(dir_okay=False),
+              help='Where rejected rows are written as NDJSON [default: PATH.rejects.ndjson].')
+@click.option('--restart', is_flag=True, help='Ignore the saved checkpoint and start from the first row.')
+@with_appcontext
+def import_command(kind, path, fmt, batch_size, rejects, restart):
+  """Bulk import venues, artists or shows from a CSV or NDJSON file."""
+  fmt = fmt or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+  rejects = rejects or f'{path}.rejects.ndjson'
+  source = f'{kind}:{os.path.abspath(path)}'
+  stat = os.stat(path)
+  fingerprint = f'{stat.st_size}:{int(stat.st_mtime)}'
+
+  checkpoint = ImportCheckpoint.query.get(source)
+  skip = 0
+  if checkpoint and not restart:
+    if checkpoint.fingerprint != fingerprint:
+      raise click.ClickException(f'{path} changed since the last run; use --restart to import it from the start')
+    skip = checkpoint.rows_done
+    click.echo(f'resuming after {skip} rows')
+  db.session.close()
+
+  importer = Importer(kind)
+  rows_done = 0
+  imported = rejected = 0
+  started = time.monotonic()
+  accepted, failed = [], []
+
+  with open(rejects, 'a' if skip else 'w', encoding='utf-8') as rejects_file:
+    def flush():
+      nonlocal imported, rejected
+      for attempt in range(1, WRITE_ATTEMPTS + 1):
+        try:
+          with db.engine.begin() as conn:
+            clashes = importer.write_batch(conn, accepted)
+            save_checkpoint(conn, source, fingerprint, rows_done)
+          break
+        except IntegrityError as e:
+          # a show booked over one of the batch since the check; check again
+          if attempt == WRITE_ATTEMPTS or not bookings.is_overlap_violation(e):
+            raise
+      for index, errors in clashes.items():
+        origin = accepted[index][2]
+        failed.append({'row': origin['row'], 'line': origin['line'], 'errors': errors, 'data': origin['data']})
+      failed.sort(key=lambda reject: reject['row'])
+      for reject in failed:
+        rejects_file.write(json.dumps(reject, default=str) + '\n')
+      rejects_file.flush()
+      imported += len(accepted) - len(clashes)
+      rejected += len(failed)
+      accepted.clear()
+      failed.clear()
+      rate = (imported + rejected) / max(time.monotonic() - started, 1e-9)
+      click.echo(f'{kind}: {rows_done} rows read, {imported} imported, {rejected} rejected ({rate:.0f} rows/s)')
+
+    for line_no, row, error in read_rows(path, fmt):
+      rows_done += 1
+      if rows_done <= skip:
+        continue
+      errors = [error] if error else None
+      if row is not None:
+        result = importer.validate(row)
+        if isinstance(result, list):
+          errors = result
+        else:
+          values, names = result
+          accepted.append((values, names, {'row': rows_done, 'line': line_no, 'data': row}))
+      if errors:
+        failed.append({'row': rows_done, 'line': line_no, 'errors': errors, 'data': row})
+      if len(accepted) + len(failed) >= batch_size:
+        flush()
+    if accepted or failed:
+      flush()
+
+  click.echo(f'done: {imported} imported, {rejected} rejected' + (f', see {rejects}' if rejected else ''))
@@ -0,0 +1,137 @@
+import os
+import time
+
+from flask import Response, g, request, template_rendered, before_render_template, got_request_exception
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram,
+                               REGISTRY, generate_latest, multiprocess)
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+from models import db
+
+# Prometheus metrics at /metrics.
+# Request latency and counts are labelled by endpoint, template render time
+# by template, and the pool gauges are refreshed whenever a connection is
+# checked out or returned. Under gunicorn, set PROMETHEUS_MULTIPROC_DIR to an
+# empty directory before the workers start: every process then writes its
+# samples there and /metrics merges them (see gunicorn.conf.py, which also
+# clears the directory on start and drops the files of exited workers).
+
+REQUEST_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+RENDER_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1)
+
+REQUEST_LATENCY = Histogram(
+  'fyyur_request_duration_seconds', 'Time spent serving a request.',
+  ['endpoint', 'method'], buckets=REQUEST_BUCKETS)
+REQUESTS = Counter(
+  'fyyur_requests_total', 'Requests served, by response status.',
+  ['endpoint', 'method', 'status'])
+EXCEPTIONS = Counter(
+  'fyyur_request_exceptions_total', 'Unhandled exceptions raised by views.',
+  ['endpoint', 'exception'])
+TEMPLATE_RENDER = Histogram(
+  'fyyur_template_render_seconds', 'Time spent rendering a template.',
+  ['template'], buckets=RENDER_BUCKETS)
+SEARCH_CACHE_LOOKUPS = Counter(
+  'fyyur_search_cache_lookups_total',
+  'Search result cache lookups: hit, miss, or stale (built before the last write, or expired).',
+  ['kind', 'result'])
+POOL_SIZE = Gauge(
+  'fyyur_db_pool_size', 'Configured connection pool size.', multiprocess_mode='livesum')
+POOL_CHECKED_OUT = Gauge(
+  'fyyur_db_pool_checked_out', 'Connections currently checked out of the pool.', multiprocess_mode='livesum')
+POOL_OVERFLOW = Gauge(
+  'fyyur_db_pool_overflow', 'Connections open beyond the pool size.', multiprocess_mode='livesum')
+POOL_WAIT = Histogram(
+  'fyyur_db_pool_wait_seconds', 'Time to get a connection from the pool, including waiting for a free one.',
+  buckets=(.0005, .001, .005, .01, .05, .1, .5, 1, 5, 10, 30))
+
+
+def _endpoint():
+  return request.endpoint or 'unmatched'
+
+
+def _update_pool(pool):
+  # only QueuePool keeps these counts; SQLite's NullPool/SingletonThreadPool don't
+  if isinstance(pool, QueuePool):
+    POOL_SIZE.set(pool.size())
+    POOL_OVERFLOW.set(max(pool.overflow(), 0))
+    POOL_CHECKED_OUT.set(pool.checkedout())
+
+
+def watch_pool(pool):
+  # the engine (and so its pool) is created lazily and replaced by dispose(),
+  # so this is called per request and only wraps a pool the first time
+  if getattr(pool, '_fyyur_metrics', False):
+    return
+  pool._fyyur_metrics = True
+  connect = pool.connect
+
+  def timed_connect(*args, **kwargs):
+    started = time.perf_counter()
+    try:
+      return connect(*args, **kwargs)
+    finally:
+      POOL_WAIT.observe(time.perf_counter() - started)
+      _update_pool(pool)
+
+  pool.connect = timed_connect
+  event.listen(pool, 'checkin', lambda *args: _update_pool(pool))
+  _update_pool(pool)
+
+
+def registry():
+  if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+    collected = CollectorRegistry()
+    multiprocess.MultiProcessCollector(collected)
+    return collected
+  return REGISTRY
+
+
+def init_app(app):
+  app.config.setdefault('METRICS_PATH', '/metrics')
+
+  @app.before_request
+  def start_timer():
+    g.metrics_started = time.perf_counter()
+    watch_pool(db.engine.pool)
+
+  @app.after_request
+  def record_request(response):
+    started = g.get('metrics_started')
+    if started is None:
+      return response
+    labels = (_endpoint(), request.method)
+    status = str(response.status_code)
+
+    def record():
+      REQUEST_LATENCY.labels(*labels).observe(time.perf_counter() - started)
+      REQUESTS.labels(*labels, status).inc()
+    # a streamed body (see streaming.py) is produced after this hook, so its
+    # time is only known once the server closes the response
+    if response.is_streamed:
+      response.call_on_close(record)
+    else:
+      record()
+    return response
+
+  def record_exception(sender, exception, **extra):
+    EXCEPTIONS.labels(_endpoint(), type(exception).__name__).inc()
+
+  def start_render(sender, template, context, **extra):
+    g.setdefault('metrics_renders', []).append(time.perf_counter())
+
+  def record_render(sender, template, context, **extra):
+    renders = g.get('metrics_renders')
+    if renders:
+      TEMPLATE_RENDER.labels(template.name or 'string').observe(time.perf_counter() - renders.pop())
+
+  # signals hold weak references by default; these closures live on the app
+  app.extensions['metrics'] = (record_exception, start_render, record_render)
+  got_request_exception.connect(record_exception, app)
+  before_render_template.connect(start_render, app)
+  template_rendered.connect(record_render, app)
+
+  @app.route(app.config['METRICS_PATH'])
+  def metrics():
+    return Response(generate_latest(registry()), headers={'Content-Type': CONTENT_TYPE_LATEST})
@@ -0,0 +1,79 @@
+"""add upcoming/past show counters to Venue and Artist
+
+Revision ID: a3e9d7c2f4b1
+Revises: f2c4d8e1a6b3
+Create Date: 2026-10-18 20:12:41.308519
+
+The counters are backfilled against a watermark of the migration time, which
+is stored in the single CounterState row. On SQLite the FTS update triggers
+are narrowed to the indexed columns so counter updates don't reindex.
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3e9d7c2f4b1'
+down_revision = 'f2c4d8e1a6b3'
+branch_labels = None
+depends_on = None
+
+OWNERS = {
+    'Venue': 'venue_id',
+    'Artist': 'artist_id',
+}
+FTS_TABLES = {
+    'venue': 'Venue',
+    'artist': 'Artist',
+}
+FTS_COLUMNS = ['name', 'city', 'state', 'genres']
+
+
+def _fts_update_trigger(kind, table, columns=None):
+    names = ', '.join(FTS_COLUMNS)
+    new_values = ', '.join(f'new.{column}' for column in FTS_COLUMNS)
+    old_values = ', '.join(f'old.{column}' for column in FTS_COLUMNS)
+    of = f' OF {", ".join(columns)}' if columns else ''
+    op.execute(f'DROP TRIGGER IF EXISTS {kind}_fts_update')
+    op.execute(f'CREATE TRIGGER {kind}_fts_update AFTER UPDATE{of} ON "{table}" BEGIN '
+               f"INSERT INTO {kind}_fts({kind}_fts, rowid, {names}) VALUES ('delete', old.id, {old_values}); "
+               f'INSERT INTO {kind}_fts(rowid, {names}) VALUES (new.id, {new_values}); END')
+
+
+def upgrade():
+    for table in OWNERS:
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(), server_default='0', nullable=False))
+        op.add_column(table, sa.Column('past_shows_count', sa.Integer(), server_default='0', nullable=False))
+    counter_state = op.create_table('CounterState',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('rolled_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    now = datetime.now()
+    op.bulk_insert(counter_state, [{'id': 1, 'rolled_at': now}])
+    for table, owner_column in OWNERS.items():
+        op.execute(sa.text(
+            f'UPDATE "{table}" SET '
+            f'upcoming_shows_count = (SELECT count(*) FROM "Show" '
+            f'WHERE "Show".{owner_column} = "{table}".id AND "Show".start_time > :now), '
+            f'past_shows_count = (SELECT count(*) FROM "Show" '
+            f'WHERE "Show".{owner_column} = "{table}".id AND "Show".start_time <= :now)'
+        ).bindparams(now=now))
+
+    if op.get_bind().dialect.name == 'sqlite':
+        for kind, table in FTS_TABLES.items():
+            _fts_update_trigger(kind, table, FTS_COLUMNS)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        for kind, table in FTS_TABLES.items():
+            _fts_update_trigger(kind, table)
+    op.drop_table('CounterState')
+    for table in ('Artist', 'Venue'):
+        op.drop_column(table, 'past_shows_count')
+        op.drop_column(table, 'upcoming_shows_count')
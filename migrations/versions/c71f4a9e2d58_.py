@@ -0,0 +1,25 @@
+"""extend the Venue city/state index with id for the keyset-paginated directory
+
+Revision ID: c71f4a9e2d58
+Revises: a3e9d7c2f4b1
+Create Date: 2026-10-18 21:40:17.552903
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c71f4a9e2d58'
+down_revision = 'a3e9d7c2f4b1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_Venue_city_state_id', 'Venue', ['city', 'state', 'id'], unique=False)
+    op.drop_index('ix_Venue_city_state', table_name='Venue')
+
+
+def downgrade():
+    op.create_index('ix_Venue_city_state', 'Venue', ['city', 'state'], unique=False)
+    op.drop_index('ix_Venue_city_state_id', table_name='Venue')
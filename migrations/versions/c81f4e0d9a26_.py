@@ -0,0 +1,61 @@
+"""add full-text search structures for venues and artists
+
+Revision ID: c81f4e0d9a26
+Revises: b5d2e81f3a47
+Create Date: 2026-10-18 11:40:05.927113
+
+On PostgreSQL this adds a generated search_vector tsvector column with a GIN
+index to Venue and Artist (the pg_trgm name indexes come from b5d2e81f3a47).
+On SQLite it adds external-content FTS5 tables kept in sync by triggers.
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c81f4e0d9a26'
+down_revision = 'b5d2e81f3a47'
+branch_labels = None
+depends_on = None
+
+TABLES = {
+    'venue': 'Venue',
+    'artist': 'Artist',
+}
+COLUMNS = ['name', 'city', 'state', 'genres']
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    for kind, table in TABLES.items():
+        if dialect == 'postgresql':
+            document = " || ' ' || ".join(f"coalesce({column}, '')" for column in COLUMNS)
+            op.execute(f'ALTER TABLE "{table}" ADD COLUMN search_vector tsvector '
+                       f"GENERATED ALWAYS AS (to_tsvector('simple', {document})) STORED")
+            op.execute(f'CREATE INDEX "ix_{table}_search_vector" ON "{table}" USING gin (search_vector)')
+        elif dialect == 'sqlite':
+            columns = ', '.join(COLUMNS)
+            new_values = ', '.join(f'new.{column}' for column in COLUMNS)
+            old_values = ', '.join(f'old.{column}' for column in COLUMNS)
+            op.execute(f"CREATE VIRTUAL TABLE {kind}_fts USING fts5({columns}, content='{table}', "
+                       f"content_rowid='id', prefix='2 3')")
+            op.execute(f'CREATE TRIGGER {kind}_fts_insert AFTER INSERT ON "{table}" BEGIN '
+                       f'INSERT INTO {kind}_fts(rowid, {columns}) VALUES (new.id, {new_values}); END')
+            op.execute(f'CREATE TRIGGER {kind}_fts_delete AFTER DELETE ON "{table}" BEGIN '
+                       f"INSERT INTO {kind}_fts({kind}_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END")
+            op.execute(f'CREATE TRIGGER {kind}_fts_update AFTER UPDATE ON "{table}" BEGIN '
+                       f"INSERT INTO {kind}_fts({kind}_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+                       f'INSERT INTO {kind}_fts(rowid, {columns}) VALUES (new.id, {new_values}); END')
+            op.execute(f"INSERT INTO {kind}_fts({kind}_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for kind, table in TABLES.items():
+        if dialect == 'postgresql':
+            op.execute(f'DROP INDEX IF EXISTS "ix_{table}_search_vector"')
+            op.drop_column(table, 'search_vector')
+        elif dialect == 'sqlite':
+            for trigger in ('insert', 'delete', 'update'):
+                op.execute(f'DROP TRIGGER IF EXISTS {kind}_fts_{trigger}')
+            op.execute(f'DROP TABLE IF EXISTS {kind}_fts')
@@ -0,0 +1,106 @@
+"""add Genre table with venue/artist association tables and backfill them
+
+Revision ID: d4e6a0b7c215
+Revises: c81f4e0d9a26
+Create Date: 2026-10-18 14:02:51.604118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4e6a0b7c215'
+down_revision = 'c81f4e0d9a26'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+genre = sa.Table('Genre', sa.MetaData(),
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('name', sa.String))
+DEFAULT_GENRES = ['Alternative', 'Blues', 'Classical', 'Country', 'Electronic',
+                  'Folk', 'Funk', 'Hip-Hop', 'Heavy Metal', 'Instrumental',
+                  'Jazz', 'Musical Theatre', 'Pop', 'Punk', 'R&B', 'Reggae',
+                  'Rock n Roll', 'Soul', 'Other']
+
+
+def parse_genres(value):
+    # list values were stored as array literals like '{Jazz,"Rock n Roll"}'
+    names = []
+    for name in (value or '').strip('{}').split(','):
+        name = name.strip().strip('"').strip()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def backfill(conn, table, association, owner_column, genre_ids):
+    entity = sa.table(table, sa.column('id', sa.Integer), sa.column('genres', sa.String))
+    link = sa.table(association, sa.column(owner_column, sa.Integer), sa.column('genre_id', sa.Integer))
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(entity.c.id, entity.c.genres)
+            .where(entity.c.id > last_id)
+            .order_by(entity.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        links = []
+        updates = []
+        for row in rows:
+            names = parse_genres(row.genres)
+            for name in names:
+                if name not in genre_ids:
+                    genre_ids[name] = conn.execute(genre.insert().values(name=name)).inserted_primary_key[0]
+                links.append({owner_column: row.id, 'genre_id': genre_ids[name]})
+            updates.append({'entity_id': row.id, 'genres': ','.join(names) or None})
+        if links:
+            conn.execute(link.insert(), links)
+        # rewrite the column in the canonical comma separated form
+        conn.execute(
+            entity.update().where(entity.c.id == sa.bindparam('entity_id')).values(genres=sa.bindparam('genres')),
+            updates
+        )
+        last_id = rows[-1].id
+
+
+def upgrade():
+    op.create_table('Genre',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('venue_genres',
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('genre_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['genre_id'], ['Genre.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['venue_id'], ['Venue.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('venue_id', 'genre_id')
+    )
+    op.create_index('ix_venue_genres_genre_id_venue_id', 'venue_genres', ['genre_id', 'venue_id'], unique=False)
+    op.create_table('artist_genres',
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('genre_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['artist_id'], ['Artist.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['genre_id'], ['Genre.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('artist_id', 'genre_id')
+    )
+    op.create_index('ix_artist_genres_genre_id_artist_id', 'artist_genres', ['genre_id', 'artist_id'], unique=False)
+
+    conn = op.get_bind()
+    conn.execute(genre.insert(), [{'name': name} for name in DEFAULT_GENRES])
+    genre_ids = {row.name: row.id for row in conn.execute(sa.select(genre.c.id, genre.c.name))}
+    backfill(conn, 'Venue', 'venue_genres', 'venue_id', genre_ids)
+    backfill(conn, 'Artist', 'artist_genres', 'artist_id', genre_ids)
+
+
+def downgrade():
+    op.drop_index('ix_artist_genres_genre_id_artist_id', table_name='artist_genres')
+    op.drop_table('artist_genres')
+    op.drop_index('ix_venue_genres_genre_id_venue_id', table_name='venue_genres')
+    op.drop_table('venue_genres')
+    op.drop_table('Genre')
@@ -0,0 +1,62 @@
+"""add Show.duration_minutes and keep venues and artists from being double-booked
+
+Revision ID: e58b2d7a1c93
+Revises: c71f4a9e2d58
+Create Date: 2026-10-19 09:14:52.180336
+
+Existing shows get the default length of two hours. On PostgreSQL, exclusion
+constraints (btree_gist) reject a show overlapping another show at the same
+venue or by the same artist; the upgrade stops with the clashing show ids if
+the existing calendar already has overlaps, so they can be fixed first.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e58b2d7a1c93'
+down_revision = 'c71f4a9e2d58'
+branch_labels = None
+depends_on = None
+
+OWNERS = ('venue_id', 'artist_id')
+
+
+def _show_range(prefix=''):
+    return (f"tsrange({prefix}start_time, "
+            f"{prefix}start_time + {prefix}duration_minutes * interval '1 minute')")
+
+
+def _overlaps(owner_column):
+    return op.get_bind().execute(sa.text(
+        f'SELECT a.id, b.id FROM "Show" a JOIN "Show" b '
+        f'ON a.{owner_column} = b.{owner_column} AND a.id < b.id '
+        f'AND {_show_range("a.")} && {_show_range("b.")} LIMIT 10'
+    )).fetchall()
+
+
+def upgrade():
+    with op.batch_alter_table('Show') as batch_op:
+        batch_op.add_column(sa.Column('duration_minutes', sa.Integer(), server_default='120', nullable=False))
+        batch_op.create_check_constraint('ck_Show_duration_minutes', 'duration_minutes BETWEEN 1 AND 1440')
+
+    if op.get_bind().dialect.name == 'postgresql':
+        for owner_column in OWNERS:
+            clashes = _overlaps(owner_column)
+            if clashes:
+                pairs = ', '.join(f'{a}/{b}' for a, b in clashes)
+                raise RuntimeError(f'shows overlap on {owner_column}, fix them before upgrading: {pairs}')
+        op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+        for owner_column in OWNERS:
+            op.execute(f'ALTER TABLE "Show" ADD CONSTRAINT "ex_Show_{owner_column}_overlap" '
+                       f'EXCLUDE USING gist ({owner_column} WITH =, {_show_range()} WITH &&)')
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        for owner_column in OWNERS:
+            op.execute(f'ALTER TABLE "Show" DROP CONSTRAINT "ex_Show_{owner_column}_overlap"')
+    with op.batch_alter_table('Show') as batch_op:
+        batch_op.drop_constraint('ck_Show_duration_minutes', type_='check')
+        batch_op.drop_column('duration_minutes')
@@ -0,0 +1,76 @@
+"""add updated_at to Venue, Artist and Show
+
+Revision ID: e7b1c93f5d08
+Revises: d4e6a0b7c215
+Create Date: 2026-10-18 16:25:13.480927
+
+Existing rows get the migration time, in UTC like the ORM's datetime.utcnow
+(see models.utcnow). SQLite can't add a column with a non-constant default,
+so there each table is copied into a new one with the column, and the FTS
+triggers from c81f4e0d9a26, dropped with the old Venue and Artist tables, are
+created again.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b1c93f5d08'
+down_revision = 'd4e6a0b7c215'
+branch_labels = None
+depends_on = None
+
+TABLES = ('Venue', 'Artist', 'Show')
+FTS_TABLES = {
+    'venue': 'Venue',
+    'artist': 'Artist',
+}
+FTS_COLUMNS = ['name', 'city', 'state', 'genres']
+
+
+def _utcnow():
+    if op.get_bind().dialect.name == 'postgresql':
+        return sa.text("timezone('utc', CURRENT_TIMESTAMP)")
+    return sa.text('CURRENT_TIMESTAMP')
+
+
+def _fts_triggers():
+    columns = ', '.join(FTS_COLUMNS)
+    new_values = ', '.join(f'new.{column}' for column in FTS_COLUMNS)
+    old_values = ', '.join(f'old.{column}' for column in FTS_COLUMNS)
+    for kind, table in FTS_TABLES.items():
+        op.execute(f'CREATE TRIGGER {kind}_fts_insert AFTER INSERT ON "{table}" BEGIN '
+                   f'INSERT INTO {kind}_fts(rowid, {columns}) VALUES (new.id, {new_values}); END')
+        op.execute(f'CREATE TRIGGER {kind}_fts_delete AFTER DELETE ON "{table}" BEGIN '
+                   f"INSERT INTO {kind}_fts({kind}_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END")
+        op.execute(f'CREATE TRIGGER {kind}_fts_update AFTER UPDATE ON "{table}" BEGIN '
+                   f"INSERT INTO {kind}_fts({kind}_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+                   f'INSERT INTO {kind}_fts(rowid, {columns}) VALUES (new.id, {new_values}); END')
+
+
+def upgrade():
+    sqlite = op.get_bind().dialect.name == 'sqlite'
+    for table in TABLES:
+        column = sa.Column('updated_at', sa.DateTime(), server_default=_utcnow(), nullable=False)
+        if sqlite:
+            with op.batch_alter_table(table, recreate='always') as batch_op:
+                batch_op.add_column(column)
+        else:
+            op.add_column(table, column)
+        op.create_index(f'ix_{table}_updated_at', table, ['updated_at'], unique=False)
+    if sqlite:
+        _fts_triggers()
+
+
+def downgrade():
+    sqlite = op.get_bind().dialect.name == 'sqlite'
+    for table in ('Show', 'Artist', 'Venue'):
+        op.drop_index(f'ix_{table}_updated_at', table_name=table)
+        if sqlite:
+            with op.batch_alter_table(table, recreate='always') as batch_op:
+                batch_op.drop_column('updated_at')
+        else:
+            op.drop_column(table, 'updated_at')
+    if sqlite:
+        _fts_triggers()
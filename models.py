@@ -1,12 +1,73 @@
-from flask_sqlalchemy import SQLAlchemy
+from datetime import datetime
+
+from sqlalchemy import DateTime
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+
+from database import RoutingSQLAlchemy
+
+db = RoutingSQLAlchemy()
+
+
+class utcnow(FunctionElement):
+  # the current UTC time as a naive timestamp, the database-side twin of
+  # datetime.utcnow for rows written without the ORM (COPY, migrations);
+  # PostgreSQL's now() would be in the session's time zone
+  type = DateTime()
+  inherit_cache = True
+
+
+@compiles(utcnow)
+def _utcnow(element, compiler, **kw):
+  # SQLite's CURRENT_TIMESTAMP is UTC
+  return 'CURRENT_TIMESTAMP'
+
+
+@compiles(utcnow, 'postgresql')
+def _utcnow_postgresql(element, compiler, **kw):
+  return "timezone('utc', CURRENT_TIMESTAMP)"
+
+# show lengths; the overlap checks in bookings.py rely on the upper bound
+DEFAULT_SHOW_MINUTES = 120
+MAX_SHOW_MINUTES = 24 * 60
+
+venue_genres = db.Table('venue_genres',
+    db.Column('venue_id', db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id', ondelete='CASCADE'), primary_key=True),
+    # the primary key serves venue -> genres, this serves genre -> venues
+    db.Index('ix_venue_genres_genre_id_venue_id', 'genre_id', 'venue_id'),
+)
+
+artist_genres = db.Table('artist_genres',
+    db.Column('artist_id', db.Integer, db.ForeignKey('Artist.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_artist_genres_genre_id_artist_id', 'genre_id', 'artist_id'),
+)
+
+
+class Genre(db.Model):
+    __tablename__ = 'Genre'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+
+    def __repr__(self) -> str:
+      return f'<Genre {self.id} {self.name}>'
 
-db = SQLAlchemy()
 
 class Venue(db.Model):
     __tablename__ = 'Venue'
+    __table_args__ = (
+        db.Index('ix_Venue_city_state_id', 'city', 'state', 'id'),
+        db.Index('ix_Venue_updated_at', 'updated_at'),
+        # trigram GIN on PostgreSQL so ilike('%term%') can use it, plain btree elsewhere
+        db.Index('ix_Venue_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
+    # comma separated copy of genre_list, kept for display and the search document
     genres = db.Column(db.String(120))
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
@@ -17,7 +78,14 @@ class Venue(db.Model):
     website_link = db.Column(db.String(120), nullable=True)
     seeking_talent = db.Column(db.Boolean, default=False, server_default="false")
     seeking_description = db.Column(db.String(250), nullable=True)
+    # bumped on every insert and update (including Query.update()), feeds the page validators
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow,
+                           onupdate=datetime.utcnow, server_default=utcnow())
+    # maintained by counters.py; upcoming means after CounterState.rolled_at
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     shows = db.relationship('Show', backref='listVenues', lazy=True)
+    genre_list = db.relationship('Genre', secondary=venue_genres, lazy=True, order_by='Genre.name')
 
     def __repr__(self) -> str:
       return f'<Venue {self.id} {self.name} {self.genres} {self.city} {self.state} {self.address}>'
@@ -27,6 +95,11 @@ class Venue(db.Model):
 
 class Artist(db.Model):
     __tablename__ = 'Artist'
+    __table_args__ = (
+        db.Index('ix_Artist_updated_at', 'updated_at'),
+        db.Index('ix_Artist_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
@@ -39,7 +112,12 @@ class Artist(db.Model):
     website_link = db.Column(db.String(120))
     seeking_venue = db.Column(db.Boolean, default=False, server_default="false")
     seeking_description = db.Column(db.String(250), nullable=True)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow,
+                           onupdate=datetime.utcnow, server_default=utcnow())
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     shows = db.relationship('Show', backref='listArtists', lazy=True)
+    genre_list = db.relationship('Genre', secondary=artist_genres, lazy=True, order_by='Genre.name')
 
     def __repr__(self) -> str:
       return f'<Artist {self.id} {self.name} {self.city} {self.state} {self.genres}>'
@@ -48,11 +126,44 @@ class Artist(db.Model):
 
 class Show(db.Model):
   __tablename__ = 'Show'
+  __table_args__ = (
+      db.Index('ix_Show_venue_id_start_time', 'venue_id', 'start_time'),
+      db.Index('ix_Show_artist_id_start_time', 'artist_id', 'start_time'),
+      # backs the (start_time, id) keyset ordering of /shows
+      db.Index('ix_Show_start_time_id', 'start_time', 'id'),
+      db.Index('ix_Show_updated_at', 'updated_at'),
+      db.CheckConstraint(f'duration_minutes BETWEEN 1 AND {MAX_SHOW_MINUTES}', name='ck_Show_duration_minutes'),
+      # on PostgreSQL the migration also adds exclusion constraints against
+      # overlapping shows at a venue or by an artist (see bookings.py)
+  )
   id = db.Column(db.Integer, primary_key=True)
   start_time = db.Column(db.DateTime, nullable=False) #default=datetime.utcnow)
+  duration_minutes = db.Column(db.Integer, nullable=False, default=DEFAULT_SHOW_MINUTES,
+                               server_default=str(DEFAULT_SHOW_MINUTES))
   artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id'), nullable=False)
   venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'), nullable=False)
+  updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow,
+                         onupdate=datetime.utcnow, server_default=utcnow())
 
   def __repr__(self) -> str:
       return f'<Show id: {self.id},artist_id: {self.artist_id},venue_id: {self.venue_id} {self.start_time}>'
 
+
+
+class ImportCheckpoint(db.Model):
+  # progress of `flask import` runs, committed with each batch so a rerun resumes
+  __tablename__ = 'ImportCheckpoint'
+  source = db.Column(db.String(600), primary_key=True)
+  fingerprint = db.Column(db.String(120), nullable=False)
+  rows_done = db.Column(db.Integer, nullable=False, default=0)
+  updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+  def __repr__(self) -> str:
+      return f'<ImportCheckpoint {self.source} {self.rows_done}>'
+
+
+class CounterState(db.Model):
+  # single row: shows starting after rolled_at are counted as upcoming
+  __tablename__ = 'CounterState'
+  id = db.Column(db.Integer, primary_key=True)
+  rolled_at = db.Column(db.DateTime, nullable=False)
@@ -0,0 +1,134 @@
+from datetime import datetime
+
+from flask import abort, current_app
+from sqlalchemy import bindparam, case, func, select, tuple_
+
+from models import db, artist_genres, venue_genres, Artist, Genre, Show, Venue
+from viewmodels import (ArtistPage, ArtistShow, VenuePage, VenueShow, ARTIST_PAGE_COLUMNS, ARTIST_SHOW_COLUMNS,
+                        VENUE_PAGE_COLUMNS, VENUE_SHOW_COLUMNS)
+from pagination import page_size_arg, encode_cursor
+from streaming import Page
+
+# Data for the venue and artist detail pages, shared by the HTML controllers
+# and the JSON API and cached through cache.PageCache. Show start times are
+# datetimes, formatted by the template filter or the API. The data is a
+# VenuePage / ArtistPage read model (see viewmodels.py) holding the first
+# DETAIL_PAGE_SHOWS shows of each section and the section sizes; the rest of
+# the past shows are paged in by the past-shows fragment views.
+
+
+def _sections_statement(columns, other, onclause, owner_column):
+  # An owner's shows joined to the other side, ranked with window functions:
+  # upcoming soonest first and past newest first, keeping the first :limit of
+  # each section along with the section's size. Built once per page kind;
+  # :owner_id, :now and :limit are bound per execution.
+  upcoming = Show.start_time > bindparam('now')
+  ranked = select(
+    *columns,
+    upcoming.label('upcoming'),
+    func.row_number().over(
+      partition_by=upcoming,
+      order_by=(case((upcoming, Show.start_time)), Show.start_time.desc(), Show.id.desc()),
+    ).label('position'),
+    func.count().over(partition_by=upcoming).label('total'),
+  ).join_from(Show, other, onclause).where(owner_column == bindparam('owner_id')).subquery()
+  return select(ranked).where(ranked.c.position <= bindparam('limit')).order_by(ranked.c.position)
+
+
+VENUE_SECTIONS = _sections_statement(VENUE_SHOW_COLUMNS, Artist, Show.artist_id == Artist.id, Show.venue_id)
+ARTIST_SECTIONS = _sections_statement(ARTIST_SHOW_COLUMNS, Venue, Show.venue_id == Venue.id, Show.artist_id)
+
+
+def _sections(statement, show_model, owner_id):
+  # (past shows, upcoming shows, past count, upcoming count) from one query
+  rows = db.session.execute(statement, {
+    'owner_id': owner_id,
+    'now': datetime.now(),
+    'limit': current_app.config['DETAIL_PAGE_SHOWS'],
+  })
+  width = len(show_model._fields)
+  sections = {False: [], True: []}
+  totals = {False: 0, True: 0}
+  for row in rows:
+    sections[bool(row.upcoming)].append(show_model._make(row[:width]))
+    totals[bool(row.upcoming)] = row.total
+  return sections[False], sections[True], totals[False], totals[True]
+
+
+def _past_page(query, show_model, cursor):
+  # a page of past shows after cursor, newest first
+  query = query.filter(Show.start_time <= datetime.now())
+  if cursor:
+    query = query.filter(tuple_(Show.start_time, Show.id) < tuple_(*cursor))
+  query = query.order_by(Show.start_time.desc(), Show.id.desc())
+  return Page(query, page_size_arg(), key=show_cursor, item=show_model._make)
+
+
+def show_cursor(show):
+  return encode_cursor(show.start_time, show.show_id)
+
+
+def more_past_cursor(data):
+  # where the "more past shows" pages start, if the page left any out
+  if data.past_shows_count > len(data.past_shows):
+    return show_cursor(data.past_shows[-1])
+  return None
+
+
+def _genres(genres_table, owner_column, owner_id):
+  return [name for (name,) in db.session.query(Genre.name)
+          .join(genres_table, genres_table.c.genre_id == Genre.id)
+          .filter(owner_column == owner_id)
+          .order_by(Genre.name)]
+
+
+def venue_page_data(venue_id):
+  # venue page data and the next upcoming show start, after which it is stale
+  venue = db.session.query(*VENUE_PAGE_COLUMNS).filter(Venue.id == venue_id).first()
+  if venue is None:
+    abort(404)
+
+  past_shows, upcoming_shows, past_count, upcoming_count = _sections(VENUE_SECTIONS, VenueShow, venue_id)
+
+  data = VenuePage(
+    *venue,
+    genres=_genres(venue_genres, venue_genres.c.venue_id, venue_id),
+    past_shows=past_shows,
+    upcoming_shows=upcoming_shows,
+    past_shows_count=past_count,
+    upcoming_shows_count=upcoming_count,
+  )
+  next_show_start = upcoming_shows[0].start_time if upcoming_shows else None
+  return data, next_show_start
+
+
+def artist_page_data(artist_id):
+  # artist page data and the next upcoming show start, after which it is stale
+  artist = db.session.query(*ARTIST_PAGE_COLUMNS).filter(Artist.id == artist_id).first()
+  if artist is None:
+    abort(404)
+
+  past_shows, upcoming_shows, past_count, upcoming_count = _sections(ARTIST_SECTIONS, ArtistShow, artist_id)
+
+  data = ArtistPage(
+    *artist,
+    genres=_genres(artist_genres, artist_genres.c.artist_id, artist_id),
+    past_shows=past_shows,
+    upcoming_shows=upcoming_shows,
+    past_shows_count=past_count,
+    upcoming_shows_count=upcoming_count,
+  )
+  next_show_start = upcoming_shows[0].start_time if upcoming_shows else None
+  return data, next_show_start
+
+
+def venue_past_shows_page(venue_id, cursor):
+  query = db.session.query(*VENUE_SHOW_COLUMNS).join(Artist, Show.artist_id == Artist.id)\
+    .filter(Show.venue_id == venue_id)
+  return _past_page(query, VenueShow, cursor)
+
+
+def artist_past_shows_page(artist_id, cursor):
+  query = db.session.query(*ARTIST_SHOW_COLUMNS).join(Venue, Show.venue_id == Venue.id)\
+    .filter(Show.artist_id == artist_id)
+  return _past_page(query, ArtistShow, cursor)
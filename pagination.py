@@ -0,0 +1,53 @@
+import base64
+import json
+from datetime import datetime
+
+from flask import abort, current_app, request
+
+# Keyset (cursor) pagination helpers.
+# A cursor is the sort key of the last row on the previous page, e.g.
+# "2035-04-01T20:00:00_42" for (start_time, id), so the next page is a plain
+# index range scan instead of an OFFSET that grows with the table. Keys of
+# other shapes go through encode_key/decode_key as opaque url-safe strings.
+
+
+def page_size_arg():
+  default = current_app.config['PAGE_SIZE']
+  per_page = request.args.get('per_page', default, type=int)
+  if per_page < 1:
+    per_page = default
+  return min(per_page, current_app.config['MAX_PAGE_SIZE'])
+
+
+def encode_cursor(start_time, row_id):
+  return f'{start_time.isoformat()}_{row_id}'
+
+
+def decode_cursor(cursor):
+  try:
+    start_time, row_id = cursor.rsplit('_', 1)
+    return datetime.fromisoformat(start_time), int(row_id)
+  except ValueError:
+    abort(400)
+
+
+def cursor_arg():
+  cursor = request.args.get('cursor')
+  if not cursor:
+    return None
+  return decode_cursor(cursor)
+
+
+def encode_key(*values):
+  data = json.dumps(values, separators=(',', ':')).encode()
+  return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def decode_key(cursor, length):
+  try:
+    values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+  except ValueError:
+    abort(400)
+  if not isinstance(values, list) or len(values) != length:
+    abort(400)
+  return values
@@ -0,0 +1,318 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict, namedtuple
+from itertools import chain
+
+from flask import current_app
+from sqlalchemy import event, func, inspect, literal_column, or_, text
+
+from database import use_replica
+from metrics import SEARCH_CACHE_LOOKUPS
+from models import db, Artist, Venue
+
+# Ranked venue/artist search behind one search() function.
+# The backend is picked from SEARCH_BACKEND ('auto', 'postgresql', 'sqlite',
+# 'memory'); 'auto' uses the tsvector/trigram indexes on PostgreSQL, the FTS5
+# tables on SQLite when the migration created them, and otherwise an
+# in-process inverted index.
+# The search views cache their results per process with cached() (see
+# ResultCache below).
+
+SearchResult = namedtuple('SearchResult', 'total ids')
+
+MODELS = {
+  'venue': Venue,
+  'artist': Artist,
+}
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(value):
+  return TOKEN_RE.findall((value or '').lower())
+
+
+def _all(model, page, per_page):
+  # an empty term lists everything, like ilike('%%') did
+  total = db.session.query(func.count(model.id)).scalar()
+  ids = [row.id for row in db.session.query(model.id)
+         .order_by(model.name, model.id)
+         .limit(per_page).offset((page - 1) * per_page)]
+  return SearchResult(total, ids)
+
+
+class PostgresSearch:
+  # search_vector is a generated tsvector column (see migration c81f4e0d9a26),
+  # so it is not declared on the models and is referenced by name here.
+
+  def search(self, kind, term, page, per_page):
+    model = MODELS[kind]
+    tokens = tokenize(term)
+    if not tokens:
+      return _all(model, page, per_page)
+
+    vector = literal_column(f'"{model.__tablename__}".search_vector')
+    tsquery = func.to_tsquery('simple', ' & '.join(f'{token}:*' for token in tokens))
+    rank = func.ts_rank(vector, tsquery) + func.similarity(model.name, term)
+    rows = db.session.query(model.id, func.count().over().label('total'))\
+      .filter(or_(vector.op('@@')(tsquery), model.name.ilike(f'%{term}%')))\
+      .order_by(rank.desc(), model.id)\
+      .limit(per_page).offset((page - 1) * per_page).all()
+    if not rows:
+      return SearchResult(self._count(model, vector, tsquery, term) if page > 1 else 0, [])
+    return SearchResult(rows[0].total, [row.id for row in rows])
+
+  def _count(self, model, vector, tsquery, term):
+    return db.session.query(func.count(model.id))\
+      .filter(or_(vector.op('@@')(tsquery), model.name.ilike(f'%{term}%'))).scalar()
+
+
+class SqliteFtsSearch:
+  # venue_fts / artist_fts are external-content FTS5 tables kept in sync by
+  # triggers (see migration c81f4e0d9a26); bm25 weights favour the name column.
+
+  SQL = '''
+    SELECT id, count(*) OVER () AS total
+    FROM (
+      SELECT rowid AS id, bm25({table}, 10.0, 2.0, 2.0, 1.0) AS rank
+      FROM {table}
+      WHERE {table} MATCH :match
+    )
+    ORDER BY rank, id
+    LIMIT :limit OFFSET :offset
+  '''
+
+  def search(self, kind, term, page, per_page):
+    model = MODELS[kind]
+    tokens = tokenize(term)
+    if not tokens:
+      return _all(model, page, per_page)
+
+    table = f'{kind}_fts'
+    params = {
+      'match': ' '.join(f'"{token}"*' for token in tokens),
+      'limit': per_page,
+      'offset': (page - 1) * per_page,
+    }
+    rows = db.session.execute(text(self.SQL.format(table=table)), params).fetchall()
+    if not rows:
+      total = 0
+      if page > 1:
+        total = db.session.execute(
+          text(f'SELECT count(*) FROM {table} WHERE {table} MATCH :match'), params).scalar()
+      return SearchResult(total, [])
+    return SearchResult(rows[0].total, [row.id for row in rows])
+
+
+class MemorySearch:
+  # Inverted index held in process: token -> {id: weight}, with the tokens kept
+  # sorted so a prefix lookup is a bisect. Rebuilt lazily after a commit that
+  # wrote venues or artists (see the session listeners below), which is fine
+  # for tests and small dev databases.
+
+  FIELD_WEIGHTS = (('name', 3), ('city', 1), ('state', 1), ('genres', 1))
+
+  def __init__(self):
+    self._indexes = None
+
+  def mark_stale(self):
+    self._indexes = None
+
+  def _build(self):
+    indexes = {}
+    for kind, model in MODELS.items():
+      postings = {}
+      names = {}
+      columns = [getattr(model, field) for field, _ in self.FIELD_WEIGHTS]
+      for row in db.session.query(model.id, *columns):
+        names[row.id] = ((row.name or '').lower(), row.id)
+        for field, weight in self.FIELD_WEIGHTS:
+          for token in tokenize(getattr(row, field)):
+            entry = postings.setdefault(token, {})
+            entry[row.id] = max(entry.get(row.id, 0), weight)
+      indexes[kind] = (sorted(postings), postings, names)
+    return indexes
+
+  def _matches(self, tokens, postings, token):
+    # best weight per id over every indexed token starting with `token`
+    matches = {}
+    position = bisect_left(tokens, token)
+    while position < len(tokens) and tokens[position].startswith(token):
+      for row_id, weight in postings[tokens[position]].items():
+        if tokens[position] == token:
+          weight += 1
+        if weight > matches.get(row_id, 0):
+          matches[row_id] = weight
+      position += 1
+    return matches
+
+  def search(self, kind, term, page, per_page):
+    query_tokens = tokenize(term)
+    if not query_tokens:
+      return _all(MODELS[kind], page, per_page)
+    indexes = self._indexes
+    if indexes is None:
+      indexes = self._build()
+      # like ResultCache, keep only what the primary returned
+      if not use_replica():
+        self._indexes = indexes
+    tokens, postings, names = indexes[kind]
+
+    scores = None
+    for token in query_tokens:
+      matches = self._matches(tokens, postings, token)
+      if scores is None:
+        scores = matches
+      else:
+        scores = {row_id: score + matches[row_id]
+                  for row_id, score in scores.items() if row_id in matches}
+      if not scores:
+        return SearchResult(0, [])
+
+    ranked = sorted(scores, key=lambda row_id: (-scores[row_id], names[row_id]))
+    start = (page - 1) * per_page
+    return SearchResult(len(ranked), ranked[start:start + per_page])
+
+
+# Registered once on the app session factory, rather than per MemorySearch
+# on every Session: a transaction that flushes or bulk-updates venues or
+# artists marks its app's index stale when it commits. Show and counter
+# writes leave it alone.
+SEARCHED_MODELS = tuple(MODELS.values())
+STALE_KEY = 'search_index_stale'
+
+
+@event.listens_for(db.session.session_factory, 'after_flush')
+def _flushed(session, flush_context):
+  if any(isinstance(instance, SEARCHED_MODELS) for instance in chain(session.new, session.dirty, session.deleted)):
+    session.info[STALE_KEY] = True
+
+
+@event.listens_for(db.session.session_factory, 'after_bulk_update')
+@event.listens_for(db.session.session_factory, 'after_bulk_delete')
+def _bulk_written(context):
+  if issubclass(context.mapper.class_, SEARCHED_MODELS):
+    context.session.info[STALE_KEY] = True
+
+
+@event.listens_for(db.session.session_factory, 'after_commit')
+def _committed(session):
+  if session.info.pop(STALE_KEY, False):
+    backend = session.app.extensions.get('search')
+    if isinstance(backend, MemorySearch):
+      backend.mark_stale()
+
+
+@event.listens_for(db.session.session_factory, 'after_rollback')
+def _rolled_back(session):
+  session.info.pop(STALE_KEY, None)
+
+
+BACKENDS = {
+  'postgresql': PostgresSearch,
+  'sqlite': SqliteFtsSearch,
+  'memory': MemorySearch,
+}
+
+
+def _create_backend(name):
+  if name == 'auto':
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+      name = 'postgresql'
+    elif dialect == 'sqlite' and inspect(db.engine).has_table('venue_fts'):
+      name = 'sqlite'
+    else:
+      name = 'memory'
+  return BACKENDS[name]()
+
+
+class ResultCache:
+  # LRU of search view results bounded to max_entries, keyed by (kind,
+  # normalized term, page). Every entry records the data generation it was
+  # built in; a write bumps the generation, which leaves every older entry
+  # stale at once without visiting it: it misses on its next lookup and is
+  # replaced, or ages out of the LRU. The generation is per process, so
+  # entries also never outlive ttl seconds, which bounds how long another
+  # worker's writes take to show up. Results read from a replica aren't
+  # stored, since they may predate a write whose bump has already happened.
+
+  def __init__(self, max_entries=256, ttl=60):
+    self.max_entries = max_entries
+    self.ttl = ttl
+    self.generation = 0
+    self.hits = 0
+    self.misses = 0
+    self._entries = OrderedDict()
+    self._lock = threading.Lock()
+
+  def bump(self):
+    with self._lock:
+      self.generation += 1
+
+  def _get(self, key):
+    # (result, 'hit') or (None, 'miss' or 'stale')
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None:
+        return None, 'miss'
+      generation, expires_at, result = entry
+      if generation != self.generation or expires_at <= time.monotonic():
+        del self._entries[key]
+        return None, 'stale'
+      self._entries.move_to_end(key)
+      return result, 'hit'
+
+  def fetch(self, key, build):
+    result, outcome = self._get(key)
+    SEARCH_CACHE_LOOKUPS.labels(key[0], outcome).inc()
+    if outcome == 'hit':
+      self.hits += 1
+      return result
+    self.misses += 1
+    # a write committed while build() runs makes its result stale already
+    generation = self.generation
+    result = build()
+    if self.max_entries > 0 and not use_replica():
+      with self._lock:
+        self._entries[key] = (generation, time.monotonic() + self.ttl, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+          self._entries.popitem(last=False)
+    return result
+
+  def hit_rate(self):
+    lookups = self.hits + self.misses
+    return self.hits / lookups if lookups else 0.0
+
+
+def init_app(app):
+  app.config.setdefault('SEARCH_BACKEND', 'auto')
+  app.config.setdefault('SEARCH_CACHE_SIZE', 256)
+  app.config.setdefault('SEARCH_CACHE_TTL', 60)
+  # resolved on first search, picking a backend needs a database connection
+  app.extensions['search'] = None
+  app.extensions['search_cache'] = ResultCache(app.config['SEARCH_CACHE_SIZE'], app.config['SEARCH_CACHE_TTL'])
+
+
+def search(kind, term, page=1, per_page=None):
+  backend = current_app.extensions['search']
+  if backend is None:
+    backend = current_app.extensions['search'] = _create_backend(current_app.config['SEARCH_BACKEND'])
+  per_page = per_page or current_app.config['PAGE_SIZE']
+  return backend.search(kind, term.strip(), max(page, 1), per_page)
+
+
+def cached(kind, term, page, build):
+  # build() makes the view's results for this term and page; searches are
+  # case-insensitive, so terms differing only in case or spacing share them
+  key = (kind, ' '.join(term.lower().split()), max(page, 1))
+  return current_app.extensions['search_cache'].fetch(key, build)
+
+
+def data_changed():
+  # called by the controllers after every committed write to venues, artists
+  # or shows
+  current_app.extensions['search_cache'].bump()
@@ -0,0 +1,190 @@
+from flask import Blueprint, current_app, render_template, request, flash
+from sqlalchemy import literal, select, tuple_, union_all
+
+import bookings
+import search
+from cache import invalidate_show
+from conditional import conditional
+from models import db, Artist, Venue, Show
+from pagination import page_size_arg, cursor_arg, encode_cursor
+from streaming import Page, render_listing
+from validators import shows_validator
+from viewmodels import ShowTile, SHOW_TILE_COLUMNS
+
+# Show controllers. The form is imported inside the views that use it so the
+# WTForms stack is only loaded once a form is first requested.
+
+blueprint = Blueprint('shows', __name__)
+
+#  Shows
+#  ----------------------------------------------------------------
+
+@blueprint.route('/shows')
+@conditional(shows_validator)
+def shows():
+  # displays list of shows (real venues data), one joined query per page
+  # keyset paginated on (start_time, id) so deep pages cost the same as the first,
+  # and streamed as it renders (see streaming.py)
+  page_size = page_size_arg()
+  cursor = cursor_arg()
+
+  query = db.session.query(*SHOW_TILE_COLUMNS)\
+   .join(Venue, Show.venue_id == Venue.id)\
+   .join(Artist, Show.artist_id == Artist.id)\
+   .order_by(Show.start_time.desc(), Show.id.desc())
+
+  if cursor:
+    query = query.filter(tuple_(Show.start_time, Show.id) < tuple_(*cursor))
+
+  page = Page(query, page_size, key=lambda show: encode_cursor(show.start_time, show.id), item=ShowTile._make)
+  return render_listing('pages/shows.html', shows=page, page=page, per_page=page_size)
+
+@blueprint.route('/shows/create')
+def create_shows():
+  from forms import ShowForm
+  form = ShowForm()
+  return render_template('forms/new_show.html', form=form)
+
+
+@blueprint.route('/shows/create', methods=['POST'])
+def create_show_submission():
+  from forms import ShowForm
+  # on successful db insert, flashes success
+  form = ShowForm(request.form,meta={'csrf':False})
+  if form.validate() and _bookable([form]):
+    try:
+      if form.repeat.data:
+        # a residency: the same show every week or month, booked as one batch
+        limit = current_app.config['MAX_SHOW_BATCH']
+        times = bookings.occurrences(form.start_time.data, form.repeat.data, form.repeat_until.data, limit)
+        if times is None:
+          form.repeat_until.errors.append(f'That repeats the show more than {limit} times; choose an earlier date.')
+          return _invalid(form)
+        shows = [dict(_values(form), start_time=start_time) for start_time in times]
+        if not _book_batch([form] * len(shows), shows):
+          return _invalid(form)
+      else:
+        show = Show(**_values(form))
+        clashes = bookings.book(show)
+        if clashes:
+          # the venue or the artist is busy then; back to the form with the clashes
+          for conflict in clashes:
+            getattr(form, f'{conflict.kind}_id').errors.append(bookings.message(conflict))
+          return _invalid(form)
+        shows = [_values(form)]
+      db.session.commit()
+      invalidate_show(form.venue_id.data, form.artist_id.data)
+      search.data_changed()
+      if len(shows) == 1:
+        flash('Show was successfully listed!')
+      else:
+        flash(f'{len(shows)} shows were successfully listed!')
+
+# on unsuccessful db insert, flashes an error instead.
+    except Exception:
+      db.session.rollback()
+      current_app.logger.exception('Show could not be listed')
+      flash('An error occurred. Show could not be listed.')
+    finally:
+      db.session.close()
+  else:
+    return _invalid(form)
+  return render_template('pages/shows.html')
+
+  # called to create new shows in the db, upon submitting new show listing form
+  # inserts form data as a new Show record in the db, instead
+
+
+@blueprint.route('/shows/create-batch')
+def create_show_batch():
+  from forms import ShowBatchForm
+  form = ShowBatchForm()
+  rows = max(1, min(request.args.get('rows', 5, type=int), current_app.config['MAX_SHOW_BATCH']))
+  while len(form.shows) < rows:
+    form.shows.append_entry()
+  return render_template('forms/new_shows.html', form=form)
+
+
+@blueprint.route('/shows/create-batch', methods=['POST'])
+def create_show_batch_submission():
+  # several shows from the multi-row form, inserted together or not at all
+  from forms import ShowBatchForm
+  form = ShowBatchForm(request.form, meta={'csrf': False})
+  rows = [entry.form for entry in form.shows]
+  limit = current_app.config['MAX_SHOW_BATCH']
+  if len(rows) > limit:
+    flash(f'At most {limit} shows can be listed at once.')
+    return render_template('forms/new_shows.html', form=form)
+  if not (form.validate() and _bookable(rows)):
+    return _invalid(form, 'forms/new_shows.html')
+  shows = [_values(row) for row in rows]
+  try:
+    if not _book_batch(rows, shows):
+      return _invalid(form, 'forms/new_shows.html')
+    db.session.commit()
+    for venue_id, artist_id in {(show['venue_id'], show['artist_id']) for show in shows}:
+      invalidate_show(venue_id, artist_id)
+    search.data_changed()
+    flash(f'{len(shows)} shows were successfully listed!')
+  except Exception:
+    db.session.rollback()
+    current_app.logger.exception('Shows could not be listed')
+    flash('An error occurred. Shows could not be listed.')
+  finally:
+    db.session.close()
+  return render_template('pages/shows.html')
+
+
+def _values(form):
+  return {
+    'venue_id': form.venue_id.data,
+    'artist_id': form.artist_id.data,
+    'start_time': form.start_time.data,
+    'duration_minutes': form.duration_minutes.data,
+  }
+
+
+def _bookable(forms):
+  # the venues and artists must exist; the ids are typed in by hand
+  venue_ids = {form.venue_id.data for form in forms}
+  artist_ids = {form.artist_id.data for form in forms}
+  found = set(db.session.execute(union_all(
+    select(literal('venue'), Venue.id).where(Venue.id.in_(venue_ids)),
+    select(literal('artist'), Artist.id).where(Artist.id.in_(artist_ids)),
+  )))
+  valid = True
+  for form in forms:
+    for field, kind in ((form.venue_id, 'venue'), (form.artist_id, 'artist')):
+      if (kind, field.data) not in found:
+        field.errors.append(f'There is no {kind} with ID {field.data}.')
+        valid = False
+  return valid
+
+
+def _book_batch(forms, shows):
+  # Books shows in one insert with one conflict check. forms[i] is the form
+  # shows[i] came from, which gets its errors.
+  overlaps = bookings.overlaps_within(shows)
+  for first, second in overlaps:
+    forms[second].start_time.errors.append(f'This overlaps row {first + 1} at the same venue or by the same artist.')
+  if overlaps:
+    return False
+  clashes = bookings.book_all(shows)
+  for index, conflict in clashes:
+    getattr(forms[index], f'{conflict.kind}_id').errors.append(bookings.message(conflict))
+  return not clashes
+
+
+def _invalid(form, template='forms/new_show.html'):
+  # field by field, as errors are added after validation; rows of the batch
+  # form say which row they're from
+  for field in form:
+    if field.type == 'FieldList':
+      for row, entry in enumerate(field, 1):
+        for subfield in entry:
+          for message in subfield.errors:
+            flash(f'Row {row}: {message}')
+    else:
+      for message in field.errors:
+        flash(message)
+  return render_template(template, form=form)
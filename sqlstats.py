@@ -0,0 +1,140 @@
+import heapq
+import json
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Per-request SQL instrumentation.
+# Engine events time every statement executed while a request is active and
+# add it to g.sql_stats. After the request the totals go to the app.sql logger
+# as one JSON line, statements slower than SQL_SLOW_QUERY_MS are logged on
+# their own, and a statement (compared with its bound parameters left out)
+# that ran more than SQL_REPEAT_THRESHOLD times is reported as a likely N+1.
+# The response gets a Server-Timing header, unless it is streamed, and in
+# debug mode the layout renders a panel from the same numbers.
+
+
+class RequestStats:
+
+  def __init__(self, keep_slowest=5):
+    self.started = time.perf_counter()
+    self.count = 0
+    self.db_time = 0.0
+    self.keep_slowest = keep_slowest
+    # statement -> [times run, total seconds]
+    self.statements = {}
+    # min-heap of the slowest (seconds, statement)
+    self._slowest = []
+
+  def record(self, statement, duration):
+    self.count += 1
+    self.db_time += duration
+    totals = self.statements.setdefault(statement, [0, 0.0])
+    totals[0] += 1
+    totals[1] += duration
+    if len(self._slowest) < self.keep_slowest:
+      heapq.heappush(self._slowest, (duration, statement))
+    elif duration > self._slowest[0][0]:
+      heapq.heapreplace(self._slowest, (duration, statement))
+
+  def slowest(self):
+    return sorted(self._slowest, reverse=True)
+
+  def repeated(self, threshold):
+    # (times run, total seconds, statement), most frequent first
+    return sorted(((count, total, statement) for statement, (count, total) in self.statements.items()
+                   if count > threshold), reverse=True)
+
+  def elapsed(self):
+    return time.perf_counter() - self.started
+
+
+def _ms(seconds):
+  return round(seconds * 1000, 3)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+  if has_request_context() and 'sql_stats' in g:
+    conn.info.setdefault('sql_stats_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+  started = conn.info.get('sql_stats_started')
+  if started and has_request_context() and 'sql_stats' in g:
+    g.sql_stats.record(statement, time.perf_counter() - started.pop())
+
+
+def _handle_error(context):
+  started = context.connection.info.get('sql_stats_started') if context.connection is not None else None
+  if started:
+    started.pop()
+
+
+def init_app(app):
+  app.config.setdefault('SQL_STATS', True)
+  app.config.setdefault('SQL_SLOW_QUERY_MS', 100)
+  app.config.setdefault('SQL_REPEAT_THRESHOLD', 10)
+  app.config.setdefault('SQL_SLOWEST', 5)
+  app.config.setdefault('SQL_DEBUG_PANEL', app.debug)
+  if not app.config['SQL_STATS']:
+    return
+
+  # the listeners are on the Engine class, so they cover engines created later
+  if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(Engine, 'handle_error', _handle_error)
+
+  logger = app.logger.getChild('sql')
+
+  @app.before_request
+  def start_sql_stats():
+    g.sql_stats = RequestStats(app.config['SQL_SLOWEST'])
+
+  @app.after_request
+  def server_timing(response):
+    # a streamed body runs its queries after the headers are sent, so a header
+    # would leave them out; those requests only get the log line below
+    stats = g.get('sql_stats')
+    if stats is not None and not response.is_streamed:
+      response.headers.add('Server-Timing', f'db;dur={_ms(stats.db_time)};desc="{stats.count} queries"')
+      response.headers.add('Server-Timing', f'app;dur={_ms(stats.elapsed())}')
+    return response
+
+  @app.teardown_request
+  def log_sql_stats(exc):
+    # teardown runs after a streamed body is exhausted, so the statements a
+    # generator ran are included here even though the header went out earlier
+    stats = g.pop('sql_stats', None)
+    if stats is None:
+      return
+    threshold = app.config['SQL_REPEAT_THRESHOLD']
+    slow = app.config['SQL_SLOW_QUERY_MS'] / 1000
+    repeated = stats.repeated(threshold)
+    record = {
+      'event': 'request_sql',
+      'method': request.method,
+      'path': request.path,
+      'endpoint': request.endpoint,
+      'statements': stats.count,
+      'db_ms': _ms(stats.db_time),
+      'total_ms': _ms(stats.elapsed()),
+      'slowest': [{'ms': _ms(duration), 'sql': statement} for duration, statement in stats.slowest()],
+      'repeated': [{'count': count, 'ms': _ms(total), 'sql': statement} for count, total, statement in repeated],
+    }
+    logger.info(json.dumps(record))
+    for duration, statement in stats.slowest():
+      if duration >= slow:
+        logger.warning(json.dumps({'event': 'slow_query', 'endpoint': request.endpoint,
+                                   'ms': _ms(duration), 'sql': statement}))
+    for count, total, statement in repeated:
+      logger.warning(json.dumps({'event': 'repeated_query', 'endpoint': request.endpoint,
+                                 'count': count, 'ms': _ms(total), 'sql': statement}))
+
+  @app.context_processor
+  def sql_panel():
+    if not app.config['SQL_DEBUG_PANEL']:
+      return {}
+    return {'sql_stats': g.get('sql_stats'), 'sql_repeat_threshold': app.config['SQL_REPEAT_THRESHOLD']}
@@ -2,3 +2,140 @@ window.parseISOString = function parseISOString(s) {
   var b = s.split(/\D+/);
   return new Date(Date.UTC(b[0], --b[1], b[2], b[3], b[4], b[5], b[6]));
 };
+
+// "More past shows" on the venue and artist pages: fetch the next page of
+// tiles and put it in place of the link, which the fragment brings back if
+// there are more. Falls back to following the link.
+document.addEventListener('click', function (event) {
+  var link = event.target.closest && event.target.closest('a[data-more-shows]');
+  if (!link || !window.fetch) {
+    return;
+  }
+  event.preventDefault();
+  var container = link.parentNode;
+  link.classList.add('disabled');
+  fetch(link.href, { credentials: 'same-origin' })
+    .then(function (response) {
+      if (!response.ok) {
+        throw new Error(response.statusText);
+      }
+      return response.text();
+    })
+    .then(function (html) {
+      container.insertAdjacentHTML('beforebegin', html);
+      container.parentNode.removeChild(container);
+    })
+    .catch(function () {
+      window.location.href = link.href;
+    });
+});
+
+// "Add a row" on the multi-row show form: copies the last row, values and
+// all, under the next index. Without scripts the link reloads the form with
+// more rows.
+document.addEventListener('click', function (event) {
+  var link = event.target.closest && event.target.closest('a[data-add-show-row]');
+  if (!link) {
+    return;
+  }
+  event.preventDefault();
+  var rows = document.querySelectorAll('[data-show-row]');
+  var last = rows[rows.length - 1];
+  var row = last.cloneNode(true);
+  var fields = row.querySelectorAll('input, select');
+  for (var i = 0; i < fields.length; i++) {
+    fields[i].name = fields[i].name.replace(/^shows-\d+-/, 'shows-' + rows.length + '-');
+    fields[i].id = fields[i].name;
+  }
+  last.parentNode.insertBefore(row, last.nextSibling);
+});
+
+// Suggestions under the venue and artist search boxes, from /autocomplete.
+// Requests wait until typing pauses, and an answer that arrives after a newer
+// one was asked for is dropped. Enter still posts the search form.
+(function () {
+  var DELAY_MS = 150;
+  if (!window.fetch) {
+    return;
+  }
+  Array.prototype.forEach.call(document.querySelectorAll('form[data-autocomplete]'), function (form) {
+    var input = form.querySelector('input[name=search_term]');
+    var list = document.createElement('ul');
+    var timer = null;
+    var latest = 0;
+    list.className = 'autocomplete';
+    list.hidden = true;
+    form.appendChild(list);
+
+    function show(suggestions) {
+      list.innerHTML = '';
+      suggestions.forEach(function (suggestion) {
+        var item = document.createElement('li');
+        var link = document.createElement('a');
+        var place = document.createElement('small');
+        link.href = suggestion.url;
+        link.textContent = suggestion.name + ' ';
+        place.textContent = [suggestion.city, suggestion.state].filter(Boolean).join(', ');
+        link.appendChild(place);
+        item.appendChild(link);
+        list.appendChild(item);
+      });
+      list.hidden = !suggestions.length;
+    }
+
+    function lookup() {
+      var term = input.value.trim();
+      var request = ++latest;
+      if (!term) {
+        show([]);
+        return;
+      }
+      var url = '/autocomplete?type=' + form.getAttribute('data-autocomplete') + '&q=' + encodeURIComponent(term);
+      fetch(url, { credentials: 'same-origin' })
+        .then(function (response) {
+          return response.ok ? response.json() : [];
+        })
+        .then(function (suggestions) {
+          if (request === latest) {
+            show(suggestions);
+          }
+        })
+        .catch(function () {});
+    }
+
+    input.addEventListener('input', function () {
+      clearTimeout(timer);
+      timer = setTimeout(lookup, DELAY_MS);
+    });
+    input.addEventListener('keydown', function (event) {
+      if (event.key === 'Escape') {
+        list.hidden = true;
+      } else if (event.key === 'ArrowDown' && !list.hidden) {
+        event.preventDefault();
+        list.querySelector('a').focus();
+      }
+    });
+    list.addEventListener('keydown', function (event) {
+      var item = event.target.parentNode;
+      var next = event.key === 'ArrowDown' ? item.nextSibling : event.key === 'ArrowUp' ? item.previousSibling : null;
+      if (next) {
+        event.preventDefault();
+        next.firstChild.focus();
+      } else if (event.key === 'ArrowUp') {
+        event.preventDefault();
+        input.focus();
+      } else if (event.key === 'Escape') {
+        list.hidden = true;
+        input.focus();
+      }
+    });
+    // clicks on a suggestion land before the box loses focus for good
+    form.addEventListener('focusout', function () {
+      setTimeout(function () {
+        if (!form.contains(document.activeElement)) {
+          list.hidden = true;
+        }
+      }, 0);
+    });
+  });
+})();
@@ -0,0 +1,97 @@
+from flask import Response, current_app, render_template, stream_with_context
+from flask.signals import before_render_template, template_rendered
+
+from models import db
+
+# Streamed rendering for the listing pages.
+# The views hand the template a Page, which reads its rows from a server-side
+# cursor (stream_results; SQLite cursors are incremental anyway) in batches of
+# STREAM_BATCH_SIZE, so no list of rows or dicts is built. With
+# STREAM_TEMPLATES on, the response body is the template's generator: the
+# layout header goes out before the listing query runs and only one batch of
+# rows is held at a time. Off, the same generators are rendered to a string.
+# Jinja yields a string per template node, so the output is regrouped into
+# chunks of about STREAM_CHUNK_SIZE characters before it reaches the server;
+# the layout calls flush() ahead of the content block so the header is sent
+# on its own, before the listing query runs.
+# Headers are sent before the rows are read, so an error half way through a
+# streamed page truncates it instead of rendering the 500 page.
+
+try:
+  from flask import stream_template
+except ImportError:
+  # Flask < 2.2; the same as its stream_template
+  def stream_template(template_name_or_list, **context):
+    app = current_app._get_current_object()
+    app.update_template_context(context)
+    template = app.jinja_env.get_or_select_template(template_name_or_list)
+    before_render_template.send(app, template=template, context=context)
+
+    def generate():
+      yield from template.generate(context)
+      template_rendered.send(app, template=template, context=context)
+
+    return stream_with_context(generate())
+
+
+class Page:
+  # One keyset page of a query. Iterating yields up to page_size rows, passed
+  # through item if given (a read model's _make); once the iteration has gone
+  # past the last one, next_cursor is key(last) if another page follows.
+  # Templates read it after their loop, which is when it is known.
+
+  def __init__(self, query, page_size, key, item=None):
+    self.query = query
+    self.page_size = page_size
+    self.key = key
+    self.item = item
+    self.next_cursor = None
+
+  def __iter__(self):
+    batch = current_app.config['STREAM_BATCH_SIZE']
+    result = db.session.execute(
+      self.query.limit(self.page_size + 1).statement,
+      execution_options={'stream_results': True, 'max_row_buffer': batch})
+    try:
+      last = None
+      for count, row in enumerate(result):
+        if count == self.page_size:
+          self.next_cursor = self.key(last)
+          break
+        last = self.item(row) if self.item else row
+        yield last
+    finally:
+      result.close()
+
+
+class _Flush:
+  # called from the template; the chunk being built is sent with the output so far
+
+  def __init__(self):
+    self.requested = False
+
+  def __call__(self):
+    self.requested = True
+    return ''
+
+
+def chunked(parts, size, flush=None):
+  buffered, length = [], 0
+  for part in parts:
+    buffered.append(part)
+    length += len(part)
+    if length >= size or (flush is not None and flush.requested):
+      yield ''.join(buffered)
+      buffered, length = [], 0
+      if flush is not None:
+        flush.requested = False
+  if buffered:
+    yield ''.join(buffered)
+
+
+def render_listing(template_name, **context):
+  if current_app.config['STREAM_TEMPLATES']:
+    flush = _Flush()
+    parts = stream_template(template_name, flush=flush, **context)
+    return Response(chunked(parts, current_app.config['STREAM_CHUNK_SIZE'], flush))
+  return render_template(template_name, **context)
@@ -0,0 +1,82 @@
+import contextlib
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app
+from benchmarks.seed import seed
+from models import db
+
+# Seeded once per test from benchmarks/seed.py, so ids 1..VENUES and
+# 1..ARTISTS exist and every venue and artist has shows.
+VENUES, ARTISTS, SHOWS = 10, 20, 200
+
+
+def venue_form(venue_id):
+    # form data the venue create and edit controllers accept
+    return {
+        'name': f'Test Hall {venue_id}', 'city': 'Austin', 'state': 'TX',
+        'address': '1 Main St', 'phone': '512-555-0100', 'genres': ['Jazz', 'Blues'],
+        'image_link': 'https://example.com/venue.png', 'facebook_link': 'https://facebook.com/test',
+        'website_link': 'https://example.com', 'seeking_description': '',
+    }
+
+
+def artist_form(artist_id):
+    return {
+        'name': f'Test Trio {artist_id}', 'city': 'Austin', 'state': 'TX',
+        'phone': '512-555-0101', 'genres': ['Jazz'],
+        'image_link': 'https://example.com/artist.png', 'facebook_link': 'https://facebook.com/test',
+        'website_link': 'https://example.com', 'seeking_description': '',
+    }
+
+
+def make_app(path, **config):
+    return create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+        'SECRET_KEY': 'test',
+        'TESTING': True,
+        'WTF_CSRF_ENABLED': False,
+        **config,
+    })
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    # create_app() outside debug mode logs to ./error.log
+    monkeypatch.chdir(tmp_path)
+
+
+@pytest.fixture
+def now():
+    return datetime.now().replace(second=0, microsecond=0)
+
+
+@pytest.fixture
+def app(tmp_path, now):
+    app = make_app(tmp_path / 'fyyur.db')
+    with app.app_context():
+        db.create_all()
+        seed(db.engine, VENUES, ARTISTS, SHOWS, now=now)
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@contextlib.contextmanager
+def count_statements(engine):
+    # a list that collects one entry per SQL statement run in the block
+    statements = []
+
+    def listener(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
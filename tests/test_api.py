@@ -0,0 +1,63 @@
+import json
+import re
+
+import pytest
+
+from conftest import SHOWS, VENUES
+
+
+def lines(response):
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def next_link(response):
+    link = response.headers.get('Link')
+    if link is None:
+        return None
+    return re.fullmatch(r'<(.+)>; rel="next"', link).group(1)
+
+
+def all_pages(client, url):
+    # every record, following the Link headers, and the number of pages
+    records, pages = [], 0
+    while url:
+        response = client.get(url)
+        records.extend(lines(response))
+        pages += 1
+        url = next_link(response)
+    return records, pages
+
+
+def test_fields_select_the_keys(client):
+    records = lines(client.get('/api/v1/venues?fields=id,name,genres&limit=3'))
+    assert [list(record) for record in records] == [['id', 'name', 'genres']] * 3
+    assert all(isinstance(record['genres'], list) for record in records)
+    shows = lines(client.get('/api/v1/shows?fields=venue_name,start_time&limit=1'))
+    assert list(shows[0]) == ['venue_name', 'start_time']
+
+
+def test_unknown_fields_are_a_bad_request(client):
+    assert client.get('/api/v1/artists?fields=id,password').status_code == 400
+
+
+def test_venue_pages_follow_the_link_header(client):
+    records, pages = all_pages(client, '/api/v1/venues?limit=4&fields=id')
+    assert [record['id'] for record in records] == list(range(1, VENUES + 1))
+    assert pages == 3
+
+
+def test_show_pages_match_the_full_export(client):
+    export = lines(client.get('/api/v1/shows?fields=id,start_time'))
+    assert len(export) == SHOWS
+    assert [show['start_time'] for show in export] == sorted((show['start_time'] for show in export), reverse=True)
+    records, pages = all_pages(client, '/api/v1/shows?limit=60&fields=id,start_time')
+    assert records == export
+    assert pages == 4
+
+
+@pytest.mark.parametrize('url', ['/api/v1/shows?cursor=yesterday', '/api/v1/shows?cursor=2035-01-01_x',
+                                 '/api/v1/venues?cursor=abc'])
+def test_bad_cursors_are_a_bad_request(client, url):
+    assert client.get(url).status_code == 400
@@ -0,0 +1,41 @@
+import importlib
+
+import pytest
+
+import config
+from app import create_app
+
+
+@pytest.fixture
+def environ(monkeypatch):
+    # config.py reads the environment when imported, so it is reloaded per case
+    for name in ('SECRET_KEY', 'DEBUG', 'FLASK_DEBUG', 'FLASK_ENV', 'FYYUR_SETTINGS'):
+        monkeypatch.delenv(name, raising=False)
+    yield monkeypatch
+    monkeypatch.undo()
+    importlib.reload(config)
+
+
+def test_default_deployment_is_not_debug_and_needs_a_secret_key(environ):
+    importlib.reload(config)
+    assert config.DEBUG is False
+    with pytest.raises(RuntimeError, match='SECRET_KEY'):
+        create_app()
+
+
+def test_a_secret_key_is_enough_outside_debug(environ):
+    environ.setenv('SECRET_KEY', 'production-key')
+    importlib.reload(config)
+    app = create_app()
+    assert not app.debug
+    assert app.config['SECRET_KEY'] == 'production-key'
+    assert not app.config['SQL_DEBUG_PANEL']
+
+
+@pytest.mark.parametrize('name, value', [('DEBUG', '1'), ('FLASK_DEBUG', 'true'), ('FLASK_ENV', 'development')])
+def test_debug_mode_falls_back_to_the_development_key(environ, name, value):
+    environ.setenv(name, value)
+    importlib.reload(config)
+    app = create_app()
+    assert app.debug
+    assert app.config['SECRET_KEY'] == 'fyyur-development-key'
@@ -0,0 +1,125 @@
+import threading
+import time
+
+import pytest
+
+import autocomplete
+from conftest import artist_form, venue_form
+from models import db
+
+
+def names(client, query):
+    response = client.get(f'/autocomplete?{query}')
+    assert response.status_code == 200
+    return [(suggestion['type'], suggestion['name']) for suggestion in response.get_json()]
+
+
+def fresh_arrays():
+    rebuilt = autocomplete.PrefixIndex()
+    rebuilt.build()
+    return rebuilt._arrays
+
+
+@pytest.fixture
+def index(app):
+    prefix_index = app.extensions['autocomplete']
+    prefix_index.build()
+    return prefix_index
+
+
+def test_lookup_matches_word_starts_and_ranks_names_first():
+    index = autocomplete.PrefixIndex()
+    index.add('venue', 1, 'The Blue Note', 'New York', 'NY', ['Jazz'])
+    index.add('venue', 2, 'Bluebird Cafe', 'Nashville', 'TN', ['Country'])
+    index.add('artist', 3, 'Nova Trio', 'Blue Springs', 'MO', ['Blues'])
+    index.add('artist', 4, 'Zed', 'Austin', 'TX', ['Rock'])
+    lookup = lambda term, kinds=('venue', 'artist'), limit=8: [  # noqa: E731
+        suggestion.id for suggestion in index.lookup(term, kinds, limit)]
+    assert lookup('blue') == [1, 2, 3]
+    assert lookup('NOTE') == [1]
+    assert lookup('new  york') == [1]
+    assert lookup('blue', ('artist',)) == [3]
+    assert lookup('blue', limit=1) == [1]
+    assert lookup('n') == [1, 3, 2]
+    assert lookup('') == []
+
+
+def test_remove_and_replace_leave_no_stale_keys():
+    index = autocomplete.PrefixIndex()
+    index.add('venue', 1, 'Old Hall', 'Austin', 'TX', ['Jazz'])
+    index.add('venue', 1, 'New Hall', 'Austin', 'TX', ['Jazz'])
+    assert [suggestion.name for suggestion in index.lookup('hall', ('venue',), 8)] == ['New Hall']
+    assert index.lookup('old', ('venue',), 8) == []
+    index.remove('venue', 1)
+    index.remove('venue', 1)
+    assert all(not array for array in index._arrays.values())
+
+
+def test_controllers_keep_the_index_equal_to_a_rebuild(client, index):
+    form = venue_form(0)
+    form['name'] = 'Platypus Room'
+    client.post('/venues/create', data=form)
+    assert names(client, 'q=platyp') == [('venue', 'Platypus Room')]
+    form['name'] = 'Echidna Room'
+    client.post('/venues/2/edit', data=form)
+    artist = artist_form(0)
+    artist['name'] = 'Numbat Quartet'
+    client.post('/artists/create', data=artist)
+    client.delete('/venues/3')
+    assert names(client, 'q=echid') == [('venue', 'Echidna Room')]
+    assert names(client, 'type=artist&q=numbat') == [('artist', 'Numbat Quartet')]
+    assert index._arrays == fresh_arrays()
+
+
+def test_stale_index_is_served_while_one_thread_rebuilds(app, client, index, monkeypatch):
+    app.config['AUTOCOMPLETE_MAX_AGE'] = 0
+    release = threading.Event()
+    reads = []
+    read = index._read
+
+    def slow_read():
+        reads.append(threading.current_thread().name)
+        release.wait(5)
+        return read()
+    monkeypatch.setattr(index, '_read', slow_read)
+    built_at = index.built_at
+    time.sleep(0.01)
+    for _ in range(5):
+        assert names(client, 'q=a')
+    assert reads == ['autocomplete-refresh']
+    release.set()
+    for _ in range(100):
+        if index.built_at != built_at:
+            break
+        time.sleep(0.01)
+    assert index.built_at != built_at
+    assert not index._refreshing
+
+
+def test_updates_during_a_rebuild_are_kept(app, index, monkeypatch):
+    read = index._read
+
+    def read_then_write():
+        result = read()
+        # committed after the tables were read
+        index.add('venue', 999, 'Late Arrival', 'Austin', 'TX', [])
+        index.remove('venue', 1)
+        return result
+    monkeypatch.setattr(index, '_read', read_then_write)
+    index.build()
+    assert [suggestion.id for suggestion in index.lookup('late', ('venue',), 8)] == [999]
+    assert ('venue', 1) not in index._entries
+
+
+def test_first_lookups_build_the_index_once(app, client, monkeypatch):
+    index = app.extensions['autocomplete']
+    builds = []
+    build = index._build
+    monkeypatch.setattr(index, '_build', lambda: builds.append(1) or build())
+    threads = [threading.Thread(target=lambda: app.test_client().get('/autocomplete?q=a')) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert builds == [1]
+    db.session.remove()
@@ -0,0 +1,103 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import bookings
+from models import db, Show, MAX_SHOW_MINUTES
+
+
+def show(venue_id, artist_id, start_time, duration_minutes=60):
+    return {'venue_id': venue_id, 'artist_id': artist_id, 'start_time': start_time,
+            'duration_minutes': duration_minutes}
+
+
+def stored(venue_id, artist_id, start_time, duration_minutes=60):
+    booked = Show(venue_id=venue_id, artist_id=artist_id, start_time=start_time, duration_minutes=duration_minutes)
+    db.session.add(booked)
+    db.session.commit()
+    return booked.id
+
+
+@pytest.fixture
+def quiet(app):
+    # a day with nothing on it, after the seeded calendar
+    start = datetime.combine(date.today() + timedelta(days=3 * 365), datetime.min.time())
+    return start.replace(hour=20)
+
+
+def test_find_conflicts_reports_both_sides(app, quiet):
+    show_id = stored(1, 1, quiet)
+    found = bookings.find_conflicts([show(1, 2, quiet + timedelta(minutes=30)),
+                                     show(2, 1, quiet - timedelta(minutes=30))])
+    assert [(index, conflict.kind, conflict.show_id) for index, conflict in found] == [
+        (0, 'venue', show_id), (1, 'artist', show_id)]
+
+
+def test_find_conflicts_treats_ends_as_open(app, quiet):
+    stored(1, 1, quiet)
+    assert bookings.conflicts(1, 1, quiet + timedelta(minutes=60), 60) == []
+    assert bookings.conflicts(1, 1, quiet - timedelta(minutes=60), 60) == []
+    assert len(bookings.conflicts(1, 1, quiet + timedelta(minutes=59), 60)) == 2
+
+
+def test_find_conflicts_reaches_back_the_longest_show(app, quiet):
+    # starts a full MAX_SHOW_MINUTES before the new show and still runs into it
+    show_id = stored(1, 1, quiet, MAX_SHOW_MINUTES)
+    later = quiet + timedelta(minutes=MAX_SHOW_MINUTES - 1)
+    assert [conflict.show_id for conflict in bookings.conflicts(1, 2, later, 60)] == [show_id]
+    assert bookings.conflicts(1, 2, quiet + timedelta(minutes=MAX_SHOW_MINUTES), 60) == []
+
+
+def test_find_conflicts_leaves_excluded_shows_out(app, quiet):
+    show_id = stored(1, 1, quiet)
+    assert bookings.conflicts(1, 1, quiet, 60, exclude_id=show_id) == []
+
+
+def test_overlaps_within_finds_shows_a_long_show_contains(quiet):
+    shows = [
+        show(1, 1, quiet, 300),
+        show(1, 2, quiet + timedelta(minutes=30)),
+        show(1, 3, quiet + timedelta(minutes=120)),
+        show(1, 4, quiet + timedelta(minutes=300)),
+        show(2, 4, quiet + timedelta(minutes=330)),
+    ]
+    assert bookings.overlaps_within(shows) == [(0, 1), (0, 2), (3, 4)]
+
+
+def test_overlaps_within_allows_back_to_back_shows(quiet):
+    shows = [show(1, 1, quiet + timedelta(hours=hour)) for hour in range(5)]
+    assert bookings.overlaps_within(shows) == []
+
+
+def test_weekly_occurrences_stop_at_the_end_of_the_until_date():
+    start = datetime(2026, 1, 5, 21)
+    times = bookings.occurrences(start, 'weekly', date(2026, 1, 26), 100)
+    assert times == [datetime(2026, 1, day, 21) for day in (5, 12, 19, 26)]
+
+
+def test_monthly_occurrences_fall_back_to_the_end_of_short_months():
+    start = datetime(2026, 1, 31, 20)
+    times = bookings.occurrences(start, 'monthly', date(2026, 5, 31), 100)
+    assert [(time.month, time.day) for time in times] == [(1, 31), (2, 28), (3, 31), (4, 30), (5, 31)]
+
+
+def test_occurrences_over_the_limit_are_refused():
+    start = datetime(2026, 1, 1, 20)
+    assert bookings.occurrences(start, 'weekly', date(2026, 12, 31), 52) is None
+    assert len(bookings.occurrences(start, 'weekly', date(2026, 12, 30), 52)) == 52
+
+
+def test_book_all_rolls_back_the_whole_batch(app, quiet):
+    stored(1, 1, quiet + timedelta(days=7))
+    before = db.session.query(Show).count()
+    shows = [show(1, 1, quiet + timedelta(days=week * 7)) for week in range(3)]
+    found = bookings.book_all(shows)
+    assert [index for index, _ in found] == [1, 1]
+    assert db.session.query(Show).count() == before
+
+
+def test_book_all_inserts_a_clear_batch(app, quiet):
+    before = db.session.query(Show).count()
+    assert bookings.book_all([show(1, 1, quiet + timedelta(days=week * 7)) for week in range(3)]) == []
+    db.session.commit()
+    assert db.session.query(Show).count() == before + 3
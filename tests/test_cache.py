@@ -0,0 +1,64 @@
+import time
+
+import pytest
+
+from benchmarks.seed import seed
+from conftest import ARTISTS, SHOWS, VENUES, make_app, venue_form
+from models import db
+
+
+class FakeRedis:
+    # the part of redis-py's client RedisStore uses, with px expiry
+
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        value, expires_at = self.values.get(key, (None, None))
+        if expires_at is not None and expires_at <= time.time():
+            del self.values[key]
+            return None
+        return value
+
+    def set(self, key, value, px):
+        assert isinstance(value, bytes)
+        self.values[key] = (value, time.time() + px / 1000)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+
+@pytest.fixture
+def redis_client():
+    return FakeRedis()
+
+
+@pytest.fixture
+def app(tmp_path, now, redis_client):
+    app = make_app(tmp_path / 'fyyur.db', PAGE_CACHE='redis', PAGE_CACHE_REDIS_CLIENT=redis_client)
+    with app.app_context():
+        db.create_all()
+        seed(db.engine, VENUES, ARTISTS, SHOWS, now=now)
+        yield app
+        db.session.remove()
+
+
+def test_venue_pages_are_kept_in_redis(app, client, redis_client):
+    page_cache = app.extensions['page_cache']
+    first = client.get('/venues/1').get_data(as_text=True)
+    assert list(redis_client.values) == ['fyyur:page:v3:venue:1']
+    _, expires_at = redis_client.values['fyyur:page:v3:venue:1']
+    assert expires_at <= time.time() + app.config['PAGE_CACHE_TTL']
+    assert client.get('/venues/1').get_data(as_text=True) == first
+    assert (page_cache.hits, page_cache.misses) == (1, 1)
+
+
+def test_an_edit_drops_the_page_from_redis(app, client, redis_client):
+    client.get('/venues/1').get_data()
+    form = venue_form(1)
+    form['name'] = 'Wallaby Hall'
+    assert app.test_client().post('/venues/1/edit', data=form).status_code == 302
+    assert 'fyyur:page:v3:venue:1' not in redis_client.values
+    assert 'Wallaby Hall' in client.get('/venues/1').get_data(as_text=True)
+    assert 'fyyur:page:v3:venue:1' in redis_client.values
@@ -0,0 +1,83 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from models import db, Show, Venue
+
+ICS_TIME_FORMAT = '%Y%m%dT%H%M%S'
+
+
+@pytest.fixture
+def week(app):
+    # a week after the seeded calendar with three shows at venue 1, the last
+    # one by artist 2 and running past midnight
+    start = datetime.combine(date.today() + timedelta(days=3 * 365), datetime.min.time())
+    venue = db.session.get(Venue, 1)
+    venue.name = 'The Long Named, Semi;colon Hall ' + 'é' * 40
+    db.session.add_all([
+        Show(venue_id=1, artist_id=1, start_time=start.replace(hour=20), duration_minutes=90),
+        Show(venue_id=1, artist_id=1, start_time=start + timedelta(days=2, hours=19, minutes=30), duration_minutes=45),
+        Show(venue_id=1, artist_id=2, start_time=start + timedelta(days=6, hours=23), duration_minutes=180),
+    ])
+    db.session.commit()
+    return start
+
+
+def window(start, days=7):
+    return f'start={start:%Y-%m-%d}&end={start + timedelta(days=days):%Y-%m-%d}'
+
+
+def events(body):
+    # the VEVENTs of a feed as dicts, after unfolding
+    assert all(len(line.encode()) <= 75 for line in body.split('\r\n'))
+    lines = body.replace('\r\n ', '').split('\r\n')
+    found, event = [], None
+    for line in lines:
+        if line == 'BEGIN:VEVENT':
+            event = {}
+        elif line == 'END:VEVENT':
+            found.append(event)
+            event = None
+        elif event is not None:
+            name, value = line.split(':', 1)
+            event[name] = value
+    return found
+
+
+def test_feed_times_come_from_start_time_and_duration(client, week):
+    response = client.get(f'/venues/1/calendar.ics?{window(week)}')
+    assert response.mimetype == 'text/calendar'
+    feed = events(response.get_data(as_text=True))
+    shows = Show.query.filter(Show.venue_id == 1, Show.start_time >= week,
+                              Show.start_time < week + timedelta(days=7)).order_by(Show.start_time).all()
+    assert len(feed) == len(shows) == 3
+    for event, show in zip(feed, shows):
+        assert event['UID'] == f'show-{show.id}@localhost'
+        assert event['DTSTART'] == show.start_time.strftime(ICS_TIME_FORMAT)
+        end_time = show.start_time + timedelta(minutes=show.duration_minutes)
+        assert event['DTEND'] == end_time.strftime(ICS_TIME_FORMAT)
+        assert event['DTSTAMP'] == show.updated_at.strftime(ICS_TIME_FORMAT) + 'Z'
+    assert feed[0]['LOCATION'].startswith('The Long Named\\, Semi\\;colon Hall ' + 'é' * 40)
+
+
+def test_artist_feed_leaves_other_artists_out(client, week):
+    feed = events(client.get(f'/artists/2/calendar.ics?{window(week)}').get_data(as_text=True))
+    assert [event['DTSTART'] for event in feed] == [(week + timedelta(days=6, hours=23)).strftime(ICS_TIME_FORMAT)]
+
+
+def test_calendar_page_groups_shows_by_day(client, week):
+    body = client.get(f'/venues/1/calendar?{window(week)}').get_data(as_text=True)
+    assert body.count('<section class="calendar-day">') == 3
+    assert '11:00PM - 2:00AM' in body
+    empty = client.get(f'/artists/1/calendar?{window(week + timedelta(days=7))}').get_data(as_text=True)
+    assert 'No shows between these dates.' in empty
+
+
+@pytest.mark.parametrize('query', ['start=2030-01-08&end=2030-01-01', 'start=2030-01-01&end=2031-06-01',
+                                   'start=tomorrow'])
+def test_bad_windows_are_a_bad_request(client, query):
+    assert client.get(f'/venues/1/calendar?{query}').status_code == 400
+
+
+def test_unknown_owner_is_not_found(client):
+    assert client.get('/venues/999/calendar.ics').status_code == 404
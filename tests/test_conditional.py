@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from conftest import venue_form
+from models import db, Venue
+
+
+@pytest.mark.parametrize('path', ['/venues/1', '/shows'])
+def test_if_none_match_returns_304(client, path):
+    first = client.get(path)
+    first.get_data()
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    response = client.get(path, headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.get_data() == b''
+    assert response.headers['ETag'] == etag
+
+
+@pytest.mark.parametrize('path', ['/venues/1', '/shows'])
+def test_if_modified_since_returns_304(client, path):
+    first = client.get(path)
+    first.get_data()
+    last_modified = first.headers['Last-Modified']
+    assert client.get(path, headers={'If-Modified-Since': last_modified}).status_code == 304
+    earlier = (first.last_modified - timedelta(seconds=1)).strftime('%a, %d %b %Y %H:%M:%S GMT')
+    assert client.get(path, headers={'If-Modified-Since': earlier}).status_code == 200
+
+
+def test_an_edit_changes_the_etag(app, client):
+    etag = client.get('/venues/1').headers['ETag']
+    # the editing client gets a flash message, which turns the validators off
+    # for its next page
+    assert app.test_client().post('/venues/1/edit', data=venue_form(1)).status_code == 302
+    response = client.get('/venues/1', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_server_default_is_utc(app):
+    db.session.execute(text('INSERT INTO "Venue" (name) VALUES (\'Raw Hall\')'))
+    updated_at = Venue.query.filter_by(name='Raw Hall').one().updated_at
+    assert abs(updated_at - datetime.utcnow()) < timedelta(minutes=1)
@@ -0,0 +1,92 @@
+from datetime import timedelta
+
+import pytest
+
+import counters
+from models import db, Artist, Show, Venue
+
+
+def counts(model, owner_id):
+    owner = db.session.get(model, owner_id)
+    db.session.refresh(owner)
+    return owner.upcoming_shows_count, owner.past_shows_count
+
+
+def no_drift():
+    with db.engine.begin() as conn:
+        drifted = counters.drift(conn, counters.watermark(conn))
+    return all(not rows for rows in drifted.values())
+
+
+@pytest.fixture
+def later(app, now):
+    # clear of the seeded calendar
+    return now + timedelta(days=3 * 365)
+
+
+def test_seeded_counters_match_the_shows(app):
+    assert no_drift()
+
+
+def test_inserting_an_upcoming_show_counts_it(app, later):
+    venue, artist = counts(Venue, 1), counts(Artist, 2)
+    db.session.add(Show(venue_id=1, artist_id=2, start_time=later))
+    db.session.commit()
+    assert counts(Venue, 1) == (venue[0] + 1, venue[1])
+    assert counts(Artist, 2) == (artist[0] + 1, artist[1])
+    assert no_drift()
+
+
+def test_moving_a_show_into_the_past_and_to_another_venue(app, later, now):
+    show = Show(venue_id=1, artist_id=2, start_time=later)
+    db.session.add(show)
+    db.session.commit()
+    first, second = counts(Venue, 1), counts(Venue, 3)
+    show.venue_id = 3
+    show.start_time = now - timedelta(days=1)
+    db.session.commit()
+    assert counts(Venue, 1) == (first[0] - 1, first[1])
+    assert counts(Venue, 3) == (second[0], second[1] + 1)
+    assert no_drift()
+
+
+def test_deleting_a_show_uncounts_it(app):
+    show = db.session.query(Show).filter(Show.artist_id == 4).first()
+    before = counts(Artist, 4)
+    db.session.delete(show)
+    db.session.commit()
+    assert sum(counts(Artist, 4)) == sum(before) - 1
+    assert no_drift()
+
+
+def test_counter_writes_are_not_edits(app, later):
+    updated_at = db.session.get(Venue, 1).updated_at
+    db.session.add(Show(venue_id=1, artist_id=2, start_time=later))
+    db.session.commit()
+    venue = db.session.get(Venue, 1)
+    db.session.refresh(venue)
+    assert venue.updated_at == updated_at
+
+
+def test_rollover_moves_started_shows_to_past(app, later):
+    db.session.add(Show(venue_id=1, artist_id=2, start_time=later))
+    db.session.commit()
+    upcoming = db.session.query(Show).filter(Show.start_time > counters.watermark(db.session.connection())).count()
+    db.session.commit()
+    with db.engine.begin() as conn:
+        moved = counters.rollover(conn, later + timedelta(minutes=1))
+    assert moved == upcoming
+    assert counts(Venue, 1)[0] == 0
+    assert no_drift()
+
+
+def test_check_command_repairs_drift(app):
+    with db.engine.begin() as conn:
+        conn.execute(Venue.__table__.update().where(Venue.id == 2).values(upcoming_shows_count=99))
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['counters', 'check'])
+    assert result.exit_code == 1
+    assert 'Venue 2: upcoming 99' in result.output
+    result = runner.invoke(args=['counters', 'check', '--repair'])
+    assert result.exit_code == 0
+    assert no_drift()
@@ -0,0 +1,46 @@
+import html
+import re
+from collections import Counter
+
+from models import db, Artist, Genre, Venue
+
+
+def directory_pages(client, url, kind):
+    # entity ids in page order, and the "More" links followed
+    ids, links = [], []
+    while url:
+        body = client.get(url).get_data(as_text=True)
+        ids.extend(int(entity_id) for entity_id in re.findall(rf'<a href="/{kind}/(\d+)">', body))
+        more = re.search(r'<li class="next"><a href="([^"]+)">More', body)
+        url = html.unescape(more.group(1)) if more else None
+        if url:
+            links.append(url)
+    return ids, links
+
+
+def test_venue_pages_keep_the_genre_filter(client):
+    genre = Counter(genre.name for venue in Venue.query for genre in venue.genre_list).most_common(1)[0][0]
+    expected = [venue.id for venue in db.session.query(Venue).join(Venue.genre_list)
+                .filter(Genre.name == genre).order_by(Venue.city, Venue.state, Venue.id)]
+    assert len(expected) > 2
+    ids, links = directory_pages(client, f'/venues?genre={genre}&per_page=2', 'venues')
+    assert ids == expected
+    assert len(links) == (len(expected) - 1) // 2
+    assert all(f'genre={genre}' in link and 'per_page=2' in link for link in links)
+
+
+def test_artist_pages_keep_the_seeking_and_state_filters(client):
+    state = Counter(artist.state for artist in Artist.query).most_common(1)[0][0]
+    expected = [artist.id for artist in Artist.query.filter_by(state=state, seeking_venue=True).order_by(Artist.id)]
+    assert len(expected) > 1
+    ids, links = directory_pages(client, f'/artists?state={state.lower()}&seeking=1&per_page=1', 'artists')
+    assert sorted(ids) == expected
+    assert len(links) == len(expected) - 1
+    assert all('seeking=1' in link for link in links)
+
+
+def test_blank_filters_are_dropped(client):
+    everything, _ = directory_pages(client, '/venues?per_page=100', 'venues')
+    filtered, _ = directory_pages(client, '/venues?city=&state=&genre=&seeking=no&per_page=100', 'venues')
+    assert filtered == everything
+    assert len(everything) == Venue.query.count()
@@ -0,0 +1,84 @@
+import json
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import counters
+import genres
+from conftest import VENUES, venue_form
+from models import db, Genre, Show, Venue, artist_genres, venue_genres
+
+
+@pytest.fixture
+def evening(app):
+    # a day after the seeded calendar, with one show at venue 1 by artist 1
+    day = datetime.combine(date.today() + timedelta(days=3 * 365), datetime.min.time())
+    db.session.add(Show(venue_id=1, artist_id=1, start_time=day.replace(hour=20), duration_minutes=120))
+    db.session.commit()
+    return day
+
+
+def show_row(venue_id, artist_id, start_time, duration_minutes=60):
+    return {'venue_id': venue_id, 'artist_id': artist_id,
+            'start_time': start_time.strftime('%Y-%m-%d %H:%M:%S'), 'duration_minutes': duration_minutes}
+
+
+def run_import(app, tmp_path, rows, *args, kind='shows'):
+    path = tmp_path / f'{kind}.ndjson'
+    path.write_text(''.join(json.dumps(row) + '\n' for row in rows))
+    result = app.test_cli_runner().invoke(args=['import', kind, str(path), *args])
+    rejects = tmp_path / f'{kind}.ndjson.rejects.ndjson'
+    return result, [json.loads(line) for line in rejects.read_text().splitlines()]
+
+
+def shows_on(day):
+    return sorted((show.venue_id, show.artist_id, show.start_time.hour) for show in db.session.query(Show).filter(
+        Show.start_time >= day, Show.start_time < day + timedelta(days=1)))
+
+
+def test_import_rejects_double_bookings(app, tmp_path, evening):
+    rows = [
+        show_row(1, 2, evening.replace(hour=21)),   # venue 1 is busy 20:00-22:00
+        show_row(2, 1, evening.replace(hour=19, minute=30)),   # so is artist 1
+        show_row(3, 3, evening.replace(hour=18), 180),
+        show_row(3, 4, evening.replace(hour=19)),   # inside the row above
+        show_row(4, 3, evening.replace(hour=20)),   # artist 3 too, stored by the first batch
+        show_row(3, 5, evening.replace(hour=21)),   # clear once the 18:00 show ends
+        show_row(5, 5, evening.replace(hour=14)),
+    ]
+    result, rejects = run_import(app, tmp_path, rows, '--batch-size', '4')
+    assert result.exit_code == 0, result.output
+    assert 'done: 3 imported, 4 rejected' in result.output
+    assert [(reject['row'], reject['errors'][0].split(':')[0]) for reject in rejects] == [
+        (1, 'venue_id'), (2, 'artist_id'), (4, 'start_time'), (5, 'artist_id')]
+    assert 'overlaps row 3' in rejects[2]['errors'][0]
+    assert shows_on(evening) == [(1, 1, 20), (3, 3, 18), (3, 5, 21), (5, 5, 14)]
+    with db.engine.begin() as conn:
+        assert not any(counters.drift(conn, counters.watermark(conn)).values())
+
+
+def test_import_resumes_after_rejected_shows(app, tmp_path, evening):
+    rows = [show_row(1, 2, evening.replace(hour=21)), show_row(2, 2, evening.replace(hour=12))]
+    result, _ = run_import(app, tmp_path, rows)
+    assert 'done: 1 imported, 1 rejected' in result.output
+    result = app.test_cli_runner().invoke(args=['import', 'shows', str(tmp_path / 'shows.ndjson')])
+    assert result.exit_code == 0, result.output
+    assert 'resuming after 2 rows' in result.output
+    assert 'done: 0 imported, 0 rejected' in result.output
+
+
+def test_import_adds_genres_to_an_empty_genre_table(app, tmp_path):
+    # the forms fall back to their static genre list until the table has rows
+    for table in (venue_genres, artist_genres, Genre.__table__):
+        db.session.execute(table.delete())
+    db.session.commit()
+    genres.invalidate_choices()
+    rows = [dict(venue_form(number), genres=names)
+            for number, names in enumerate((['Jazz', 'Blues'], ['Jazz'], ['Folk', 'Blues']))]
+    result, rejects = run_import(app, tmp_path, rows, '--batch-size', '2', kind='venues')
+    assert result.exit_code == 0, result.output
+    assert rejects == []
+    assert sorted(name for (name,) in db.session.query(Genre.name)) == ['Blues', 'Folk', 'Jazz']
+    imported = Venue.query.filter(Venue.id > VENUES).order_by(Venue.id)
+    assert [[genre.name for genre in venue.genre_list] for venue in imported] == [
+        ['Blues', 'Jazz'], ['Jazz'], ['Blues', 'Folk']]
@@ -0,0 +1,48 @@
+import time
+
+from prometheus_client import REGISTRY
+from prometheus_client.parser import text_string_to_metric_families
+from sqlalchemy import event
+
+from models import db
+
+LISTING_DELAY = 0.2
+
+
+def latency(endpoint):
+    # (requests observed, total seconds) for GETs of endpoint
+    labels = {'endpoint': endpoint, 'method': 'GET'}
+    return (REGISTRY.get_sample_value('fyyur_request_duration_seconds_count', labels) or 0,
+            REGISTRY.get_sample_value('fyyur_request_duration_seconds_sum', labels) or 0)
+
+
+def test_scrape(client):
+    client.get('/venues/1').get_data()
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    families = {family.name: family for family in text_string_to_metric_families(response.get_data(as_text=True))}
+    requests = families['fyyur_requests']
+    assert any(sample.labels == {'endpoint': 'venues.show_venue', 'method': 'GET', 'status': '200'}
+               for sample in requests.samples)
+    assert 'fyyur_request_duration_seconds' in families
+    assert 'fyyur_template_render_seconds' in families
+
+
+def test_streamed_listing_latency_includes_the_body(app, client):
+    def slow_listing(conn, cursor, statement, *args):
+        if 'LIMIT' in statement and 'FROM "Show"' in statement:
+            time.sleep(LISTING_DELAY)
+    event.listen(db.engine, 'before_cursor_execute', slow_listing)
+    try:
+        before = latency('shows.shows')
+        response = client.get('/shows')
+        assert response.is_streamed
+        # nothing is recorded until the server has sent the body and closed it
+        assert latency('shows.shows') == before
+        response.get_data()
+        response.close()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', slow_listing)
+    count, seconds = latency('shows.shows')
+    assert count == before[0] + 1
+    assert seconds - before[1] >= LISTING_DELAY
@@ -0,0 +1,59 @@
+import html
+import re
+from datetime import datetime
+
+import pytest
+
+from models import db, Show
+
+TILE = re.compile(r'<h5><a href="/artists/(\d+)">')
+MORE = re.compile(r'<a href="([^"]+)" class="btn btn-default" data-more-shows>')
+
+
+@pytest.fixture
+def venue_id(app):
+    # small sections and pages, and the venue with the most past shows
+    app.config.update(DETAIL_PAGE_SHOWS=3, PAGE_SIZE=4)
+    venue_id, _ = db.session.query(Show.venue_id, db.func.count()).filter(Show.start_time <= datetime.now())\
+        .group_by(Show.venue_id).order_by(db.func.count().desc()).first()
+    return venue_id
+
+
+def past_artist_ids(venue_id):
+    return [artist_id for (artist_id,) in db.session.query(Show.artist_id).filter(
+        Show.venue_id == venue_id, Show.start_time <= datetime.now()).order_by(Show.start_time.desc(), Show.id.desc())]
+
+
+def past_section(body):
+    return body[body.index('Past Show'):]
+
+
+def test_venue_page_caps_the_past_shows(client, venue_id):
+    expected = past_artist_ids(venue_id)
+    assert len(expected) > 2 * 4 + 3
+    data = client.get(f'/api/v1/venues/{venue_id}').get_json()
+    assert len(data['past_shows']) == 3
+    assert data['past_shows_count'] == len(expected)
+    assert [show['artist_id'] for show in data['past_shows']] == expected[:3]
+
+
+def test_more_past_shows_continue_where_the_page_stopped(client, venue_id):
+    expected = past_artist_ids(venue_id)
+    body = past_section(client.get(f'/venues/{venue_id}').get_data(as_text=True))
+    artist_ids = [int(artist_id) for artist_id in TILE.findall(body)]
+    more = MORE.search(body)
+    fragments = 0
+    while more:
+        body = client.get(html.unescape(more.group(1))).get_data(as_text=True)
+        tiles = [int(artist_id) for artist_id in TILE.findall(body)]
+        assert 0 < len(tiles) <= 4
+        artist_ids.extend(tiles)
+        fragments += 1
+        more = MORE.search(body)
+    assert artist_ids == expected
+    assert fragments == -(-(len(expected) - 3) // 4)
+
+
+def test_no_more_link_when_every_past_show_fits(app, client, venue_id):
+    app.config['DETAIL_PAGE_SHOWS'] = 1000
+    assert not MORE.search(client.get(f'/venues/{venue_id}').get_data(as_text=True))
@@ -0,0 +1,58 @@
+import shutil
+
+import pytest
+
+from benchmarks.seed import seed
+from conftest import ARTISTS, SHOWS, VENUES, make_app, venue_form
+from models import db
+
+NEW_NAME = 'Test Hall 2'
+
+
+@pytest.fixture
+def app(tmp_path, now):
+    # The replica is a copy of the primary taken before the edit, so every
+    # GET that isn't pinned reads the old row, as from a lagging replica.
+    # No app context is kept pushed: each request gets its own g and session.
+    primary, replica = tmp_path / 'primary.db', tmp_path / 'replica.db'
+    app = make_app(primary, SQLALCHEMY_BINDS={'replica': f'sqlite:///{replica}'}, PAGE_CACHE='memory')
+    with app.app_context():
+        db.create_all()
+        seed(db.engine, VENUES, ARTISTS, SHOWS, now=now)
+        db.session.remove()
+    shutil.copy(primary, replica)
+    return app
+
+
+def read(client):
+    # what the venue page, the API and a search for the new name say about
+    # venue 2, each True once they show the edit
+    return (
+        NEW_NAME in client.get('/venues/2').get_data(as_text=True),
+        client.get('/api/v1/venues/2').get_json()['name'] == NEW_NAME,
+        'href="/venues/2"' in client.get(
+            '/venues/search', query_string={'search_term': NEW_NAME}).get_data(as_text=True),
+    )
+
+
+def test_replica_reads_dont_fill_the_caches_for_a_pinned_writer(app):
+    writer, reader = app.test_client(), app.test_client()
+    read(reader)
+    assert writer.post('/venues/2/edit', data=venue_form(2)).status_code == 302
+
+    assert read(reader) == (False, False, False)
+    assert read(writer) == (True, True, True)
+    # and what the writer's primary reads stored is served to everyone
+    assert read(reader) == (True, True, True)
+    assert app.extensions['search']._indexes is not None
+
+
+def test_primary_reads_fill_the_caches(app):
+    writer = app.test_client()
+    writer.post('/venues/2/edit', data=venue_form(2))
+    read(writer)
+    page_cache = app.extensions['page_cache']
+    hits = page_cache.hits
+    read(writer)
+    assert page_cache.hits == hits + 2
+    assert app.extensions['search_cache'].hits == 1
@@ -0,0 +1,122 @@
+from datetime import timedelta
+
+import pytest
+
+import search
+from conftest import count_statements, make_app, venue_form
+from models import db, Show, Venue
+
+
+def memory_index(app):
+    search.search('venue', 'warmup')
+    backend = app.extensions['search']
+    assert isinstance(backend, search.MemorySearch)
+    return backend
+
+
+def test_building_apps_adds_no_session_listeners(app, tmp_path):
+    def listeners():
+        # every listener a new session gets, from Session and the app factory
+        dispatch = db.session.session_factory().dispatch
+        return len(dispatch.after_commit), len(dispatch.after_flush)
+    before = listeners()
+    for number in range(3):
+        # the backend is picked on the first search
+        other = make_app(tmp_path / f'other{number}.db')
+        with other.app_context():
+            db.create_all()
+            memory_index(other)
+            db.session.remove()
+    assert listeners() == before
+
+
+def test_show_and_counter_writes_keep_the_index(app, now):
+    backend = memory_index(app)
+    db.session.add(Show(venue_id=1, artist_id=1, start_time=now + timedelta(days=3 * 365)))
+    db.session.commit()
+    assert backend._indexes is not None
+
+
+def test_venue_writes_mark_the_index_stale(app, client):
+    backend = memory_index(app)
+    form = venue_form(2)
+    form['name'] = 'Quokka Lounge'
+    assert client.post('/venues/2/edit', data=form).status_code == 302
+    assert backend._indexes is None
+    assert search.search('venue', 'quokka').ids == [2]
+
+
+def test_bulk_updates_mark_the_index_stale(app):
+    backend = memory_index(app)
+    Venue.query.filter_by(id=3).update({'city': 'Wombatville'})
+    db.session.commit()
+    assert backend._indexes is None
+    assert search.search('venue', 'wombat').ids == [3]
+
+
+def test_rolled_back_writes_keep_the_index(app):
+    backend = memory_index(app)
+    db.session.get(Venue, 4).name = 'Never Saved'
+    db.session.flush()
+    db.session.rollback()
+    db.session.commit()
+    assert backend._indexes is not None
+
+
+def test_result_cache_hits_until_the_generation_moves():
+    cache = search.ResultCache(8, 60)
+    builds = []
+
+    def build():
+        builds.append(1)
+        return len(builds)
+    assert cache.fetch(('venue', 'jazz', 1), build) == 1
+    assert cache.fetch(('venue', 'jazz', 1), build) == 1
+    cache.bump()
+    assert cache.fetch(('venue', 'jazz', 1), build) == 2
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert cache.hit_rate() == pytest.approx(1 / 3)
+
+
+def test_result_cache_drops_results_built_across_a_write():
+    cache = search.ResultCache(8, 60)
+
+    def build_during_a_write():
+        cache.bump()
+        return 'old'
+    cache.fetch(('artist', 'rock', 1), build_during_a_write)
+    assert cache.fetch(('artist', 'rock', 1), lambda: 'new') == 'new'
+
+
+def test_result_cache_evicts_the_least_recently_used():
+    cache = search.ResultCache(2, 60)
+    for term in ('a', 'b'):
+        cache.fetch(('venue', term, 1), lambda: term)
+    cache.fetch(('venue', 'a', 1), lambda: 'rebuilt')
+    cache.fetch(('venue', 'c', 1), lambda: 'c')
+    assert cache.fetch(('venue', 'a', 1), lambda: 'rebuilt') == 'a'
+    assert cache.fetch(('venue', 'b', 1), lambda: 'rebuilt') == 'rebuilt'
+
+
+def test_result_cache_entries_expire(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(search.time, 'monotonic', lambda: clock[0])
+    cache = search.ResultCache(8, 60)
+    cache.fetch(('venue', 'a', 1), lambda: 'first')
+    clock[0] += 61
+    assert cache.fetch(('venue', 'a', 1), lambda: 'second') == 'second'
+
+
+def test_search_views_share_results_until_a_write(app, client, now):
+    app.extensions['search_cache'] = cache = search.ResultCache(8, 60)
+    client.post('/venues/search', data={'search_term': 'Club'})
+    with count_statements(db.engine) as statements:
+        assert client.post('/venues/search', data={'search_term': '  club '}).status_code == 200
+    assert cache.hits == 1
+    assert not [statement for statement in statements if 'Venue' in statement]
+    client.post('/shows/create', data={
+        'venue_id': 1, 'artist_id': 1, 'duration_minutes': 60,
+        'start_time': (now + timedelta(days=3 * 365)).strftime('%Y-%m-%d %H:%M:%S')})
+    assert cache.generation == 1
+    client.post('/venues/search', data={'search_term': 'club'})
+    assert (cache.hits, cache.misses) == (1, 2)
@@ -0,0 +1,26 @@
+from conftest import count_statements
+from models import db
+
+# the Last-Modified/ETag validator (one count and max per table) and the
+# joined page of shows, however many shows the page has
+SHOWS_STATEMENTS = 4
+
+
+def shows_page(client, per_page):
+    with count_statements(db.engine) as statements:
+        response = client.get(f'/shows?per_page={per_page}')
+        body = response.get_data(as_text=True)
+    assert response.status_code == 200
+    return body, statements
+
+
+def test_shows_page_is_a_fixed_number_of_statements(client):
+    body, statements = shows_page(client, 100)
+    assert body.count('class="tile tile-show"') == 100
+    assert len(statements) == SHOWS_STATEMENTS, statements
+
+
+def test_shows_statements_do_not_grow_with_the_page(client):
+    _, few = shows_page(client, 5)
+    _, many = shows_page(client, 100)
+    assert len(few) == len(many)
@@ -0,0 +1,54 @@
+import json
+import logging
+
+from conftest import count_statements
+from models import db
+
+
+def sql_log(caplog, client, path):
+    # the request_sql record and the slow and repeated query warnings
+    caplog.clear()
+    with caplog.at_level(logging.INFO, logger='app.sql'):
+        client.get(path).get_data()
+    records = [json.loads(record.getMessage()) for record in caplog.records if record.name == 'app.sql']
+    return records[0], records[1:]
+
+
+def test_server_timing_counts_the_statements(client):
+    with count_statements(db.engine) as statements:
+        response = client.get('/venues/1')
+    timings = response.headers.getlist('Server-Timing')
+    assert timings[0].startswith('db;dur=')
+    assert timings[0].endswith(f'desc="{len(statements)} queries"')
+    assert timings[1].startswith('app;dur=')
+
+
+def test_request_log(app, client, caplog):
+    with count_statements(db.engine) as statements:
+        record, warnings = sql_log(caplog, client, '/venues/1')
+    assert record['event'] == 'request_sql'
+    assert record['endpoint'] == 'venues.show_venue'
+    assert record['statements'] == len(statements)
+    assert len(record['slowest']) == min(len(statements), app.config['SQL_SLOWEST'])
+    assert record['repeated'] == []
+    assert warnings == []
+
+
+def test_slow_and_repeated_queries_are_reported(app, client, caplog):
+    app.config.update(SQL_SLOW_QUERY_MS=0, SQL_REPEAT_THRESHOLD=0)
+    record, warnings = sql_log(caplog, client, '/venues/1')
+    slow = [warning for warning in warnings if warning['event'] == 'slow_query']
+    repeated = [warning for warning in warnings if warning['event'] == 'repeated_query']
+    assert [query['sql'] for query in slow] == [query['sql'] for query in record['slowest']]
+    assert sum(query['count'] for query in repeated) == record['statements']
+    assert repeated == [dict(query, event='repeated_query', endpoint='venues.show_venue')
+                        for query in record['repeated']]
+
+
+def test_streamed_pages_log_their_queries_but_send_no_header(app, client, caplog):
+    assert app.config['STREAM_TEMPLATES']
+    with count_statements(db.engine) as statements:
+        record, _ = sql_log(caplog, client, '/shows')
+    # the listing query runs while the body streams, after the headers
+    assert record['statements'] == len(statements)
+    assert 'Server-Timing' not in client.get('/shows').headers
@@ -0,0 +1,90 @@
+from datetime import datetime
+
+from sqlalchemy import case, func
+
+from calendars import feed_window, page_window
+from models import db, Artist, Venue, Show, Genre
+
+# Cheap aggregates that change whenever a page's content would, checked by
+# @conditional before the view runs. Counts catch deletes, max(updated_at)
+# catches inserts and edits, and the next upcoming start_time changes when a
+# show moves from upcoming to past.
+
+
+def latest(*values):
+  values = [value for value in values if value is not None]
+  return max(values) if values else None
+
+
+def table_version(model):
+  return tuple(db.session.query(func.count(model.id), func.max(model.updated_at)).one())
+
+
+def table_validator(model):
+  version = table_version(model)
+  return version, version[1]
+
+
+def venues_validator():
+  venues = table_version(Venue)
+  genres = db.session.query(func.count(Genre.id)).scalar()
+  return (venues, genres), venues[1]
+
+
+def shows_validator():
+  shows = table_version(Show)
+  venues = table_version(Venue)
+  artists = table_version(Artist)
+  return (shows, venues, artists), latest(shows[1], venues[1], artists[1])
+
+
+def entity_validator(model, owner_column, other_model, other_column, entity_id):
+  updated_at = db.session.query(model.updated_at).filter(model.id == entity_id).scalar()
+  if updated_at is None:
+    return None
+  shows = db.session.query(
+    func.count(Show.id),
+    func.max(Show.updated_at),
+    func.max(other_model.updated_at),
+    func.min(case((Show.start_time > datetime.now(), Show.start_time)))
+  ).join(other_model, other_column == other_model.id).filter(owner_column == entity_id).one()
+  return (updated_at,) + tuple(shows), latest(updated_at, shows[1], shows[2])
+
+
+def venue_validator(venue_id):
+  return entity_validator(Venue, Show.venue_id, Artist, Show.artist_id, venue_id)
+
+
+def artist_validator(artist_id):
+  return entity_validator(Artist, Show.artist_id, Venue, Show.venue_id, artist_id)
+
+
+def window_validator(model, owner_column, other_model, other_column, entity_id, window):
+  # a calendar's shows are those starting in the window; the same range scan
+  # as the calendar itself, aggregated
+  updated_at = db.session.query(model.updated_at).filter(model.id == entity_id).scalar()
+  if updated_at is None:
+    return None
+  shows = db.session.query(
+    func.count(Show.id),
+    func.max(Show.updated_at),
+    func.max(other_model.updated_at)
+  ).join(other_model, other_column == other_model.id).filter(
+    owner_column == entity_id, Show.start_time >= window.start, Show.start_time < window.end).one()
+  return (updated_at, window) + tuple(shows), latest(updated_at, shows[1], shows[2])
+
+
+def venue_calendar_validator(venue_id):
+  return window_validator(Venue, Show.venue_id, Artist, Show.artist_id, venue_id, page_window())
+
+
+def venue_feed_validator(venue_id):
+  return window_validator(Venue, Show.venue_id, Artist, Show.artist_id, venue_id, feed_window())
+
+
+def artist_calendar_validator(artist_id):
+  return window_validator(Artist, Show.artist_id, Venue, Show.venue_id, artist_id, page_window())
+
+
+def artist_feed_validator(artist_id):
+  return window_validator(Artist, Show.artist_id, Venue, Show.venue_id, artist_id, feed_window())
@@ -0,0 +1,256 @@
+from itertools import groupby
+
+from flask import Blueprint, render_template, request, flash, redirect, url_for
+from sqlalchemy import tuple_
+
+import autocomplete
+import search
+from calendars import render_calendar, calendar_feed
+from cache import page_cache, related_ids, invalidate_venue
+from conditional import conditional
+from directory import filter_args, apply_filters
+from genres import genre_choices, genres_for
+from models import db, Venue, Show
+from pages import venue_page_data, venue_past_shows_page, more_past_cursor
+from pagination import page_size_arg, cursor_arg, encode_key, decode_key
+from streaming import Page, render_listing
+from validators import venues_validator, venue_validator, venue_calendar_validator, venue_feed_validator
+from viewmodels import VenueItem, VENUE_ITEM_COLUMNS
+
+# Venue controllers. Forms are imported inside the views that use them so the
+# WTForms stack is only loaded once a form is first requested.
+
+blueprint = Blueprint('venues', __name__)
+
+#  Venues
+#  ----------------------------------------------------------------
+
+@blueprint.route('/venues')
+@conditional(venues_validator)
+# Venues populated by real data
+def venues():
+  # One ordered query per page, keyset paginated on (city, state, id), which
+  # ix_Venue_city_state_id serves; consecutive rows of the same area are
+  # grouped in a single pass as the page streams. city and state are required
+  # by VenueForm, so the row comparison never meets a NULL.
+  filters = filter_args()
+  page_size = page_size_arg()
+  venue_query = apply_filters(
+    db.session.query(*VENUE_ITEM_COLUMNS), Venue, Venue.seeking_talent, filters,
+  ).order_by(Venue.city, Venue.state, Venue.id)
+  cursor = request.args.get('cursor')
+  if cursor:
+    venue_query = venue_query.filter(tuple_(Venue.city, Venue.state, Venue.id) > tuple_(*decode_key(cursor, 3)))
+  page = Page(venue_query, page_size, key=lambda venue: encode_key(venue.city, venue.state, venue.id),
+              item=VenueItem._make)
+
+  data = ({
+    'city': city,
+    'state': state,
+    'venues': venues
+  } for (city, state), venues in groupby(page, key=lambda venue: (venue.city, venue.state)))
+
+  return render_listing('pages/venues.html', areas=data, page=page, genres=genre_choices(), genre=filters.get('genre'),
+                        filters=filters, per_page=page_size)
+
+
+@blueprint.route('/venues/search', methods=['GET', 'POST'])
+def search_venues():
+
+  # Ranked search on venue name, city, state and genres (see search.py).
+  # Upcoming show counts come from the denormalized counters (see counters.py).
+  # Results are cached per term and page until the next write (search.cached).
+
+  search_term = request.values.get('search_term', '')
+  page = request.values.get('page', 1, type=int)
+  response = search.cached('venue', search_term, page, lambda: _search_results(search_term, page))
+  return render_template('pages/search_venues.html', results=response, search_term=search_term, page=page)
+
+
+def _search_results(search_term, page):
+  result = search.search('venue', search_term, page)
+
+  counts = db.session.query(
+    Venue.id,
+    Venue.name,
+    Venue.upcoming_shows_count.label('num_upcoming_shows')
+  ).filter(Venue.id.in_(result.ids)).all()
+  by_id = {venue.id: venue for venue in counts}
+
+  venues = []
+  for venue_id in result.ids:
+    if venue_id in by_id:
+      venues.append({
+        'id': venue_id,
+        'name': by_id[venue_id].name,
+        'num_upcoming_shows': by_id[venue_id].num_upcoming_shows
+      })
+
+  return {
+    'count': result.total,
+    'data': venues
+  }
+
+@blueprint.route('/venues/<int:venue_id>')
+@conditional(venue_validator)
+def show_venue(venue_id):
+
+  # shows the venue page populated with real data
+
+  data = page_cache().fetch('venue', venue_id, venue_page_data)
+  return render_template('pages/show_venue.html', venue=data, more_past_cursor=more_past_cursor(data))
+
+@blueprint.route('/venues/<int:venue_id>/past-shows')
+@conditional(venue_validator)
+def venue_past_shows(venue_id):
+  # the venue page's "more past shows", as a fragment of tiles
+  page = venue_past_shows_page(venue_id, cursor_arg())
+  return render_template('pages/venue_past_shows.html', shows=page, page=page, venue_id=venue_id)
+
+@blueprint.route('/venues/<int:venue_id>/calendar')
+@conditional(venue_calendar_validator)
+def venue_calendar(venue_id):
+  # the venue's shows in a window of dates (see calendars.py)
+  return render_calendar('venue', venue_id)
+
+@blueprint.route('/venues/<int:venue_id>/calendar.ics')
+@conditional(venue_feed_validator)
+def venue_calendar_feed(venue_id):
+  return calendar_feed('venue', venue_id)
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+@blueprint.route('/venues/create', methods=['GET'])
+def create_venue_form():
+  from forms import VenueForm
+  form = VenueForm()
+  return render_template('forms/new_venue.html', form=form)
+
+@blueprint.route('/venues/create', methods=['POST'])
+def create_venue_submission():
+  from forms import VenueForm
+  form = VenueForm(request.form, meta={'crsf':False})
+
+  if form.validate():
+    try:
+      venue = Venue(
+        name = form.name.data,
+        state = form.state.data,
+        city = form.city.data,
+        phone = form.phone.data,
+                address = form.address.data,
+                genres = ','.join(form.genres.data),
+                genre_list = genres_for(form.genres.data),
+                image_link = form.image_link.data,
+                facebook_link = form.facebook_link.data,
+                seeking_talent = form.seeking_talent.data,
+                website_link = form.website_link.data,
+                seeking_description = form.seeking_description.data
+
+      )
+      
+      db.session.add(venue)
+      db.session.flush()
+      venue_id = venue.id
+      db.session.commit()
+      autocomplete.update('venue', venue_id, form)
+      search.data_changed()
+      flash('Venue ' + request.form['name'] + ' was successfully listed!')
+      return render_template('pages/venues.html')
+    except ValueError as e:
+            db.session.rollback()
+            flash('An error occurred. Venue ' + request.form['name'] + ' could not be listed!')
+            print(e)  
+    finally:
+      db.session.close()
+  
+  else:
+      message = []
+      for field, err in form.errors.items():
+          message.append(field + ' ' + '|'.join(err))
+      flash('Errors ' + str(message))
+      return render_template('forms/new_venue.html', form=form)
+  return render_template('pages/venues.html')
+    
+
+@blueprint.route('/venues/<venue_id>', methods=['DELETE'])
+def delete_venue(venue_id):
+# SQLAlchemy ORM to delete a record.Cases where the session commits could fail handled
+  error = False
+  try:
+    venue = Venue.query.get(venue_id)
+    artist_ids = related_ids(Show.artist_id, Show.venue_id, venue_id)
+    db.session.delete(venue)
+    db.session.commit()
+    invalidate_venue(venue_id, artist_ids)
+    autocomplete.remove('venue', int(venue_id))
+    search.data_changed()
+  except:
+    error = True
+    db.session.rollback()
+  finally:
+    db.session.close()
+  if error:
+    flash(f'An error occured. Venue {venue_id} could not be deleted')
+  if not error:
+    flash(f'Venue {venue_id} was deleted successfully')
+
+  # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
+  # clicking that button delete it from the db then redirect the user to the homepage
+  return render_template('pages/home.html')
+
+#  Update
+#  ----------------------------------------------------------------
+@blueprint.route('/venues/<int:venue_id>/edit', methods=['GET'])
+def edit_venue(venue_id):
+  from forms import VenueForm
+  venue = Venue.query.filter(Venue.id==venue_id).first()
+  form = VenueForm(obj=venue)
+  form.genres.data = [genre.name for genre in venue.genre_list]
+  return render_template('forms/edit_venue.html', form=form, venue=venue)
+
+@blueprint.route('/venues/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+  from forms import VenueForm
+  error = False
+  form = VenueForm(request.form , meta={'csrf': False})
+
+  if form.validate():
+    try:
+      venue = {
+        "name": form.name.data,
+        "city": form.city.data,
+        "state": form.state.data,
+        "phone": form.phone.data,
+        "address": form.address.data,
+        "genres": ','.join(form.genres.data),
+        "image_link": form.image_link.data,
+        "facebook_link": form.facebook_link.data,
+        "seeking_talent": form.seeking_talent.data,
+        "website_link": form.website_link.data,
+        "seeking_description": form.seeking_description.data,
+      }
+
+      Venue.query.filter_by(id=venue_id).update(venue)
+      Venue.query.get(venue_id).genre_list = genres_for(form.genres.data)
+      db.session.commit()
+      invalidate_venue(venue_id)
+      autocomplete.update('venue', venue_id, form)
+      search.data_changed()
+      flash('Venue: ' + request.form['name'] + ' was successfully updated')
+    except Exception as e:
+      db.session.rollback()
+      error = True
+      print(f'Error ==> {e}')
+      flash('Venue: ' + request.form['name'] + ' was not successfully updated')
+    finally:
+      db.session.close()
+  else: 
+      for error in form.errors:
+        flash(form.errors[error][0])
+      return redirect(url_for('.edit_venue', venue_id=venue_id))
+        
+  return redirect(url_for('.show_venue', venue_id=venue_id))
+
+  return redirect(url_for('.show_venue', venue_id=venue_id))
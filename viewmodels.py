@@ -0,0 +1,48 @@
+from collections import namedtuple
+from datetime import timedelta
+
+from models import Artist, Show, Venue
+
+# Read models for the listing and detail pages.
+# Views select only the columns a page shows, in the order of the fields
+# below, and map each row straight into one of these named tuples with
+# _make(). Column selects bypass the session's identity map and every row is
+# allocated once, as the object the template reads. The tuples pickle, so the
+# page cache can store them, and _asdict() gives the API its JSON objects.
+
+ShowTile = namedtuple('ShowTile', 'id start_time venue_id venue_name artist_id artist_name artist_image_link')
+VenueItem = namedtuple('VenueItem', 'id name city state')
+ArtistItem = namedtuple('ArtistItem', 'id name')
+
+# shows listed on a venue page and on an artist page; show_id keys the
+# "more past shows" pages
+VenueShow = namedtuple('VenueShow', 'artist_id artist_name artist_image_link start_time show_id')
+ArtistShow = namedtuple('ArtistShow', 'venue_id venue_name venue_image_link start_time show_id')
+
+
+class CalendarShow(namedtuple('CalendarShow', 'show_id start_time duration_minutes updated_at venue_id venue_name '
+                                              'venue_address venue_city venue_state artist_id artist_name')):
+  # a show on a venue or artist calendar
+  __slots__ = ()
+
+  @property
+  def end_time(self):
+    return self.start_time + timedelta(minutes=self.duration_minutes)
+
+
+SHOW_LISTS = 'genres past_shows upcoming_shows past_shows_count upcoming_shows_count'
+VenuePage = namedtuple('VenuePage', 'id name address city state phone website_link facebook_link '
+                                    'seeking_talent seeking_description image_link ' + SHOW_LISTS)
+ArtistPage = namedtuple('ArtistPage', 'id name city state phone website_link facebook_link '
+                                      'seeking_venue seeking_description image_link ' + SHOW_LISTS)
+
+# the columns each model is read from, in field order
+SHOW_TILE_COLUMNS = (Show.id, Show.start_time, Venue.id, Venue.name, Artist.id, Artist.name, Artist.image_link)
+VENUE_ITEM_COLUMNS = (Venue.id, Venue.name, Venue.city, Venue.state)
+ARTIST_ITEM_COLUMNS = (Artist.id, Artist.name)
+VENUE_SHOW_COLUMNS = (Artist.id, Artist.name, Artist.image_link, Show.start_time, Show.id)
+ARTIST_SHOW_COLUMNS = (Venue.id, Venue.name, Venue.image_link, Show.start_time, Show.id)
+CALENDAR_COLUMNS = (Show.id, Show.start_time, Show.duration_minutes, Show.updated_at, Venue.id, Venue.name,
+                    Venue.address, Venue.city, Venue.state, Artist.id, Artist.name)
+VENUE_PAGE_COLUMNS = tuple(getattr(Venue, field) for field in VenuePage._fields[:-len(SHOW_LISTS.split())])
+ARTIST_PAGE_COLUMNS = tuple(getattr(Artist, field) for field in ArtistPage._fields[:-len(SHOW_LISTS.split())])